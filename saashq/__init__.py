@@ -333,35 +333,33 @@ def connect(site: str | None = None, db_name: str | None = None, set_admin_as_us
 
 
 def connect_replica() -> bool:
-	from saashq.database import get_db
-
-	if hasattr(local, "replica_db") and hasattr(local, "primary_db"):
-		return False
+	"""Switch `saashq.db` to a healthy read replica, see `saashq.database.replica`.
 
-	user = local.conf.db_user
-	password = local.conf.db_password
-	port = local.conf.replica_db_port
+	Return False if already connected to a replica or if no replica is usable."""
+	from saashq.database.replica import get_replica_db
 
-	if local.conf.different_credentials_for_replica:
-		user = local.conf.replica_db_user or local.conf.replica_db_name
-		password = local.conf.replica_db_password
+	if getattr(local, "replica_db", None) and local.db is local.replica_db:
+		return False
 
-	local.replica_db = get_db(
-		socket=None,
-		host=local.conf.replica_host,
-		port=port,
-		user=user,
-		password=password,
-		cur_db_name=local.conf.db_name,
-	)
+	replica_db = get_replica_db()
+	if not replica_db:
+		return False
 
 	# swap db connections
+	local.replica_db = replica_db
 	local.primary_db = local.db
 	local.db = local.replica_db
 
 	return True
 
 
+def disconnect_replica():
+	"""Switch `saashq.db` back to the primary connection, after `connect_replica`."""
+	local.db.close()
+	local.db = local.primary_db
+	local.replica_db = None
+
+
 def get_site_config(sites_path: str | None = None, site_path: str | None = None) -> _dict[str, Any]:
 	"""Return `site_config.json` combined with `sites/common_site_config.json`.
 	`site_config` is a set of site wide settings like database name, password, email etc."""
@@ -949,13 +947,21 @@ def read_only():
 				switched_connection = connect_replica()
 
 			try:
-				retval = fn(*args, **get_newargs(fn, kwargs))
+				return fn(*args, **get_newargs(fn, kwargs))
+			except Exception as e:
+				if not (switched_connection and local.db.is_connection_error(e)):
+					raise
+
+				# replica was lost after its health was checked, run on the primary instead
+				from saashq.database.replica import mark_replica_unhealthy
+
+				mark_replica_unhealthy(local.db)
+				disconnect_replica()
+				switched_connection = False
+				return fn(*args, **get_newargs(fn, kwargs))
 			finally:
 				if switched_connection and hasattr(local, "primary_db"):
-					local.db.close()
-					local.db = local.primary_db
-
-			return retval
+					disconnect_replica()
 
 		return wrapper_fn
 
@@ -1332,8 +1338,18 @@ def get_doc(doctype: str, /) -> _SingleDocument:
 
 
 @overload
-def get_doc(doctype: str, name: str, /, *, for_update: bool | None = None) -> "Document":
-	"""Retrieve DocType from DB, doctype and name must be positional argument."""
+def get_doc(
+	doctype: str,
+	name: str,
+	/,
+	*,
+	for_update: bool | None = None,
+	lazy_children: bool = False,
+	fields: list[str] | None = None,
+) -> "Document":
+	"""Retrieve DocType from DB, doctype and name must be positional argument.
+
+	Child tables are loaded on first use with `lazy_children`, only `fields` are loaded if passed."""
 	pass
 
 
@@ -1371,13 +1387,48 @@ def get_doc(*args: Any, **kwargs: Any) -> "Document":
 
 	doc = saashq.model.document.get_doc(*args, **kwargs)
 
-	# Replace cache if stale one exists
-	if not kwargs.get("for_update") and (key := can_cache_doc(args)) and cache.exists(key):
+	# Replace cache if stale one exists, partially loaded documents aren't cached
+	partial = kwargs.get("lazy_children") or kwargs.get("fields")
+	if not (kwargs.get("for_update") or partial) and (key := can_cache_doc(args)) and cache.exists(key):
 		_set_document_in_cache(key, doc)
 
 	return doc
 
 
+def get_docs(doctype: str, names: Iterable[str | int], *, for_update: bool = False) -> list["Document"]:
+	"""Return `saashq.model.document.Document` objects for all `names` of `doctype`.
+
+	Loads parents and child tables with a handful of queries instead of one set of queries
+	per document, use this instead of calling `get_doc` in a loop.
+
+	:param doctype: DocType of the documents.
+	:param names: Names of the documents, documents are returned in the same order.
+	:param for_update: Lock the rows for update.
+	"""
+	import saashq.model.document
+
+	return saashq.model.document.get_docs(doctype, names, for_update=for_update)
+
+
+def bulk_update_docs(
+	docs: Iterable["Document"],
+	*,
+	ignore_permissions: bool | None = None,
+	ignore_version: bool | None = None,
+) -> list["Document"]:
+	"""Save existing documents, writing their rows with a few batched queries.
+
+	Controller methods still run once per document, use this instead of calling `save` in a loop.
+
+	:param docs: Documents to save.
+	:param ignore_permissions: Skip write permission checks.
+	:param ignore_version: Don't create a Version for the changes.
+	"""
+	from saashq.model.bulk_update import bulk_update_docs
+
+	return bulk_update_docs(docs, ignore_permissions=ignore_permissions, ignore_version=ignore_version)
+
+
 def get_last_doc(doctype, filters=None, order_by="creation desc", *, for_update=False):
 	"""Get last created document of this type."""
 	d = get_all(doctype, filters=filters, limit_page_length=1, order_by=order_by, pluck="name")
@@ -2062,6 +2113,7 @@ def get_list(doctype, *args, **kwargs):
 	:param order_by: Order By e.g. `creation desc`.
 	:param limit_start: Start results at record #. Default 0.
 	:param limit_page_length: No of records in the page. Default 20.
+	:param as_rows: Return compact, read-only rows instead of dicts, see `saashq.database.rows`.
 
 	Example usage:
 
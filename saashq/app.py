@@ -219,9 +219,7 @@ def setup_read_only_mode():
 	saashq.flags.read_only = True
 
 	# If replica is available then just connect replica, else setup read only transaction.
-	if saashq.conf.read_from_replica:
-		saashq.connect_replica()
-	else:
+	if not (saashq.conf.read_from_replica and saashq.connect_replica()):
 		saashq.db.begin(read_only=True)
 
 
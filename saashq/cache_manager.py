@@ -94,6 +94,36 @@ def clear_user_cache(user=None):
 		clear_global_cache()
 
 
+def clear_match_conditions_cache(user=None):
+	"""Clear cached user permission and share conditions of `user` (or all users), see
+	`DatabaseQuery.get_compiled_match_conditions`."""
+
+	def clear():
+		if user:
+			saashq.cache.delete_value("match_conditions", user=user)
+		else:
+			bump_match_conditions_version()
+
+	clear()
+	# a query in another transaction could cache the old state before this one commits
+	saashq.db.after_commit.add(clear)
+
+
+def get_match_conditions_version(doctype: str) -> tuple:
+	"""Return the version of cached match conditions of `doctype` for all users."""
+	return (
+		saashq.cache.hget("match_conditions_version", "*"),
+		saashq.cache.hget("match_conditions_version", doctype),
+	)
+
+
+def bump_match_conditions_version(doctype: str | None = None):
+	"""Invalidate cached match conditions of `doctype` (or all doctypes) for all users.
+
+	Cheaper than deleting the cached conditions of every user, which needs a scan of all keys."""
+	saashq.cache.hset("match_conditions_version", doctype or "*", saashq.generate_hash(length=10))
+
+
 def clear_domain_cache(user=None):
 	domain_cache_keys = ("domain_restricted_doctypes", "domain_restricted_pages")
 	saashq.cache.delete_value(domain_cache_keys)
@@ -128,6 +158,8 @@ def _clear_doctype_cache_from_redis(doctype: str | None = None):
 	from saashq.desk.notifications import delete_notification_count_for
 
 	to_del = ["is_table", "doctype_modules"]
+	# match conditions depend on permissions and link fields of doctypes
+	bump_match_conditions_version(doctype)
 
 	if doctype:
 
@@ -8,7 +8,7 @@ from rq.timeouts import JobTimeoutException
 import saashq
 from saashq import _
 from saashq.core.doctype.data_import.exporter import Exporter
-from saashq.core.doctype.data_import.importer import Importer
+from saashq.core.doctype.data_import.importer import Importer, get_shard_key
 from saashq.model import core_doctypes_list
 from saashq.model.document import Document
 from saashq.modules.import_file import import_file_by_path
@@ -69,7 +69,7 @@ class DataImport(Document):
 	def validate_import_file(self):
 		if self.import_file:
 			# validate template
-			self.get_importer()
+			self.get_importer(lazy=True)
 
 	def validate_google_sheets_url(self):
 		if not self.google_sheets_url:
@@ -78,9 +78,8 @@ class DataImport(Document):
 
 	def set_payload_count(self):
 		if self.import_file:
-			i = self.get_importer()
-			payloads = i.import_file.get_payloads_for_import()
-			self.payload_count = len(payloads)
+			i = self.get_importer(lazy=True)
+			self.payload_count = i.import_file.count_payloads()
 
 	@saashq.whitelist()
 	def get_preview_from_template(self, import_file=None, google_sheets_url=None):
@@ -126,8 +125,8 @@ class DataImport(Document):
 	def download_import_log(self):
 		return self.get_importer().export_import_log()
 
-	def get_importer(self):
-		return Importer(self.reference_doctype, data_import=self)
+	def get_importer(self, lazy=False):
+		return Importer(self.reference_doctype, data_import=self, lazy=lazy)
 
 
 @saashq.whitelist()
@@ -146,7 +145,7 @@ def start_import(data_import):
 	"""This method runs in background job"""
 	data_import = saashq.get_doc("Data Import", data_import)
 	try:
-		i = Importer(data_import.reference_doctype, data_import=data_import)
+		i = Importer(data_import.reference_doctype, data_import=data_import, lazy=True)
 		i.import_data()
 	except JobTimeoutException:
 		saashq.db.rollback()
@@ -161,6 +160,32 @@ def start_import(data_import):
 	saashq.publish_realtime("data_import_refresh", {"data_import": data_import.name})
 
 
+def import_shard(data_import, shard):
+	"""Import one shard of payloads of a Data Import, runs in background job.
+
+	Shards are enqueued by `Importer.start_shards`. The last shard to finish sets the status of
+	the Data Import. Rows of failed or timed out shards are imported when the import is retried."""
+	data_import = saashq.get_doc("Data Import", data_import)
+	importer = None
+	try:
+		importer = Importer(data_import.reference_doctype, data_import=data_import, lazy=True)
+		importer.import_data(shard=tuple(shard))
+	except JobTimeoutException:
+		saashq.db.rollback()
+	except Exception:
+		saashq.db.rollback()
+		data_import.log_error("Data import failed")
+	finally:
+		saashq.flags.in_import = False
+
+	if saashq.cache.decr(get_shard_key(data_import.name, "pending")) > 0:
+		return
+
+	importer = importer or Importer(data_import.reference_doctype, data_import=data_import)
+	importer.finish_import(data_import.payload_count)
+	saashq.publish_realtime("data_import_refresh", {"data_import": data_import.name})
+
+
 @saashq.whitelist()
 def download_template(doctype, export_fields=None, export_records=None, export_filters=None, file_type="CSV"):
 	"""
@@ -257,7 +282,7 @@ def import_file(doctype, file_path, import_type, submit_after_import=False, cons
 		"Insert New Records" if import_type.lower() == "insert" else "Update Existing Records"
 	)
 
-	i = Importer(doctype=doctype, file_path=file_path, data_import=data_import, console=console)
+	i = Importer(doctype=doctype, file_path=file_path, data_import=data_import, console=console, lazy=True)
 	i.import_data()
 
 
@@ -5,28 +5,47 @@ import json
 import os
 import re
 import timeit
+from collections import defaultdict
 from datetime import date, datetime, time
+from itertools import islice
 
 import saashq
 from saashq import _
 from saashq.core.doctype.version.version import get_diff
 from saashq.model import no_value_fields
-from saashq.utils import cint, cstr, duration_to_seconds, flt, update_progress_bar
-from saashq.utils.csvutils import get_csv_content_from_google_sheets, read_csv_content
+from saashq.model.naming import set_new_name
+from saashq.utils import (
+	cint,
+	create_batch,
+	cstr,
+	duration_to_seconds,
+	flt,
+	strip_html,
+	update_progress_bar,
+)
+from saashq.utils.csvutils import get_csv_content_from_google_sheets, iter_csv_file, read_csv_content
 from saashq.utils.xlsxutils import (
+	iter_xlsx_file,
 	read_xls_file_from_attached_file,
 	read_xlsx_file_from_attached_file,
 )
 
 INVALID_VALUES = ("", None)
 MAX_ROWS_IN_PREVIEW = 10
+# rows read to build the header of a lazily read import file
+LAZY_IMPORT_SAMPLE_SIZE = 1000
+# payloads whose link values are looked up together
+LINK_PREFETCH_SIZE = 1000
 INSERT = "Insert New Records"
 UPDATE = "Update Existing Records"
+PROGRESS_INTERVAL = 1  # seconds between realtime progress updates
 DURATION_PATTERN = re.compile(r"^(?:(\d+d)?((^|\s)\d+h)?((^|\s)\d+m)?((^|\s)\d+s)?)$")
 
 
 class Importer:
-	def __init__(self, doctype, data_import=None, file_path=None, import_type=None, console=False):
+	def __init__(
+		self, doctype, data_import=None, file_path=None, import_type=None, console=False, lazy=False
+	):
 		self.doctype = doctype
 		self.console = console
 
@@ -45,6 +64,7 @@ class Importer:
 			self.template_options,
 			self.import_type,
 			console=self.console,
+			lazy=lazy,
 		)
 
 	def get_data_for_import_preview(self):
@@ -71,11 +91,26 @@ class Importer:
 
 		self.data_import.db_set("template_warnings", "")
 
-	def import_data(self):
+	def import_data(self, shard: tuple[int, int] | None = None):
+		"""Import all payloads, or only payloads `shard[0]` to `shard[1] - 1` if passed.
+
+		Payloads are imported in batches of `data_import_commit_batch_size` (site config, default: 1)
+		with one commit per batch. Every payload is imported under a savepoint, so a failing row only
+		discards its own changes. Doctypes whose controllers commit on their own should be imported
+		with the default batch size of 1.
+
+		If the import file is read lazily, rows are read and parsed one batch at a time and rows
+		with invalid values are logged as failures instead of stopping the whole import.
+
+		If `data_import_workers` (site config) is more than 1, the payloads are split in as many
+		shards which are imported by background jobs in parallel, see `import_shard`. Only use this
+		if rows don't depend on other rows of the same file (e.g. links to records imported in the
+		same file).
+		"""
 		self.before_import()
 
-		# parse docs from rows
-		payloads = self.import_file.get_payloads_for_import()
+		# parse docs from rows, rows of lazily read files are parsed while importing them
+		payloads = None if self.import_file.lazy else self.import_file.get_payloads_for_import()
 
 		# dont import if there are non-ignorable warnings
 		warnings = self.import_file.get_warnings()
@@ -88,7 +123,39 @@ class Importer:
 				self.data_import.db_set("template_warnings", json.dumps(warnings))
 			return
 
-		# setup import log
+		imported_rows = self.get_imported_rows(remove_failures=shard is None)
+		if payloads is None:
+			total_payload_count = self.data_import.payload_count or self.import_file.count_payloads()
+		else:
+			total_payload_count = len(payloads)
+
+		if shard is None and self.should_shard(total_payload_count):
+			self.start_shards(total_payload_count)
+			return
+
+		start, end = shard or (0, total_payload_count)
+		self.sharded = shard is not None
+		self.last_progress_at = 0
+		self.unreported_progress = 0
+		commit_batch_size = cint(saashq.conf.data_import_commit_batch_size) or 1
+
+		if payloads is None:
+			payloads = enumerate(self.import_file.iter_payloads(start, end), start)
+		else:
+			payloads = enumerate(payloads[start:end], start)
+
+		while batch := list(islice(payloads, commit_batch_size)):
+			self.import_batch(batch, imported_rows, total_payload_count)
+
+		if self.sharded:
+			eta = getattr(self, "last_eta", 0)
+			self.publish_progress(end - 1, total_payload_count, force=True, eta=eta)
+			return
+
+		return self.finish_import(total_payload_count)
+
+	def get_imported_rows(self, remove_failures=True) -> set[int]:
+		"""Return row numbers which don't have to be imported again."""
 		import_log = (
 			saashq.get_all(
 				"Data Import Log",
@@ -99,11 +166,10 @@ class Importer:
 			or []
 		)
 
-		log_index = 0
-
 		# Do not remove rows in case of retry after an error or pending data import
 		if (
-			self.data_import.status in ("Partial Success", "Error")
+			remove_failures
+			and self.data_import.status in ("Partial Success", "Error")
 			and len(import_log) >= self.data_import.payload_count
 		):
 			# remove previous failures from import log only in case of retry after partial success
@@ -111,101 +177,161 @@ class Importer:
 			saashq.db.delete("Data Import Log", {"success": 0, "data_import": self.data_import.name})
 
 		# get successfully imported rows
-		imported_rows = []
+		imported_rows = set()
 		for log in import_log:
-			log = saashq._dict(log)
 			if log.success or len(import_log) < self.data_import.payload_count:
-				imported_rows += json.loads(log.row_indexes)
-
-			log_index = log.log_index
-
-		# start import
-		total_payload_count = len(payloads)
-		batch_size = saashq.conf.data_import_batch_size or 1000
-
-		for batch_index, batched_payloads in enumerate(saashq.utils.create_batch(payloads, batch_size)):
-			for i, payload in enumerate(batched_payloads):
-				doc = payload.doc
-				row_indexes = [row.row_number for row in payload.rows]
-				current_index = (i + 1) + (batch_index * batch_size)
-
-				if set(row_indexes).intersection(set(imported_rows)):
-					print("Skipping imported rows", row_indexes)
-					if total_payload_count > 5:
-						saashq.publish_realtime(
-							"data_import_progress",
-							{
-								"current": current_index,
-								"total": total_payload_count,
-								"skipping": True,
-								"data_import": self.data_import.name,
-							},
-							user=saashq.session.user,
-						)
-					continue
+				imported_rows.update(json.loads(log.row_indexes))
 
-				try:
-					start = timeit.default_timer()
-					doc = self.process_doc(doc)
-					processing_time = timeit.default_timer() - start
-					eta = self.get_eta(current_index, total_payload_count, processing_time)
-
-					if self.console:
-						update_progress_bar(
-							f"Importing {self.doctype}: {total_payload_count} records",
-							current_index - 1,
-							total_payload_count,
-						)
-					elif total_payload_count > 5:
-						saashq.publish_realtime(
-							"data_import_progress",
-							{
-								"current": current_index,
-								"total": total_payload_count,
-								"docname": doc.name,
-								"data_import": self.data_import.name,
-								"success": True,
-								"row_indexes": row_indexes,
-								"eta": eta,
-							},
-							user=saashq.session.user,
-						)
-
-					create_import_log(
-						self.data_import.name,
-						log_index,
-						{"success": True, "docname": doc.name, "row_indexes": row_indexes},
-					)
+		return imported_rows
 
-					log_index += 1
+	def import_batch(self, batch: list[tuple[int, dict]], imported_rows: set[int], total_payload_count: int):
+		"""Import `(index, payload)` of `batch` and commit them along with their logs."""
+		logs = []
+		unreported_progress = self.unreported_progress
 
-					if self.data_import.status != "Partial Success":
-						self.data_import.db_set("status", "Partial Success")
+		for index, payload in batch:
+			row_indexes = [row.row_number for row in payload.rows]
+			self.unreported_progress += 1
 
-					# commit after every successful import
-					saashq.db.commit()
+			if imported_rows.intersection(row_indexes):
+				print("Skipping imported rows", row_indexes)
+				self.publish_progress(index, total_payload_count, skipping=True)
+				continue
 
-				except Exception:
-					messages = saashq.local.message_log
-					saashq.clear_messages()
+			if row_warnings := [w for row in payload.rows for w in row.warnings]:
+				# only lazily read files get here, others aren't imported if any row has warnings
+				messages = [
+					{"title": _("Row {0}").format(w["row"]), "message": w["message"]} for w in row_warnings
+				]
+				logs.append(
+					{
+						"success": False,
+						"exception": "\n".join(strip_html(m["message"]) for m in messages),
+						"messages": messages,
+						"row_indexes": row_indexes,
+						"log_index": index,
+					}
+				)
+				continue
+
+			saashq.db.savepoint("data_import_row")
+			try:
+				start = timeit.default_timer()
+				doc = self.process_doc(payload.doc)
+				processing_time = timeit.default_timer() - start
+			except Exception:
+				messages = saashq.local.message_log
+				saashq.clear_messages()
 
-					# rollback if exception
+				try:
+					saashq.db.rollback(save_point="data_import_row")
+				except Exception:
+					# the whole transaction was rolled back (e.g. on a deadlock), with the rest of the batch
 					saashq.db.rollback()
+					if len(batch) > 1:
+						self.unreported_progress = unreported_progress
+						for item in batch:
+							self.import_batch([item], imported_rows, total_payload_count)
+						return
 
-					create_import_log(
-						self.data_import.name,
-						log_index,
-						{
-							"success": False,
-							"exception": saashq.get_traceback(),
-							"messages": messages,
-							"row_indexes": row_indexes,
-						},
-					)
+				logs.append(
+					{
+						"success": False,
+						"exception": saashq.get_traceback(),
+						"messages": messages,
+						"row_indexes": row_indexes,
+						"log_index": index,
+					}
+				)
+			else:
+				saashq.db.release_savepoint("data_import_row")
+				logs.append(
+					{"success": True, "docname": doc.name, "row_indexes": row_indexes, "log_index": index}
+				)
+				self.publish_progress(
+					index,
+					total_payload_count,
+					docname=doc.name,
+					row_indexes=row_indexes,
+					eta=self.get_eta(index + 1, total_payload_count, processing_time),
+				)
+
+		create_import_logs(self.data_import.name, logs)
+
+		if any(log["success"] for log in logs) and self.data_import.status != "Partial Success":
+			self.data_import.db_set("status", "Partial Success")
+
+		saashq.db.commit()
+
+	def publish_progress(self, index, total_payload_count, skipping=False, force=False, **details):
+		"""Publish progress of the import, at most once every `PROGRESS_INTERVAL` seconds."""
+		current = index + 1
+
+		if self.console:
+			if not skipping:
+				title = f"Importing {self.doctype}: {total_payload_count} records"
+				update_progress_bar(title, current - 1, total_payload_count)
+			return
+
+		if total_payload_count <= 5:
+			return
+
+		now = timeit.default_timer()
+		if not force and current < total_payload_count and now - self.last_progress_at < PROGRESS_INTERVAL:
+			return
+
+		self.last_progress_at = now
+		if self.sharded:
+			# shards run in parallel, report the number of payloads done by all of them
+			progress_key = get_shard_key(self.data_import.name, "progress")
+			current = saashq.cache.incrby(progress_key, self.unreported_progress)
+		self.unreported_progress = 0
+
+		progress = {"current": current, "total": total_payload_count, "data_import": self.data_import.name}
+		if skipping:
+			progress["skipping"] = True
+		else:
+			progress.update(details, success=True)
+
+		saashq.publish_realtime("data_import_progress", progress, user=saashq.session.user)
+
+	def should_shard(self, total_payload_count) -> bool:
+		workers = cint(saashq.conf.data_import_workers)
+		if workers < 2 or self.console or not self.data_import.name:
+			return False
 
-					log_index += 1
+		return total_payload_count > workers
 
-		# Logs are db inserted directly so will have to be fetched again
+	def start_shards(self, total_payload_count):
+		"""Split payloads in `data_import_workers` shards and enqueue a job to import each of them."""
+		from saashq.utils.background_jobs import enqueue
+
+		workers = cint(saashq.conf.data_import_workers)
+		shard_size = -(-total_payload_count // workers)
+		shards = [
+			(start, min(start + shard_size, total_payload_count))
+			for start in range(0, total_payload_count, shard_size)
+		]
+
+		expiry = 24 * 60 * 60
+		saashq.cache.set(get_shard_key(self.data_import.name, "pending"), len(shards), ex=expiry)
+		saashq.cache.set(get_shard_key(self.data_import.name, "progress"), 0, ex=expiry)
+		# removed failures of a previous run
+		saashq.db.commit()
+
+		for shard_index, shard in enumerate(shards):
+			enqueue(
+				"saashq.core.doctype.data_import.data_import.import_shard",
+				queue="default",
+				timeout=10000,
+				event="data_import",
+				job_id=f"data_import::{self.data_import.name}::{shard_index}",
+				data_import=self.data_import.name,
+				shard=shard,
+			)
+
+	def finish_import(self, total_payload_count):
+		"""Set status of the Data Import from its logs and return the logs."""
 		import_log = (
 			saashq.get_all(
 				"Data Import Log",
@@ -402,13 +528,19 @@ class Importer:
 
 
 class ImportFile:
-	def __init__(self, doctype, file, template_options=None, import_type=None, *, console=False):
+	def __init__(self, doctype, file, template_options=None, import_type=None, *, console=False, lazy=False):
+		"""Read and parse the import template `file`.
+
+		If `lazy` is set, only the first `LAZY_IMPORT_SAMPLE_SIZE` rows of the file are read to build
+		the header and guess column formats, rows are read again one at a time by `iter_payloads`.
+		"""
 		self.doctype = doctype
 		self.template_options = template_options or saashq._dict(column_to_field_map=saashq._dict())
 		self.column_to_field_map = self.template_options.column_to_field_map
 		self.import_type = import_type
 		self.warnings = []
 		self.console = console
+		self.lazy = lazy
 
 		self.file_doc = self.file_path = self.google_sheets_url = None
 		if isinstance(file, str):
@@ -422,7 +554,10 @@ class ImportFile:
 		if not self.file_doc and not self.file_path and not self.google_sheets_url:
 			saashq.throw(_("Invalid template file for import"))
 
-		self.raw_data = self.get_data_from_template_file()
+		if self.lazy:
+			self.raw_data = list(islice(self.iter_data_from_template_file(), LAZY_IMPORT_SAMPLE_SIZE))
+		else:
+			self.raw_data = self.get_data_from_template_file()
 		self.parse_data_from_template()
 
 	def get_data_from_template_file(self):
@@ -451,6 +586,24 @@ class ImportFile:
 		if content:
 			return self.read_content(content, extension)
 
+	def iter_data_from_template_file(self):
+		"""Yield raw rows of the template file, without reading all of it if it is a csv or xlsx on disk."""
+		file_path = extension = None
+		if self.file_doc and not self.file_doc.is_remote_file():
+			file_path = self.file_doc.get_full_path()
+			extension = self.file_doc.get_extension()[1].lstrip(".")
+		elif self.file_path and self.console:
+			file_path = self.file_path
+			extension = os.path.splitext(file_path)[1][1:]
+
+		if file_path and os.path.exists(file_path) and extension in ("csv", "xlsx"):
+			if extension == "csv":
+				yield from iter_csv_file(file_path)
+			else:
+				yield from iter_xlsx_file(file_path)
+		else:
+			yield from self.get_data_from_template_file() or []
+
 	def parse_data_from_template(self):
 		header = None
 		data = []
@@ -468,6 +621,7 @@ class ImportFile:
 
 		self.header = header
 		self.columns = self.header.columns
+		self.parent_column_indexes = self.header.get_column_indexes(self.doctype)
 		self.data = data
 
 		if len(data) < 1:
@@ -512,42 +666,70 @@ class ImportFile:
 		return out
 
 	def get_payloads_for_import(self):
-		payloads = []
-		# make a copy
-		data = list(self.data)
-		while data:
-			doc, rows, data = self.parse_next_row_for_import(data)
-			payloads.append(saashq._dict(doc=doc, rows=rows))
-		return payloads
+		return list(self.iter_payloads())
+
+	def iter_data(self):
+		"""Yield `Row`s of all data rows of the file, reading them lazily if `lazy` is set."""
+		if not self.lazy:
+			yield from self.data
+			return
+
+		header_row = self.header.index
+		for i, row in enumerate(self.iter_data_from_template_file()):
+			if i <= header_row or all(v in INVALID_VALUES for v in row):
+				continue
+			yield Row(i, row, self.doctype, self.header, self.import_type)
+
+	def iter_row_groups(self):
+		"""Yield lists of rows that make up a doc. A doc maybe built from a single row or multiple rows."""
+		rows = []
+		for row in self.iter_data():
+			# subsequent rows that have blank values in parent columns are considered as child rows,
+			# if we encounter a row which has values in parent columns, then it is the next doc
+			if rows and not self.is_child_row(row):
+				yield rows
+				rows = []
+			rows.append(row)
+
+		if rows:
+			yield rows
+
+	def iter_payloads(self, start=0, end=None):
+		"""Yield payloads from `start` to `end` (exclusive), rows of other payloads aren't parsed."""
+		row_groups = islice(self.iter_row_groups(), start, end)
+		while chunk := list(islice(row_groups, LINK_PREFETCH_SIZE)):
+			# validate link values of the chunk with one query per linked doctype instead of one per cell
+			self.header.prefetch_link_values([row.data for rows in chunk for row in rows])
+			for rows in chunk:
+				yield saashq._dict(doc=self.parse_rows_for_import(rows), rows=rows)
+
+	def count_payloads(self):
+		return sum(1 for _rows in self.iter_row_groups())
+
+	def is_child_row(self, row):
+		if len(self.header.doctypes) < 2:
+			return False
+
+		return all(v in INVALID_VALUES for v in row.get_values(self.parent_column_indexes))
 
 	def parse_next_row_for_import(self, data):
 		"""
 		Parse rows that make up a doc. A doc maybe built from a single row or multiple rows.
 		Return the doc, rows, and data without the rows.
 		"""
-		doctypes = self.header.doctypes
-
 		# first row is included by default
-		first_row = data[0]
-		rows = [first_row]
+		rows = [data[0]]
 
 		# if there are child doctypes, find the subsequent rows
-		if len(doctypes) > 1:
-			# subsequent rows that have blank values in parent columns
-			# are considered as child rows
-			parent_column_indexes = self.header.get_column_indexes(self.doctype)
-
-			data_without_first_row = data[1:]
-			for row in data_without_first_row:
-				row_values = row.get_values(parent_column_indexes)
-				# if the row is blank, it's a child row doc
-				if all(v in INVALID_VALUES for v in row_values):
-					rows.append(row)
-					continue
-				# if we encounter a row which has values in parent columns,
-				# then it is the next doc
+		for row in data[1:]:
+			if not self.is_child_row(row):
 				break
+			rows.append(row)
+
+		return self.parse_rows_for_import(rows), rows, data[len(rows) :]
 
+	def parse_rows_for_import(self, rows):
+		doctypes = self.header.doctypes
 		parent_doc = None
 		for row in rows:
 			for doctype, table_df in doctypes:
@@ -561,9 +743,7 @@ class ImportFile:
 					parent_doc[table_df.fieldname] = parent_doc.get(table_df.fieldname, [])
 					parent_doc[table_df.fieldname].append(child_doc)
 
-		doc = parent_doc
-
-		return doc, rows, data[len(rows) :]
+		return parent_doc
 
 	def get_warnings(self):
 		warnings = []
@@ -575,9 +755,10 @@ class ImportFile:
 		for col in self.header.columns:
 			warnings += col.warnings
 
-		# Row warnings
-		for row in self.data:
-			warnings += row.warnings
+		# Row warnings, rows of lazily read files are validated while importing them
+		if not self.lazy:
+			for row in self.data:
+				warnings += row.warnings
 
 		return warnings
 
@@ -714,10 +895,13 @@ class Row:
 				)
 				return
 
-		elif df.fieldtype == "Link":
-			exists = self.link_exists(value, df)
-			if not exists:
-				msg = _("Value {0} missing for {1}").format(saashq.bold(value), saashq.bold(df.options))
+		elif df.fieldtype == "Link" or (df.fieldtype == "Dynamic Link" and col.link_doctype_column):
+			link_doctype = df.options
+			if df.fieldtype == "Dynamic Link":
+				link_doctype = cstr(get_item_at_index(self.data, col.link_doctype_column.index))
+
+			if link_doctype and not self.link_exists(value, link_doctype):
+				msg = _("Value {0} missing for {1}").format(saashq.bold(value), saashq.bold(link_doctype))
 				self.warnings.append(
 					{
 						"row": self.row_number,
@@ -756,8 +940,8 @@ class Row:
 
 		return value
 
-	def link_exists(self, value, df):
-		return bool(saashq.db.exists(df.options, value, cache=True))
+	def link_exists(self, value, doctype):
+		return self.header.link_values.exists(doctype, value)
 
 	def parse_value(self, value, col):
 		df = col.df
@@ -817,14 +1001,19 @@ class Header(Row):
 
 		self.seen = []
 		self.columns = []
+		self.link_values = LinkValues()
 
 		for j, header in enumerate(row):
 			column_values = [get_item_at_index(r, j) for r in raw_data]
 			map_to_field = column_to_field_map.get(str(j))
-			column = Column(j, header, self.doctype, column_values, map_to_field, self.seen)
+			column = Column(
+				j, header, self.doctype, column_values, map_to_field, self.seen, link_values=self.link_values
+			)
 			self.seen.append(header)
 			self.columns.append(column)
 
+		self.set_link_doctype_columns()
+
 		doctypes = []
 		for col in self.columns:
 			if not col.df:
@@ -836,6 +1025,42 @@ class Header(Row):
 
 		self.doctypes = sorted(list(set(doctypes)), key=lambda x: -1 if x[0] == self.doctype else 1)
 
+	def set_link_doctype_columns(self):
+		"""Set the column holding the doctype of every Dynamic Link column, if it is imported."""
+		for col in self.columns:
+			if col.skip_import or not col.df or col.df.fieldtype != "Dynamic Link":
+				continue
+
+			table_df = getattr(col.df, "child_table_df", None)
+			for other in self.columns:
+				if (
+					not other.skip_import
+					and other.df
+					and other.df.parent == col.df.parent
+					and other.df.fieldname == col.df.options
+					and getattr(other.df, "child_table_df", None) == table_df
+				):
+					col.link_doctype_column = other
+					break
+
+	def prefetch_link_values(self, rows):
+		"""Look up all values of Link and Dynamic Link columns in raw `rows` with one query per doctype."""
+		values_by_doctype = defaultdict(set)
+		for col in self.columns:
+			if col.skip_import or not col.df:
+				continue
+
+			if col.df.fieldtype == "Link":
+				values_by_doctype[col.df.options].update(get_item_at_index(r, col.index) for r in rows)
+			elif col.df.fieldtype == "Dynamic Link" and col.link_doctype_column:
+				doctype_index = col.link_doctype_column.index
+				for r in rows:
+					if link_doctype := get_item_at_index(r, doctype_index):
+						values_by_doctype[cstr(link_doctype)].add(get_item_at_index(r, col.index))
+
+		for doctype, values in values_by_doctype.items():
+			self.link_values.fetch(doctype, values)
+
 	def get_column_indexes(self, doctype, tablefield=None):
 		def is_table_field(df):
 			if tablefield:
@@ -853,7 +1078,7 @@ class Header(Row):
 
 
 class Column:
-	def __init__(self, index, header, doctype, column_values, map_to_field=None, seen=None):
+	def __init__(self, index, header, doctype, column_values, map_to_field=None, seen=None, link_values=None):
 		if seen is None:
 			seen = []
 		self.index = index
@@ -863,10 +1088,12 @@ class Column:
 		self.column_values = column_values
 		self.map_to_field = map_to_field
 		self.seen = seen
+		self.link_values = link_values or LinkValues()
 
 		self.date_format = None
 		self.df = None
 		self.skip_import = None
+		self.link_doctype_column = None
 		self.warnings = []
 
 		self.meta = saashq.get_meta(doctype)
@@ -997,9 +1224,9 @@ class Column:
 
 		if self.df.fieldtype == "Link":
 			# find all values that dont exist
-			values = list({cstr(v) for v in self.column_values if v})
-			exists = [cstr(d.name) for d in saashq.get_all(self.df.options, filters={"name": ("in", values)})]
-			not_exists = list(set(values) - set(exists))
+			values = {cstr(v) for v in self.column_values if v}
+			self.link_values.fetch(self.df.options, values)
+			not_exists = [v for v in values if not self.link_values.exists(self.df.options, v)]
 			if not_exists:
 				missing_values = ", ".join(not_exists)
 				message = _("The following values do not exist for {0}: {1}")
@@ -1070,6 +1297,42 @@ class Column:
 		return d
 
 
+class LinkValues:
+	"""Link values known to exist or to be missing, shared by all columns and rows of an import."""
+
+	def __init__(self):
+		self.existing = defaultdict(set)
+		self.missing = defaultdict(set)
+
+	def fetch(self, doctype, values):
+		"""Look up all `values` of `doctype` which aren't known yet with one query per 1000 values."""
+		values = {cstr(v) for v in values if v} - self.existing[doctype] - self.missing[doctype]
+		if not values:
+			return
+
+		if not saashq.db.exists("DocType", doctype, cache=True):
+			self.missing[doctype].update(values)
+			return
+
+		# names are compared case-insensitively on mariadb, like `saashq.db.exists` does
+		normalize = str.casefold if saashq.db.db_type == "mariadb" else str
+		for batch in create_batch(list(values), 1000):
+			names = saashq.get_all(doctype, filters={"name": ("in", batch)}, pluck="name")
+			found = {normalize(cstr(name)) for name in names}
+			for value in batch:
+				if normalize(value) in found:
+					self.existing[doctype].add(value)
+				else:
+					self.missing[doctype].add(value)
+
+	def exists(self, doctype, value):
+		value = cstr(value)
+		if value not in self.existing[doctype] and value not in self.missing[doctype]:
+			self.fetch(doctype, [value])
+
+		return value in self.existing[doctype]
+
+
 def build_fields_dict_for_column_matching(parent_doctype):
 	"""
 	Build a dict with various keys to match with column headers and value as docfield
@@ -1266,16 +1529,34 @@ def get_select_options(df):
 	return [d for d in (df.options or "").split("\n") if d]
 
 
-def create_import_log(data_import, log_index, log_details):
-	saashq.get_doc(
-		{
-			"doctype": "Data Import Log",
-			"log_index": log_index,
-			"success": log_details.get("success"),
-			"data_import": data_import,
-			"row_indexes": json.dumps(log_details.get("row_indexes")),
-			"docname": log_details.get("docname"),
-			"messages": json.dumps(log_details.get("messages", "[]")),
-			"exception": log_details.get("exception"),
-		}
-	).db_insert()
+def create_import_logs(data_import, logs: list[dict]):
+	"""Insert Data Import Log rows for all `logs` with one query."""
+	if not logs:
+		return
+
+	timestamp = saashq.utils.now()
+	rows = []
+	for log in logs:
+		doc = saashq.get_doc(
+			{
+				"doctype": "Data Import Log",
+				"log_index": log.get("log_index"),
+				"success": log.get("success"),
+				"data_import": data_import,
+				"row_indexes": json.dumps(log.get("row_indexes")),
+				"docname": log.get("docname"),
+				"messages": json.dumps(log.get("messages", "[]")),
+				"exception": log.get("exception"),
+			}
+		)
+		set_new_name(doc)
+		doc.creation = doc.modified = timestamp
+		doc.owner = doc.modified_by = saashq.session.user
+		rows.append(doc.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True))
+
+	fields = list(rows[0])
+	saashq.db.bulk_insert("Data Import Log", fields, [[row.get(field) for field in fields] for row in rows])
+
+
+def get_shard_key(data_import: str, key: str) -> str:
+	return saashq.cache.make_key(f"data_import::{data_import}::shards::{key}")
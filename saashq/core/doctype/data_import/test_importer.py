@@ -1,7 +1,9 @@
 # Copyright (c) 2019, Saashq Technologies and Contributors
 # License: MIT. See LICENSE
+from unittest.mock import patch
+
 import saashq
-from saashq.core.doctype.data_import.importer import Importer
+from saashq.core.doctype.data_import.importer import Importer, ImportFile, LinkValues
 from saashq.tests import IntegrationTestCase, UnitTestCase
 from saashq.tests.test_query_builder import db_type_is, run_only_if
 from saashq.utils import format_duration, getdate
@@ -122,6 +124,52 @@ class TestImporter(IntegrationTestCase):
 			"Title is required",
 		)
 
+	def test_data_import_in_batches(self):
+		saashq.delete_doc_if_exists(doctype_name, "Test 4")
+		import_file = get_import_file("sample_import_file_without_mandatory")
+		data_import = self.get_importer(doctype_name, import_file)
+
+		with patch.dict(saashq.conf, {"data_import_commit_batch_size": 10}):
+			data_import.start_import()
+		data_import.reload()
+
+		import_log = saashq.get_all(
+			"Data Import Log",
+			fields=["row_indexes", "success", "docname"],
+			filters={"data_import": data_import.name},
+			order_by="log_index",
+		)
+
+		# failing rows are rolled back to their savepoint without affecting other rows of the batch
+		self.assertEqual([log.success for log in import_log], [0, 0, 1])
+		self.assertEqual(saashq.parse_json(import_log[2].row_indexes), [5])
+		self.assertTrue(saashq.db.exists(doctype_name, import_log[2].docname))
+		self.assertEqual(data_import.status, "Partial Success")
+
+	def test_lazy_import_file(self):
+		import_file = get_import_file("sample_import_file")
+		payloads = ImportFile(doctype_name, import_file.file_url).get_payloads_for_import()
+		lazy_import_file = ImportFile(doctype_name, import_file.file_url, lazy=True)
+
+		self.assertEqual(lazy_import_file.count_payloads(), len(payloads))
+		lazy_payloads = list(lazy_import_file.iter_payloads(start=1))
+		self.assertEqual([p.doc for p in lazy_payloads], [p.doc for p in payloads[1:]])
+		self.assertEqual(
+			[[row.row_number for row in p.rows] for p in lazy_payloads],
+			[[row.row_number for row in p.rows] for p in payloads[1:]],
+		)
+
+	def test_link_values(self):
+		link_values = LinkValues()
+		link_values.fetch("User", ["Administrator", "Guest", "_Test Missing User"])
+
+		with self.assertQueryCount(0):
+			self.assertTrue(link_values.exists("User", "Administrator"))
+			self.assertTrue(link_values.exists("User", "Guest"))
+			self.assertFalse(link_values.exists("User", "_Test Missing User"))
+
+		self.assertFalse(link_values.exists("_Test Missing DocType", "Administrator"))
+
 	def test_data_import_update(self):
 		existing_doc = saashq.get_doc(
 			doctype=doctype_name,
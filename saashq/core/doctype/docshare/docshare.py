@@ -3,6 +3,7 @@
 
 import saashq
 from saashq import _
+from saashq.cache_manager import clear_match_conditions_cache
 from saashq.model.document import Document
 from saashq.utils import cint, get_fullname
 
@@ -80,10 +81,15 @@ class DocShare(Document):
 				"Shared", _("{0} shared this document with {1}").format(owner, get_fullname(self.user))
 			)
 
+	def on_update(self):
+		self.clear_match_conditions_cache()
+
 	def on_trash(self):
 		if not self.flags.ignore_share_permission:
 			self.check_share_permission()
 
+		self.clear_match_conditions_cache()
+
 		self.get_doc().add_comment(
 			"Unshared",
 			_("{0} un-shared this document with {1}").format(
@@ -91,6 +97,14 @@ class DocShare(Document):
 			),
 		)
 
+	def clear_match_conditions_cache(self):
+		"""Shared documents are part of the cached list view conditions of users."""
+		previous = self.get_doc_before_save()
+		if self.everyone or (previous and (previous.everyone or previous.user != self.user)):
+			clear_match_conditions_cache()
+		else:
+			clear_match_conditions_cache(self.user)
+
 
 def on_doctype_update():
 	"""Add index in `tabDocShare` for `(user, share_doctype)`"""
@@ -1,6 +1,7 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
 
+import hashlib
 import io
 import mimetypes
 import os
@@ -105,6 +106,11 @@ class File(Document):
 
 		if self.is_remote_file:
 			self.validate_remote_file()
+		elif self.flags.written_to_disk:
+			# large generated files (e.g. exports) are written to `file_url` directly, avoid reading them in memory
+			self.set_stats_from_disk()
+			self.flags.new_file = True
+			saashq.db.after_rollback.add(self.on_rollback)
 		else:
 			self.save_file(content=self.get_content())
 			self.flags.new_file = True
@@ -409,6 +415,18 @@ class File(Document):
 		else:
 			self.file_name = re.sub(r"/", "", self.file_name)
 
+	def set_stats_from_disk(self):
+		"""Set size, type and content hash of a file that already exists at `file_url`."""
+		file_path = self.get_full_path()
+		self.file_size = os.path.getsize(file_path)
+		self.content_type = mimetypes.guess_type(self.file_name)[0]
+
+		content_hash = hashlib.md5(usedforsecurity=False)  # nosec
+		with open(file_path, "rb") as f:
+			while chunk := f.read(1024 * 1024):
+				content_hash.update(chunk)
+		self.content_hash = content_hash.hexdigest()
+
 	def generate_content_hash(self):
 		if self.content_hash or not self.file_url or self.is_remote_file:
 			return
@@ -0,0 +1,238 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+"""
+Columnar storage of prepared report results.
+
+Values of every column are stored in separately compressed blocks of `BLOCK_SIZE` rows, followed
+by an index of the blocks and the rest of the report result (columns, message, chart, etc.):
+
+	MAGIC | block | block | ... | index | index length (8 bytes) | MAGIC
+
+A page of rows, or the values of one column to sort or filter by, can be read without
+decompressing and parsing the whole result.
+
+Rows can be dicts or lists (like the total row). Values of list rows are stored in the columns of
+the report columns at the same position, so they are sorted and filtered like dict rows.
+"""
+
+import json
+import os
+import zlib
+from collections import Counter, OrderedDict
+from typing import BinaryIO
+
+import saashq
+from saashq.utils import cstr
+
+MAGIC = b"SQCOL1\n"
+BLOCK_SIZE = 10_000
+# decoded blocks kept in memory by a reader
+BLOCK_CACHE_SIZE = 64
+# stores the length of list rows, empty for dict rows
+LIST_ROW_KEY = "\x00list_row_length"
+
+_INDEX_LENGTH_SIZE = 8
+
+
+def is_columnar(content: bytes) -> bool:
+	return content.startswith(MAGIC)
+
+
+def write_columnar_result(data: dict, file: BinaryIO):
+	"""Write report result `data` (as returned by `generate_report_result`) to `file`."""
+	rows = data.get("result") or []
+	fieldnames = [
+		col.get("fieldname") if isinstance(col, dict) else None for col in data.get("columns") or []
+	]
+	# repeated fieldnames would collapse into one column, keep those by position
+	fieldname_count = Counter(fieldnames)
+	list_row_keys = [
+		fieldname if fieldname and fieldname_count[fieldname] == 1 else f"\x00{i}"
+		for i, fieldname in enumerate(fieldnames)
+	]
+
+	keys = {}
+	for row in rows:
+		if isinstance(row, dict):
+			keys.update(dict.fromkeys(row))
+		else:
+			for i in range(len(row)):
+				keys[get_list_row_key(list_row_keys, i)] = None
+	keys[LIST_ROW_KEY] = None
+
+	file.write(MAGIC)
+	offset = len(MAGIC)
+	blocks = {key: [] for key in keys}
+
+	for start in range(0, len(rows), BLOCK_SIZE):
+		block_rows = [
+			row if isinstance(row, dict) else get_list_row_as_dict(row, list_row_keys)
+			for row in rows[start : start + BLOCK_SIZE]
+		]
+		for key in keys:
+			values, missing = [], []
+			for i, row in enumerate(block_rows):
+				if key in row:
+					values.append(row[key])
+				else:
+					values.append(None)
+					missing.append(i)
+
+			block = zlib.compress(encode({"v": values, "m": missing}))
+			file.write(block)
+			blocks[key].append((offset, len(block)))
+			offset += len(block)
+
+	index = {
+		"row_count": len(rows),
+		"block_size": BLOCK_SIZE,
+		"keys": list(keys),
+		"list_row_keys": list_row_keys,
+		"blocks": blocks,
+		"data": {key: value for key, value in data.items() if key != "result"},
+	}
+	index = zlib.compress(encode(index))
+	file.write(index)
+	file.write(len(index).to_bytes(_INDEX_LENGTH_SIZE, "big"))
+	file.write(MAGIC)
+
+
+def get_list_row_key(list_row_keys: list[str], i: int) -> str:
+	return list_row_keys[i] if i < len(list_row_keys) else f"\x00{i}"
+
+
+def get_list_row_as_dict(row: list | tuple, list_row_keys: list[str]) -> dict:
+	d = {get_list_row_key(list_row_keys, i): value for i, value in enumerate(row)}
+	d[LIST_ROW_KEY] = len(row)
+	return d
+
+
+def encode(value) -> bytes:
+	return saashq.safe_encode(saashq.as_json(value, indent=None, separators=(",", ":")))
+
+
+class ColumnarResult:
+	"""Read rows and columns of a result written by `write_columnar_result` from `file`."""
+
+	def __init__(self, file: BinaryIO):
+		self.file = file
+		self._blocks = OrderedDict()
+
+		footer_size = _INDEX_LENGTH_SIZE + len(MAGIC)
+		file.seek(-footer_size, os.SEEK_END)
+		footer = file.read(footer_size)
+		if not footer.endswith(MAGIC):
+			raise ValueError("Not a columnar report result")
+
+		index_length = int.from_bytes(footer[:_INDEX_LENGTH_SIZE], "big")
+		file.seek(-(footer_size + index_length), os.SEEK_END)
+		self.index = json.loads(zlib.decompress(file.read(index_length)))
+
+		self.row_count: int = self.index["row_count"]
+		self.block_size: int = self.index["block_size"]
+		self.keys: list[str] = self.index["keys"]
+
+	@property
+	def columns(self) -> list:
+		return self.index["data"].get("columns") or []
+
+	def read_block(self, key: str, block_number: int) -> tuple[list, set[int]]:
+		"""Return values and offsets of rows without `key` of a block of a column."""
+		cache_key = (key, block_number)
+		if cache_key in self._blocks:
+			self._blocks.move_to_end(cache_key)
+			return self._blocks[cache_key]
+
+		offset, length = self.index["blocks"][key][block_number]
+		self.file.seek(offset)
+		block = json.loads(zlib.decompress(self.file.read(length)))
+		self._blocks[cache_key] = block = (block["v"], set(block["m"]))
+		if len(self._blocks) > BLOCK_CACHE_SIZE:
+			self._blocks.popitem(last=False)
+
+		return block
+
+	def read_column(self, key: str) -> list:
+		"""Return values of column `key` of all rows, `None` for rows without it."""
+		if key not in self.index["blocks"]:
+			return [None] * self.row_count
+
+		values = []
+		for block_number in range(len(self.index["blocks"][key])):
+			values.extend(self.read_block(key, block_number)[0])
+
+		return values
+
+	def get_rows(self, indexes: list[int]) -> list[dict | list]:
+		"""Return rows at `indexes`, in the order they are passed."""
+		rows = {}
+		for index in indexes:
+			if not 0 <= index < self.row_count:
+				raise IndexError(index)
+
+			rows[index] = {}
+
+		for key in self.keys:
+			for index, row in rows.items():
+				values, missing = self.read_block(key, index // self.block_size)
+				if (offset := index % self.block_size) not in missing:
+					row[key] = values[offset]
+
+		return [self.make_row(rows[index]) for index in indexes]
+
+	def iter_rows(self):
+		for start in range(0, self.row_count, self.block_size):
+			yield from self.get_rows(range(start, min(start + self.block_size, self.row_count)))
+
+	def make_row(self, row: dict) -> dict | list:
+		if (length := row.pop(LIST_ROW_KEY, None)) is None:
+			return row
+
+		list_row_keys = self.index["list_row_keys"]
+		return [row.get(get_list_row_key(list_row_keys, i)) for i in range(length)]
+
+	def get_page(
+		self,
+		start: int = 0,
+		page_length: int = 100,
+		sort_by: str | None = None,
+		sort_order: str = "asc",
+		filters: dict | None = None,
+	) -> dict:
+		"""Return a page of rows, after filtering and sorting all rows.
+
+		`filters` are `{column: value}`, rows match if the column contains the value (ignoring case).
+		Only the columns to filter and sort by are read completely."""
+		indexes = range(self.row_count)
+
+		for key, value in (filters or {}).items():
+			value = cstr(value).casefold()
+			column = self.read_column(key)
+			indexes = [i for i in indexes if value in cstr(column[i]).casefold()]
+
+		if sort_by:
+			# empty values last, in both orders
+			column = self.read_column(sort_by)
+			empty = [i for i in indexes if column[i] in (None, "")]
+			indexes = (
+				sorted(
+					(i for i in indexes if column[i] not in (None, "")),
+					key=lambda i: get_sort_key(column[i]),
+					reverse=sort_order == "desc",
+				)
+				+ empty
+			)
+
+		page = list(indexes[start : start + page_length])
+		return {"result": self.get_rows(page), "total_count": len(indexes), "start": start}
+
+	def as_dict(self) -> dict:
+		"""Return the whole result like it was written."""
+		return self.index["data"] | {"result": list(self.iter_rows())}
+
+
+def get_sort_key(value):
+	# numbers before text
+	if isinstance(value, int | float):
+		return (0, value)
+	return (1, cstr(value).casefold())
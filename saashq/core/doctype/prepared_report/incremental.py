@@ -0,0 +1,148 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+"""
+Incremental prepared reports.
+
+A standard script report whose rows belong to time windows can declare how to partition it, in its
+module:
+
+	prepared_report_partition = {
+		"from_filter": "from_date",
+		"to_filter": "to_date",
+		"period": "Monthly",  # Daily, Weekly or Monthly
+		# doctypes read by the report, with the date field their rows are partitioned by
+		"doctypes": {"GL Entry": "posting_date"},
+	}
+
+When it is prepared, the date range of the filters is split into windows of `period` which are
+executed and cached separately. A window is executed again only if the number of rows or the
+latest `modified` of any of the doctypes in it changed since it was cached. Rows of all windows are
+concatenated, the message, chart and report summary of windows are not merged.
+"""
+
+import hashlib
+import pickle
+import zlib
+from bisect import bisect_right
+
+import saashq
+from saashq.core.doctype.report.report import get_report_module_dotted_path
+from saashq.query_builder.functions import Count, Max
+from saashq.utils import add_days, cint, get_first_day_of_week, get_last_day, getdate
+
+PARTITION_CACHE_TTL = 7 * 24 * 60 * 60
+
+
+def get_partition_settings(report) -> saashq._dict | None:
+	"""Return `prepared_report_partition` declared in the module of `report`, if any."""
+	if report.report_type != "Script Report" or report.is_standard != "Yes":
+		return
+
+	module = report.module or saashq.db.get_value("DocType", report.ref_doctype, "module")
+	report_module = saashq.get_module(get_report_module_dotted_path(module, report.name))
+	if settings := getattr(report_module, "prepared_report_partition", None):
+		return saashq._dict(settings)
+
+
+def execute_incremental_report(report, filters, settings: saashq._dict) -> list | None:
+	"""Return columns and rows of `report`, only executing it for windows that changed.
+
+	Returns `None` if `filters` have no date range to partition."""
+	if not isinstance(filters, dict):
+		return
+
+	from_date, to_date = filters.get(settings.from_filter), filters.get(settings.to_filter)
+	if not (from_date and to_date):
+		return
+
+	partitions = get_partitions(from_date, to_date, settings.period or "Monthly")
+	watermarks = get_watermarks(settings.doctypes or {}, partitions)
+	key_prefix = get_cache_key_prefix(report, filters, settings)
+	expires_in_sec = cint(saashq.conf.prepared_report_partition_cache_ttl) or PARTITION_CACHE_TTL
+
+	columns, result = [], []
+	for (start, end), watermark in zip(partitions, watermarks, strict=True):
+		key = f"{key_prefix}:{start}:{end}"
+		cached = saashq.cache.get_value(key)
+		if cached and cached["watermark"] == watermark:
+			partition = pickle.loads(zlib.decompress(cached["result"]))
+		else:
+			partition_filters = filters | {settings.from_filter: str(start), settings.to_filter: str(end)}
+			partition = report.execute_script_report(partition_filters)[:2]
+			saashq.cache.set_value(
+				key,
+				{"watermark": watermark, "result": zlib.compress(pickle.dumps(partition))},
+				expires_in_sec=expires_in_sec,
+			)
+
+		columns = partition[0] or columns
+		result.extend(partition[1] or [])
+
+	return [columns, result]
+
+
+def get_partitions(from_date, to_date, period: str) -> list[tuple]:
+	"""Split the date range into windows of `period`, aligned to calendar weeks and months."""
+	if period not in ("Daily", "Weekly", "Monthly"):
+		saashq.throw(saashq._("Invalid partition period {0}").format(period))
+
+	start, to_date = getdate(from_date), getdate(to_date)
+	partitions = []
+	while start <= to_date:
+		if period == "Daily":
+			end = start
+		elif period == "Weekly":
+			end = add_days(get_first_day_of_week(start), 6)
+		else:
+			end = get_last_day(start)
+
+		end = min(end, to_date)
+		partitions.append((start, end))
+		start = add_days(end, 1)
+
+	return partitions
+
+
+def get_watermarks(doctypes: dict[str, str], partitions: list[tuple]) -> list[list[tuple]]:
+	"""Return number of rows and latest `modified` of each doctype in each window."""
+	watermarks = [[] for _ in partitions]
+	if not partitions:
+		return watermarks
+
+	starts = [start for start, _end in partitions]
+	from_date, to_date = partitions[0][0], partitions[-1][1]
+
+	for doctype, fieldname in sorted(doctypes.items()):
+		table = saashq.qb.DocType(doctype)
+		date_field = table[fieldname]
+		rows = (
+			saashq.qb.from_(table)
+			.select(date_field, Count("*"), Max(table.modified))
+			.where((date_field >= from_date) & (date_field < add_days(to_date, 1)))
+			.groupby(date_field)
+			.run()
+		)
+
+		counts = [[0, ""] for _ in partitions]
+		for date, count, modified in rows:
+			partition = counts[bisect_right(starts, getdate(date)) - 1]
+			partition[0] += count
+			partition[1] = max(partition[1], str(modified))
+
+		for watermark, (count, modified) in zip(watermarks, counts, strict=True):
+			watermark.append((doctype, count, modified))
+
+	return watermarks
+
+
+def get_cache_key_prefix(report, filters: dict, settings: saashq._dict) -> str:
+	other_filters = {
+		key: value for key, value in filters.items() if key not in (settings.from_filter, settings.to_filter)
+	}
+	digest = hashlib.sha256(
+		saashq.as_json(
+			[saashq.session.user, saashq.local.lang, settings.period, other_filters],
+			indent=None,
+		).encode()
+	).hexdigest()
+	return f"prepared_report_partition:{report.name}:{digest}"
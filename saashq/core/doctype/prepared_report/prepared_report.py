@@ -2,23 +2,34 @@
 # License: MIT. See LICENSE
 import gzip
 import json
-from contextlib import suppress
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from io import BytesIO
 from typing import Any
 
 from rq import get_current_job
 
 import saashq
+from saashq.core.doctype.prepared_report.columnar import (
+	MAGIC,
+	ColumnarResult,
+	encode,
+	is_columnar,
+	write_columnar_result,
+)
 from saashq.database.utils import dangerously_reconnect_on_connection_abort
 from saashq.desk.form.load import get_attachments
 from saashq.desk.query_report import generate_report_result
 from saashq.model.document import Document
 from saashq.monitor import add_data_to_monitor
-from saashq.utils import add_to_date, now
+from saashq.utils import add_to_date, cint, now
 from saashq.utils.background_jobs import enqueue
 
 # If prepared report runs for longer than this time it's automatically considered as failed
 FAILURE_THRESHOLD = 60 * 60
 REPORT_TIMEOUT = 25 * 60
+COLUMNAR_FILE_EXTENSION = ".columnar"
 
 
 class PreparedReport(Document):
@@ -80,14 +91,48 @@ class PreparedReport(Document):
 			enqueue_after_commit=True,
 		)
 
-	def get_prepared_data(self, with_file_name=False):
+	def get_attached_file(self):
 		if attachments := get_attachments(self.doctype, self.name):
-			attachment = attachments[0]
-			attached_file = saashq.get_doc("File", attachment.name)
+			return saashq.get_doc("File", attachments[0].name)
+
+	def get_prepared_data(self, with_file_name=False):
+		"""Return the prepared result as JSON."""
+		if attached_file := self.get_attached_file():
+			content = attached_file.get_content(encodings=())
+			if is_columnar(content):
+				content = encode(ColumnarResult(BytesIO(content)).as_dict())
+			else:
+				content = gzip.decompress(content)
 
 			if with_file_name:
-				return (gzip.decompress(attached_file.get_content()), attachment.file_name)
-			return gzip.decompress(attached_file.get_content())
+				return (content, attached_file.file_name)
+			return content
+
+	def load_prepared_data(self) -> dict | list | None:
+		"""Return the prepared result, columnar results are decompressed and parsed block by block."""
+		with self.open_prepared_result() as result:
+			if result:
+				return result.as_dict()
+
+		if data := self.get_prepared_data():
+			return json.loads(data)
+
+	@contextmanager
+	def open_prepared_result(self) -> Iterator[ColumnarResult | None]:
+		"""Open the prepared result for reading parts of it, `None` if it isn't stored as columns."""
+		attached_file = self.get_attached_file()
+		if not attached_file:
+			yield None
+			return
+
+		file_path = attached_file.get_full_path()
+		if os.path.exists(file_path):
+			file = open(file_path, "rb")
+		else:
+			file = BytesIO(attached_file.get_content(encodings=()))
+
+		with file:
+			yield ColumnarResult(file) if is_columnar(file.read(len(MAGIC))) else None
 
 
 def generate_report(prepared_report):
@@ -110,8 +155,10 @@ def generate_report(prepared_report):
 				if data:
 					report.custom_columns = data["columns"]
 
-		result = generate_report_result(report=report, filters=instance.filters, user=instance.owner)
-		create_json_gz_file(result, instance.doctype, instance.name, instance.report_name)
+		result = generate_report_result(
+			report=report, filters=instance.filters, user=instance.owner, incremental=True
+		)
+		create_columnar_file(result, instance.doctype, instance.name, instance.report_name)
 
 		instance.status = "Completed"
 	except Exception:
@@ -225,6 +272,29 @@ def delete_prepared_reports(reports):
 			prepared_report.delete(ignore_permissions=True, delete_permanently=True)
 
 
+def create_columnar_file(data, dt, dn, report_name):
+	"""Attach `data` stored by column, so that pages of it can be read without loading all of it."""
+	file_name = "{}_{}{}".format(
+		saashq.scrub(report_name),
+		saashq.utils.data.format_datetime(saashq.utils.now(), "Y-m-d-H-M"),
+		COLUMNAR_FILE_EXTENSION,
+	)
+	content = BytesIO()
+	write_columnar_result(data, content)
+
+	_file = saashq.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"attached_to_doctype": dt,
+			"attached_to_name": dn,
+			"content": content.getvalue(),
+			"is_private": 1,
+		}
+	)
+	_file.save(ignore_permissions=True)
+
+
 def create_json_gz_file(data, dt, dn, report_name):
 	# Storing data in CSV file causes information loss
 	# Reports like P&L Statement were completely unsuable because of this
@@ -255,11 +325,44 @@ def download_attachment(dn):
 		saashq.throw(saashq._("Cannot Download Report due to insufficient permissions"))
 
 	data, file_name = pr.get_prepared_data(with_file_name=True)
-	saashq.local.response.filename = file_name[:-3]
+	if file_name.endswith(COLUMNAR_FILE_EXTENSION):
+		saashq.local.response.filename = file_name.removesuffix(COLUMNAR_FILE_EXTENSION) + ".json"
+	else:
+		saashq.local.response.filename = file_name[:-3]
 	saashq.local.response.filecontent = data
 	saashq.local.response.type = "binary"
 
 
+@saashq.whitelist()
+def get_prepared_report_page(dn, start=0, page_length=100, sort_by=None, sort_order="asc", filters=None):
+	"""Return a page of rows of a prepared report, after filtering and sorting all of them.
+
+	`filters` are `{fieldname: value}`, rows match if the column contains the value."""
+	pr = saashq.get_doc("Prepared Report", dn)
+	if not pr.has_permission("read"):
+		saashq.throw(saashq._("Insufficient permissions to read Prepared Report {0}").format(dn))
+
+	if sort_order not in ("asc", "desc"):
+		saashq.throw(saashq._("Sort order must be asc or desc"))
+
+	with pr.open_prepared_result() as result:
+		if not result:
+			# result prepared before results were stored by column
+			data = pr.load_prepared_data() or {}
+			content = BytesIO()
+			write_columnar_result({"result": data} if isinstance(data, list) else data, content)
+			result = ColumnarResult(content)
+
+		page = result.get_page(
+			start=cint(start),
+			page_length=cint(page_length),
+			sort_by=sort_by,
+			sort_order=sort_order,
+			filters=saashq.parse_json(filters) or {},
+		)
+		return page | {"columns": result.columns}
+
+
 def get_permission_query_condition(user):
 	if not user:
 		user = saashq.session.user
@@ -3,12 +3,18 @@
 import json
 import time
 from contextlib import contextmanager
+from io import BytesIO
+from unittest.mock import patch
 
 import saashq
-from saashq.desk.query_report import generate_report_result, get_report_doc
+from saashq.core.doctype.prepared_report.columnar import ColumnarResult, write_columnar_result
+from saashq.core.doctype.prepared_report.incremental import execute_incremental_report, get_partitions
+from saashq.core.doctype.prepared_report.prepared_report import get_prepared_report_page
+from saashq.desk.query_report import generate_report_result, get_prepared_report_result, get_report_doc
 from saashq.query_builder.utils import db_type_is
 from saashq.tests import IntegrationTestCase, UnitTestCase, timeout
 from saashq.tests.test_query_builder import run_only_if
+from saashq.utils import getdate
 
 
 class UnitTestPreparedReport(UnitTestCase):
@@ -17,7 +23,53 @@ class UnitTestPreparedReport(UnitTestCase):
 	Use this class for testing individual functions and methods.
 	"""
 
-	pass
+	def test_columnar_result(self):
+		data = {
+			"columns": [{"fieldname": "item", "label": "Item"}, {"fieldname": "qty", "label": "Qty"}],
+			"result": [
+				{"item": "b", "qty": 2},
+				{"item": "A", "qty": 10, "indent": 1},
+				{"item": "c"},
+				{"item": "ab", "qty": None},
+				["Total", 12],
+			],
+			"message": "message",
+		}
+		content = BytesIO()
+		with patch("saashq.core.doctype.prepared_report.columnar.BLOCK_SIZE", 2):
+			write_columnar_result(data, content)
+
+		result = ColumnarResult(content)
+		self.assertEqual(result.row_count, 5)
+		self.assertEqual(result.as_dict(), data)
+		self.assertEqual(result.get_rows([4, 1]), [["Total", 12], {"item": "A", "qty": 10, "indent": 1}])
+		self.assertEqual(result.read_column("qty"), [2, 10, None, None, 12])
+
+		page = result.get_page(page_length=2, sort_by="qty", sort_order="desc", filters={"item": "a"})
+		self.assertEqual(page["total_count"], 3)
+		self.assertEqual(page["result"], [["Total", 12], {"item": "A", "qty": 10, "indent": 1}])
+
+		page = result.get_page(start=1, page_length=10, sort_by="item")
+		self.assertEqual(page["total_count"], 5)
+		self.assertEqual(page["result"][0], {"item": "ab", "qty": None})
+
+	def test_columnar_result_with_repeated_fieldnames(self):
+		data = {"columns": [{"fieldname": "a"}, {"fieldname": "a"}, "b"], "result": [[1, 2, 3]]}
+		content = BytesIO()
+		write_columnar_result(data, content)
+		self.assertEqual(ColumnarResult(content).as_dict(), data)
+
+	def test_partitions(self):
+		self.assertEqual(
+			get_partitions("2024-01-15", "2024-03-10", "Monthly"),
+			[
+				(getdate("2024-01-15"), getdate("2024-01-31")),
+				(getdate("2024-02-01"), getdate("2024-02-29")),
+				(getdate("2024-03-01"), getdate("2024-03-10")),
+			],
+		)
+		self.assertEqual(len(get_partitions("2024-01-15", "2024-03-10", "Daily")), 56)
+		self.assertEqual(get_partitions("2024-03-10", "2024-01-15", "Daily"), [])
 
 
 class TestPreparedReport(IntegrationTestCase):
@@ -72,6 +124,57 @@ class TestPreparedReport(IntegrationTestCase):
 		self.assertEqual(len(prepared_data["result"]), len(generated_data["result"]))
 		self.assertEqual(len(prepared_data), len(generated_data))
 
+	def test_prepared_report_page(self):
+		doc = self.create_prepared_report()
+		self.wait_for_status(doc, "Completed")
+
+		prepared_data = doc.load_prepared_data()
+		page = get_prepared_report_page(doc.name, start=1, page_length=2, sort_by="table")
+		self.assertEqual(page["total_count"], len(prepared_data["result"]))
+		self.assertEqual(len(page["result"]), 2)
+		self.assertEqual(len(page["columns"]), len(prepared_data["columns"]))
+
+		table_names = sorted(row["table"].casefold() for row in prepared_data["result"])
+		self.assertEqual([row["table"].casefold() for row in page["result"]], table_names[1:3])
+
+	def test_paged_prepared_report_result(self):
+		doc = self.create_prepared_report()
+		self.wait_for_status(doc, "Completed")
+
+		report = get_report_doc("Database Storage Usage By Tables")
+		prepared_data = doc.load_prepared_data()
+		paged_data = get_prepared_report_result(report, {}, doc.name, page_length=2)
+
+		# first page and the total row
+		self.assertEqual(paged_data["total_count"], len(prepared_data["result"]) - 1)
+		self.assertEqual(paged_data["result"], prepared_data["result"][:2] + prepared_data["result"][-1:])
+
+	def test_incremental_report(self):
+		settings = saashq._dict(
+			from_filter="from_date", to_filter="to_date", period="Monthly", doctypes={"ToDo": "date"}
+		)
+		executed = []
+
+		def execute_script_report(filters):
+			executed.append(filters["from_date"])
+			return [["date"], [[filters["from_date"]]]]
+
+		report = saashq._dict(name=saashq.generate_hash(), execute_script_report=execute_script_report)
+		filters = {"from_date": "2024-01-15", "to_date": "2024-03-10", "status": "Open"}
+
+		columns, result = execute_incremental_report(report, filters, settings)
+		self.assertEqual(executed, ["2024-01-15", "2024-02-01", "2024-03-01"])
+		self.assertEqual(result, [["2024-01-15"], ["2024-02-01"], ["2024-03-01"]])
+
+		# unchanged windows are read from cache
+		executed.clear()
+		self.assertEqual(execute_incremental_report(report, filters, settings), [columns, result])
+		self.assertEqual(executed, [])
+
+		saashq.get_doc(doctype="ToDo", description="Incremental report", date="2024-02-20").insert()
+		execute_incremental_report(report, filters, settings)
+		self.assertEqual(executed, ["2024-02-01"])
+
 	@run_only_if(db_type_is.MARIADB)
 	def test_start_status_and_kill_jobs(self):
 		with test_report(report_type="Query Report", query="select sleep(10)") as report:
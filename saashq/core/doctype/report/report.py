@@ -44,7 +44,9 @@ class Report(Document):
 		report_name: DF.Data
 		report_script: DF.Code | None
 		report_type: DF.Literal["Report Builder", "Query Report", "Script Report", "Custom Report"]
+		result_cache_ttl: DF.Int
 		roles: DF.Table[HasRole]
+		share_cached_results: DF.Check
 		timeout: DF.Int
 	# end: auto-generated types
 
@@ -80,6 +82,7 @@ class Report(Document):
 
 	def on_update(self):
 		self.export_doc()
+		saashq.cache.delete_value(saashq.desk.query_report.REPORT_RESULT_CACHE_DOCTYPES_KEY)
 
 	def before_export(self, doc):
 		doc.letterhead = None
@@ -94,6 +97,7 @@ class Report(Document):
 		):
 			saashq.throw(_("You are not allowed to delete Standard Report"))
 		delete_custom_role("report", self.name)
+		saashq.cache.delete_value(saashq.desk.query_report.REPORT_RESULT_CACHE_DOCTYPES_KEY)
 
 	def get_permission_log_options(self, event=None):
 		return {"fields": ["roles"]}
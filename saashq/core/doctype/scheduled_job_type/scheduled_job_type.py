@@ -13,7 +13,7 @@ import saashq
 from saashq import _
 from saashq.model.document import Document
 from saashq.utils import get_datetime, now_datetime
-from saashq.utils.background_jobs import enqueue, is_job_enqueued
+from saashq.utils.background_jobs import EnqueueBatch, enqueue, is_job_enqueued
 
 
 class ScheduledJobType(Document):
@@ -64,11 +64,13 @@ class ScheduledJobType(Document):
 					title=_("Bad Cron Expression"),
 				)
 
-	def enqueue(self, force=False) -> bool:
+	def enqueue(self, force=False, batch: EnqueueBatch | None = None) -> bool:
+		"""Enqueue the job if it is due, or add it to `batch` to be enqueued with other jobs."""
 		# enqueue event if last execution is done
 		if self.is_event_due() or force:
 			if not self.is_job_in_queue():
-				enqueue(
+				enqueue_job = batch.add if batch is not None else enqueue
+				enqueue_job(
 					"saashq.core.doctype.scheduled_job_type.scheduled_job_type.run_scheduled_job",
 					queue=self.get_queue_name(),
 					job_type=self.method,  # Not actually used, kept for logging
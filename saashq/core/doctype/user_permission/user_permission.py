@@ -5,6 +5,7 @@ import json
 
 import saashq
 from saashq import _
+from saashq.cache_manager import clear_match_conditions_cache
 from saashq.core.utils import find
 from saashq.desk.form.linked_with import get_linked_doctypes
 from saashq.model.document import Document
@@ -35,10 +36,12 @@ class UserPermission(Document):
 
 	def on_update(self):
 		saashq.cache.hdel("user_permissions", self.user)
+		clear_match_conditions_cache(self.user)
 		saashq.publish_realtime("update_user_permissions", user=self.user, after_commit=True)
 
 	def on_trash(self):
 		saashq.cache.hdel("user_permissions", self.user)
+		clear_match_conditions_cache(self.user)
 		saashq.publish_realtime("update_user_permissions", user=self.user, after_commit=True)
 
 	def validate_user_permission(self):
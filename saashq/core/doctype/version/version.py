@@ -68,6 +68,17 @@ class Version(Document):
 	def get_data(self):
 		return json.loads(self.data)
 
+	def deferred_insert_after_commit(self) -> None:
+		"""Push to the deferred insert queue once the current transaction is committed.
+
+		Used for doctypes with "Track Changes in Background", these versions are written in bulk by
+		`saashq.deferred_insert.save_to_db` in order of their creation."""
+		from saashq.deferred_insert import deferred_insert
+
+		self.set_user_and_timestamp()
+		record = self.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True)
+		saashq.db.after_commit.add(lambda: deferred_insert(self.doctype, [record]))
+
 
 def get_diff(old, new, for_child=False, compare_cancelled=False):
 	"""Get diff between 2 document objects
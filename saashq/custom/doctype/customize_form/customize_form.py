@@ -46,6 +46,7 @@ class CustomizeForm(Document):
 		default_email_template: DF.Link | None
 		default_print_format: DF.Link | None
 		default_view: DF.Literal[None]
+		defer_version_tracking: DF.Check
 		doc_type: DF.Link | None
 		editable_grid: DF.Check
 		email_append_to: DF.Check
@@ -727,6 +728,7 @@ doctype_properties = {
 	"max_attachments": "Int",
 	"make_attachments_public": "Check",
 	"track_changes": "Check",
+	"defer_version_tracking": "Check",
 	"track_views": "Check",
 	"allow_auto_repeat": "Check",
 	"allow_import": "Check",
@@ -18,6 +18,8 @@ from pypika.dialects import MySQLQueryBuilder, PostgreSQLQueryBuilder
 import saashq
 import saashq.defaults
 from saashq import _
+from saashq.database import query_cache
+from saashq.database.rows import to_rows
 from saashq.database.utils import (
 	DefaultOrderBy,
 	EmptyQueryValues,
@@ -48,6 +50,9 @@ MULTI_WORD_PATTERN = re.compile(r'([`"])(tab([A-Z]\w+)( [A-Z]\w+)+)\1')
 
 SQL_ITERATOR_BATCH_SIZE = 100
 
+# statements that commit implicitly, tables they change are invalidated in the query cache right away
+QUERY_CACHE_DDL = ("alter", "drop", "create", "truncate", "rename")
+
 
 TRANSACTION_DISABLED_MSG = """Commit/rollback are disabled during certain events. This command will
 be ignored. Commit/Rollback from here WILL CAUSE very hard to debug problems with atomicity and
@@ -96,6 +101,10 @@ class Database:
 		self.auto_commit_on_many_writes = 0
 
 		self.value_cache = {}
+		# tables written in the current transaction, their cached query results are invalidated on commit
+		self.touched_tables: set[str] = set()
+		# commit sequence of the query cache before the current transaction's first query
+		self.query_cache_snapshot: int | None = None
 		self.logger = saashq.logger("database")
 		self.logger.setLevel("WARNING")
 
@@ -142,6 +151,10 @@ class Database:
 	def get_database_size(self):
 		raise NotImplementedError
 
+	def get_replication_lag(self) -> float | None:
+		"""Return seconds this replica is behind its primary, 0 if it isn't a replica and `None` if unknown."""
+		raise NotImplementedError
+
 	def _transform_query(self, query: Query, values: QueryValues) -> tuple:
 		return query, values
 
@@ -166,6 +179,8 @@ class Database:
 		run=True,
 		pluck=False,
 		as_iterator=False,
+		cache=False,
+		as_rows=False,
 	):
 		"""Execute a SQL query and fetch all rows.
 
@@ -183,6 +198,10 @@ class Database:
 		:param as_iterator: Returns iterator over results instead of fetching all results at once.
 		        This should be used with unbuffered cursor as default cursors used by pymysql and postgres
 		        buffer the results internally. See `Database.unbuffered_cursor`.
+		:param cache: Use results cached across requests if the query cache is enabled for the site.
+		        See `saashq.database.query_cache`.
+		:param as_rows: Return compact, read-only rows accessible by key and attribute like dicts.
+		        See `saashq.database.rows`.
 		Examples:
 
 		        # return customer names as dicts
@@ -210,11 +229,27 @@ class Database:
 		# replaces ifnull in query with coalesce
 		query = IFNULL_PATTERN.sub("coalesce(", query)
 
+		if cache and not (debug or as_iterator) and query_cache.is_enabled():
+			if tables := self.get_cacheable_query_tables(query):
+				return self._sql_cached(
+					query,
+					values,
+					tables,
+					as_dict=as_dict,
+					as_list=as_list,
+					update=update,
+					pluck=pluck,
+					as_rows=as_rows,
+				)
+
 		if not self._conn:
 			self.connect()
 
 		# in transaction validations
 		self.check_transaction_status(query)
+		if query_cache.is_enabled():
+			self.log_transaction_tables(query)
+			self.take_query_cache_snapshot(query)
 		self.clear_db_table_cache(query)
 
 		if auto_commit:
@@ -278,6 +313,9 @@ class Database:
 
 		self.log_query(query, values, debug, explain)
 
+		if self.touched_tables:
+			self.flush_touched_tables(query)
+
 		if auto_commit:
 			self.commit()
 
@@ -285,7 +323,9 @@ class Database:
 			return ()
 
 		if as_iterator:
-			return self._return_as_iterator(pluck=pluck, as_dict=as_dict, as_list=as_list, update=update)
+			return self._return_as_iterator(
+				pluck=pluck, as_dict=as_dict, as_list=as_list, update=update, as_rows=as_rows
+			)
 
 		last_result = self._transform_result(self._cursor.fetchall())
 		if pluck:
@@ -294,7 +334,11 @@ class Database:
 			return last_result
 
 		# scrub output if required
-		if as_dict:
+		if as_rows:
+			columns = [column[0] for column in self._cursor.description]
+			last_result = to_rows(columns, last_result, update)
+
+		elif as_dict:
 			last_result = self.fetch_as_dict(last_result)
 			if update:
 				for r in last_result:
@@ -306,12 +350,84 @@ class Database:
 		self._clean_up()
 		return last_result
 
-	def _return_as_iterator(self, *, pluck, as_dict, as_list, update):
+	def _sql_cached(self, query, values, tables, *, as_dict, as_list, update, pluck, as_rows):
+		"""Run a read query through `saashq.database.query_cache`."""
+
+		def run_query():
+			rows = self.sql(query, values)
+			columns = [column[0] for column in self._cursor.description] if rows else []
+			return columns, tuple(tuple(row) for row in rows)
+
+		columns, rows = query_cache.get_result(
+			query, values, tables, run_query, lambda: self.query_cache_snapshot
+		)
+
+		if pluck:
+			return [row[0] for row in rows]
+
+		if as_rows:
+			return to_rows(columns, rows, update)
+
+		if as_dict:
+			result = [saashq._dict(zip(columns, row, strict=False)) for row in rows]
+			if update:
+				for row in result:
+					row.update(update)
+			return result
+
+		if as_list:
+			return [list(row) for row in rows]
+
+		return rows
+
+	def get_cacheable_query_tables(self, query: str) -> set[str] | None:
+		"""Return tables read by `query` if its result can be shared through the query cache."""
+		if not is_query_type(query, ("select", "with")):
+			return None
+
+		lowered_query = query.lower()
+		if "for update" in lowered_query or "lock in share mode" in lowered_query:
+			return None
+
+		tables = self.get_query_tables(query)
+		if not tables or tables & self.touched_tables:
+			# uncommitted writes of this transaction must neither be cached nor hidden
+			return None
+
+		return tables
+
+	def log_transaction_tables(self, query: str):
+		if is_query_type(query, ("insert", "update", "delete", "replace", *QUERY_CACHE_DDL)):
+			self.touched_tables.update(self.get_query_tables(query))
+
+	def take_query_cache_snapshot(self, query: str):
+		"""Note the commit sequence of the query cache before the transaction reads anything."""
+		if is_query_type(query, ("start", "begin", "commit", "rollback")):
+			if "savepoint" not in query.lower():
+				self.query_cache_snapshot = None
+
+		elif self.query_cache_snapshot is None:
+			self.query_cache_snapshot = query_cache.get_commit_sequence()
+
+	def flush_touched_tables(self, query: str):
+		"""Invalidate cached results of tables written by the transaction once it is committed."""
+		if is_query_type(query, ("commit", *QUERY_CACHE_DDL)):
+			query_cache.bump_table_versions(self.touched_tables)
+			self.touched_tables.clear()
+
+		elif is_query_type(query, "rollback") and "savepoint" not in query.lower():
+			self.touched_tables.clear()
+
+	def _return_as_iterator(self, *, pluck, as_dict, as_list, update, as_rows=False):
 		while result := self._transform_result(self._cursor.fetchmany(SQL_ITERATOR_BATCH_SIZE)):
 			if pluck:
 				for row in result:
 					yield row[0]
 
+			elif as_rows:
+				columns = [column[0] for column in self._cursor.description]
+				yield from to_rows(columns, result, update)
+
 			elif as_dict:
 				keys = [column[0] for column in self._cursor.description]
 				for row in result:
@@ -324,7 +440,9 @@ class Database:
 				for row in result:
 					yield list(row)
 			else:
-				saashq.throw(_("`as_iterator` only works with `as_list=True` or `as_dict=True`"))
+				saashq.throw(
+					_("`as_iterator` only works with `as_list=True`, `as_dict=True` or `as_rows=True`")
+				)
 
 		self._clean_up()
 
@@ -501,7 +619,8 @@ class Database:
 		:param as_dict: Return values as dict.
 		:param debug: Print query in error log.
 		:param order_by: Column to order by
-		:param cache: Use cached results fetched during current job/request
+		:param cache: Use cached results fetched during current job/request, or across requests
+		        if the query cache is enabled for the site (see `saashq.database.query_cache`).
 		:param pluck: pluck first column instead of returning as nested list or dict.
 		:param for_update: All the affected/read rows will be locked.
 		:param skip_locked: Skip selecting currently locked rows.
@@ -615,7 +734,7 @@ class Database:
 					for_update=for_update,
 					skip_locked=skip_locked,
 					wait=True,
-				).run(debug=debug, run=run, as_dict=as_dict, pluck=pluck)
+				).run(debug=debug, run=run, as_dict=as_dict, pluck=pluck, cache=cache)
 			else:
 				out = {}
 		else:
@@ -638,7 +757,9 @@ class Database:
 					)
 					if isinstance(fieldname, str) and fieldname == "*":
 						as_dict = True
-					out = query.run(as_dict=as_dict, debug=debug, update=update, run=run, pluck=pluck)
+					out = query.run(
+						as_dict=as_dict, debug=debug, update=update, run=run, pluck=pluck, cache=cache
+					)
 
 				except Exception as e:
 					if ignore and (
@@ -1268,13 +1389,18 @@ class Database:
 			# and are continued with multiple words that start with a captital letter
 			# e.g. 'tabXxx' or 'tabXxx Xxx' or 'tabXxx Xxx Xxx' and so on
 
-			tables = []
-			for regex in (SINGLE_WORD_PATTERN, MULTI_WORD_PATTERN):
-				tables += [groups[1] for groups in regex.findall(query)]
-
 			if saashq.flags.touched_tables is None:
 				saashq.flags.touched_tables = set()
-			saashq.flags.touched_tables.update(tables)
+			saashq.flags.touched_tables.update(self.get_query_tables(query))
+
+	@staticmethod
+	def get_query_tables(query: str) -> set[str]:
+		"""Return names of all `tabXxx` tables mentioned in `query`."""
+		tables = set()
+		for regex in (SINGLE_WORD_PATTERN, MULTI_WORD_PATTERN):
+			tables.update(groups[1] for groups in regex.findall(query))
+
+		return tables
 
 	def bulk_insert(
 		self,
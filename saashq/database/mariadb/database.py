@@ -2,7 +2,7 @@ import re
 from contextlib import contextmanager
 
 import pymysql
-from pymysql.constants import ER, FIELD_TYPE
+from pymysql.constants import CR, ER, FIELD_TYPE
 from pymysql.converters import conversions, escape_string
 
 import saashq
@@ -61,6 +61,10 @@ class MariaDBExceptionUtil:
 	def is_access_denied(e: pymysql.Error) -> bool:
 		return e.args[0] == ER.ACCESS_DENIED_ERROR
 
+	@staticmethod
+	def is_missing_privilege(e: pymysql.Error) -> bool:
+		return e.args[0] == ER.SPECIFIC_ACCESS_DENIED_ERROR
+
 	@staticmethod
 	def cant_drop_field_or_key(e: pymysql.Error) -> bool:
 		return e.args[0] == ER.CANT_DROP_FIELD_OR_KEY
@@ -101,6 +105,15 @@ class MariaDBExceptionUtil:
 	def is_interface_error(e: pymysql.Error):
 		return isinstance(e, pymysql.InterfaceError)
 
+	@staticmethod
+	def is_connection_error(e: Exception) -> bool:
+		"""Return True if the server couldn't be reached or the connection was lost."""
+		if isinstance(e, pymysql.InterfaceError):
+			return True
+
+		code = e.args[0] if isinstance(e, pymysql.OperationalError) and e.args else None
+		return code in (CR.CR_CONN_HOST_ERROR, CR.CR_SERVER_GONE_ERROR, CR.CR_SERVER_LOST)
+
 
 class MariaDBConnectionUtil:
 	def get_connection(self):
@@ -214,6 +227,29 @@ class MariaDBDatabase(MariaDBConnectionUtil, MariaDBExceptionUtil, Database):
 
 		return db_size[0].get("database_size")
 
+	def get_replication_lag(self) -> float | None:
+		try:
+			status = self.sql("SHOW SLAVE STATUS", as_dict=True)
+		except pymysql.Error as e:
+			if not self.is_missing_privilege(e):
+				raise
+
+			saashq.logger("database").warning(
+				f"Replication lag of {self.host} is unknown, "
+				"its database user needs the REPLICATION CLIENT privilege to check it"
+			)
+			return None
+
+		if not status:
+			return 0
+
+		lags = [row.get("Seconds_Behind_Master") for row in status]
+		if None in lags:
+			# replication is stopped or broken
+			return None
+
+		return float(max(lags))
+
 	def log_query(self, query, values, debug, explain):
 		self.last_query = self._cursor._executed
 		self._log_query(self.last_query, debug, explain, query)
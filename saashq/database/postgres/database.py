@@ -122,6 +122,14 @@ class PostgresExceptionUtil:
 	def is_interface_error(e):
 		return isinstance(e, InterfaceError)
 
+	@staticmethod
+	def is_connection_error(e):
+		"""Return True if the server couldn't be reached or the connection was lost."""
+		# errors raised by libpq, not the server, have no error code
+		return isinstance(e, InterfaceError) or (
+			isinstance(e, psycopg2.OperationalError) and getattr(e, "pgcode", None) is None
+		)
+
 
 class PostgresDatabase(PostgresExceptionUtil, Database):
 	REGEX_CHARACTER = "~"
@@ -225,6 +233,14 @@ class PostgresDatabase(PostgresExceptionUtil, Database):
 		)
 		return db_size[0].get("database_size")
 
+	def get_replication_lag(self) -> float | None:
+		lag = self.sql(
+			"""SELECT CASE WHEN pg_is_in_recovery()
+				THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+				ELSE 0 END"""
+		)[0][0]
+		return None if lag is None else float(lag)
+
 	def _transform_result(self, result: list[tuple] | tuple[tuple]) -> tuple[tuple]:
 		return tuple(result) if isinstance(result, list) else result
 
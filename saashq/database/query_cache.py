@@ -0,0 +1,113 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+"""
+Shared (cross-request) cache for results of read queries.
+
+Every commit of a transaction that wrote to tables (see `Database.touched_tables`) increments a
+commit sequence in redis, and sets the version of the written tables to it. A cached result is
+stored along with the versions of all tables its query reads and is only returned while none of
+those versions has changed, so writes invalidate exactly the results that read the written tables.
+
+A transaction notes the commit sequence before its first query (`Database.query_cache_snapshot`).
+Its results are only stored if no table they read was committed to after that: with repeatable
+reads, the transaction may not see those commits.
+
+Enable it for a site with `"enable_query_cache": 1` in `site_config.json`, then pass
+`cache=True` to `saashq.db.get_value`, `saashq.db.get_values`, `saashq.get_all`,
+`saashq.get_list` or `saashq.db.sql`. Entries expire after `query_cache_ttl` seconds
+(default: 10 minutes).
+
+Results are never cached (or returned from cache) for locking reads or for queries reading a
+table that the current transaction has written to.
+"""
+
+import hashlib
+from contextlib import suppress
+
+import redis
+
+import saashq
+from saashq.database.utils import EmptyQueryValues
+
+QUERY_CACHE_TTL = 10 * 60
+VERSION_KEY_PREFIX = "query_cache::table_version::"
+RESULT_KEY_PREFIX = "query_cache::result::"
+COMMIT_SEQUENCE_KEY = "query_cache::commit_sequence"
+
+# versions are set atomically with incrementing the sequence, so they never go back
+BUMP_TABLE_VERSIONS_SCRIPT = """
+local sequence = redis.call("INCR", KEYS[1])
+for i = 2, #KEYS do
+	redis.call("SET", KEYS[i], sequence)
+end
+return sequence
+"""
+
+
+def is_enabled() -> bool:
+	return bool(saashq.conf.enable_query_cache)
+
+
+def get_table_versions(tables: tuple[str, ...]) -> tuple[int, ...] | None:
+	"""Return versions of `tables`, `None` if redis is unreachable."""
+	try:
+		versions = saashq.cache.mget([saashq.cache.make_key(VERSION_KEY_PREFIX + table) for table in tables])
+	except redis.exceptions.ConnectionError:
+		return None
+
+	return tuple(int(v or 0) for v in versions)
+
+
+def get_commit_sequence() -> int | None:
+	"""Return the commit sequence, `None` if redis is unreachable."""
+	try:
+		return int(saashq.cache.get(saashq.cache.make_key(COMMIT_SEQUENCE_KEY)) or 0)
+	except redis.exceptions.ConnectionError:
+		return None
+
+
+def bump_table_versions(tables: set[str]) -> None:
+	"""Invalidate cached results of all queries reading any of `tables`.
+
+	Skipped if redis is unreachable, results it still holds expire after `query_cache_ttl`."""
+	keys = [saashq.cache.make_key(VERSION_KEY_PREFIX + table) for table in tables]
+	with suppress(redis.exceptions.ConnectionError):
+		saashq.cache.eval(
+			BUMP_TABLE_VERSIONS_SCRIPT, len(keys) + 1, saashq.cache.make_key(COMMIT_SEQUENCE_KEY), *keys
+		)
+
+
+def get_result(query: str, values, tables: set[str], run_query, get_snapshot):
+	"""Return `(columns, rows)` of `query` from cache, `run_query` is called on a miss.
+
+	`run_query` should execute the query and return `(columns, rows)`, `get_snapshot` should return
+	the commit sequence noted by the transaction that ran it."""
+	tables = tuple(sorted(tables))
+	key = _get_result_key(query, values)
+	# versions are read before running the query: a commit that happens in between makes the
+	# stored entry stale right away instead of serving old rows with new versions.
+	versions = get_table_versions(tables)
+	if versions is None:
+		return run_query()
+
+	cached = saashq.cache.get_value(key, expires=True)
+	if cached and cached[0] == versions:
+		return cached[1], cached[2]
+
+	columns, rows = run_query()
+	snapshot = get_snapshot()
+	if snapshot is not None and max(versions, default=0) <= snapshot:
+		saashq.cache.set_value(
+			key,
+			(versions, columns, rows),
+			expires_in_sec=saashq.conf.query_cache_ttl or QUERY_CACHE_TTL,
+		)
+	return columns, rows
+
+
+def _get_result_key(query: str, values) -> str:
+	if values is EmptyQueryValues:
+		values = None
+
+	digest = hashlib.sha256(repr((query, values)).encode()).hexdigest()
+	return RESULT_KEY_PREFIX + digest
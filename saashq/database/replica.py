@@ -0,0 +1,109 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+"""
+Route read only work to a pool of read replicas.
+
+Functions decorated with `@saashq.read_only()` (report view, query reports, prepared reports)
+run on a replica when `read_from_replica` is set in site config. Replicas are configured with:
+
+	"replica_hosts": ["10.0.0.2", {"host": "10.0.0.3", "port": 3307}],
+	"replica_max_lag": 30,
+
+`replica_host` / `replica_db_port` still work for a single replica. A replica is skipped if a
+connection can't be made or, when `replica_max_lag` (seconds) is set, if it lags behind the
+primary by more than that or its lag can't be determined. If no replica is usable, or the
+connection to the replica is lost while the work runs, it runs on the primary.
+
+Health of every replica is remembered per process for `REPLICA_HEALTH_CHECK_INTERVAL` seconds
+so that the check doesn't add a query to every request.
+"""
+
+import random
+import time
+
+import saashq
+
+REPLICA_HEALTH_CHECK_INTERVAL = 10
+
+# (db_name, host, port) -> (checked at, healthy)
+_replica_health: dict[tuple, tuple[float, bool]] = {}
+
+
+def get_replica_db():
+	"""Return a connection to a healthy replica, `None` if the primary should be used."""
+	from saashq.database import get_db
+
+	conf = saashq.local.conf
+	user, password = conf.db_user, conf.db_password
+	if conf.different_credentials_for_replica:
+		user = conf.replica_db_user or conf.replica_db_name
+		password = conf.replica_db_password
+
+	replicas = get_replicas()
+	random.shuffle(replicas)
+
+	for host, port in replicas:
+		key = (conf.db_name, host, port)
+		checked_at, healthy = _replica_health.get(key, (0, True))
+		if not healthy and time.monotonic() - checked_at < REPLICA_HEALTH_CHECK_INTERVAL:
+			continue
+
+		db = get_db(socket=None, host=host, port=port, user=user, password=password, cur_db_name=conf.db_name)
+		# replication lag of a recently checked replica isn't checked again, it is only connected to
+		recently_checked = time.monotonic() - checked_at < REPLICA_HEALTH_CHECK_INTERVAL
+		if is_replica_healthy(db, host, check_lag=not recently_checked):
+			if not recently_checked:
+				_replica_health[key] = (time.monotonic(), True)
+			return db
+
+		_replica_health[key] = (time.monotonic(), False)
+		db.close()
+
+	return None
+
+
+def get_replicas() -> list[tuple[str, int | None]]:
+	"""Return `(host, port)` of all configured replicas."""
+	conf = saashq.local.conf
+	replicas = []
+
+	for replica in conf.replica_hosts or [conf.replica_host]:
+		if not replica:
+			continue
+
+		if isinstance(replica, dict):
+			replicas.append((replica.get("host"), replica.get("port") or conf.replica_db_port))
+		else:
+			replicas.append((replica, conf.replica_db_port))
+
+	return replicas
+
+
+def mark_replica_unhealthy(db):
+	"""Skip the replica `db` is connected to until its health is checked again."""
+	_replica_health[(db.cur_db_name, db.host, db.port)] = (time.monotonic(), False)
+
+
+def is_replica_healthy(db, host: str, check_lag: bool = True) -> bool:
+	"""Connect to the replica and check its replication lag if `replica_max_lag` is set."""
+	max_lag = saashq.local.conf.replica_max_lag if check_lag else None
+
+	try:
+		if max_lag is None:
+			db.connect()
+			return True
+
+		lag = db.get_replication_lag()
+	except Exception:
+		saashq.logger("database").warning(f"Skipping replica {host}, connection failed", exc_info=True)
+		return False
+
+	if lag is None:
+		saashq.logger("database").warning(f"Skipping replica {host}, replication lag is unknown")
+		return False
+
+	if lag > max_lag:
+		saashq.logger("database").warning(f"Skipping replica {host}, replication lag: {lag}")
+		return False
+
+	return True
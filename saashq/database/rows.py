@@ -0,0 +1,96 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+"""
+Compact result rows, returned by `saashq.db.sql(..., as_rows=True)`.
+
+A `Row` is a tuple of the values of a result row, its columns are accessible by key and by
+attribute like with `saashq._dict` rows:
+
+	rows = saashq.get_all("ToDo", fields=["name", "status"], as_rows=True)
+	rows[0].status, rows[0]["status"], rows[0][1]
+
+Rows can't be modified and take a fraction of the memory of a dict per row, which matters for
+queries returning hundreds of thousands of rows. Use `as_dict()` to get a `saashq._dict`.
+"""
+
+from functools import lru_cache
+from operator import itemgetter
+from typing import ClassVar
+
+import saashq
+
+
+class Row(tuple):
+	__slots__ = ()
+
+	# set on the subclass created for every set of columns, see `get_row_class`
+	_fields: ClassVar[tuple[str, ...]] = ()
+	_index: ClassVar[dict[str, int]] = {}
+
+	def __getitem__(self, key):
+		if isinstance(key, str):
+			try:
+				key = self._index[key]
+			except KeyError:
+				raise KeyError(key) from None
+
+		return tuple.__getitem__(self, key)
+
+	def __contains__(self, key):
+		return key in self._index
+
+	def __repr__(self):
+		values = ", ".join(f"{field}={value!r}" for field, value in self.items())
+		return f"Row({values})"
+
+	def __reduce__(self):
+		return make_row, (self._fields, tuple(self))
+
+	def get(self, key, default=None):
+		if (index := self._index.get(key)) is None:
+			return default
+
+		return tuple.__getitem__(self, index)
+
+	def keys(self):
+		return self._index.keys()
+
+	def values(self):
+		return [tuple.__getitem__(self, index) for index in self._index.values()]
+
+	def items(self):
+		return [(field, tuple.__getitem__(self, index)) for field, index in self._index.items()]
+
+	def as_dict(self) -> saashq._dict:
+		return saashq._dict(self.items())
+
+
+@lru_cache(maxsize=512)
+def get_row_class(fields: tuple[str, ...]) -> type[Row]:
+	"""Return a `Row` class for results with `fields`, created once per distinct set of columns."""
+	# like with dicts, the last of duplicate columns wins
+	index = {field: i for i, field in enumerate(fields)}
+	namespace = {"__slots__": (), "_fields": fields, "_index": index}
+	for field, i in index.items():
+		# columns named like methods of rows are only accessible by key
+		if not field.startswith("__") and field not in Row.__dict__:
+			namespace[field] = property(itemgetter(i))
+
+	return type("Row", (Row,), namespace)
+
+
+def make_row(fields: tuple[str, ...], values: tuple) -> Row:
+	return get_row_class(fields)(values)
+
+
+def to_rows(fields, rows, update: dict | None = None) -> list[Row]:
+	"""Return `rows` (sequences of values of `fields`) as `Row`s, with `update` added to all of them."""
+	fields = tuple(fields)
+	if update:
+		fields += tuple(update)
+		extra_values = tuple(update.values())
+		row_class = get_row_class(fields)
+		return [row_class((*row, *extra_values)) for row in rows]
+
+	row_class = get_row_class(fields)
+	return [row_class(row) for row in rows]
@@ -1,15 +1,44 @@
+"""
+Buffer records in redis and write them to the database later, in batches.
+
+`deferred_insert` adds records to a redis stream per doctype. `save_to_db` (scheduled) reads the
+streams as a member of a consumer group and only acknowledges and deletes entries after their
+records are committed. Entries read by a worker that died before acknowledging them are claimed
+by a later run once they are idle for `CLAIM_IDLE_TIME` milliseconds.
+
+Site config:
+
+	"deferred_insert_batch_size": 500,  # stream entries written per transaction
+	"deferred_insert_max_backlog": 10000,  # flush in background once a stream has more entries
+
+Records of `bulk_insert_doctypes` are written with one query per batch, others are inserted one
+by one so that their controllers run.
+"""
+
 import json
+import os
+import socket
 from typing import TYPE_CHECKING, Union
 
 import redis
 
 import saashq
-from saashq.utils import cstr
+from saashq.model.naming import set_new_name
+from saashq.utils import cint, cstr, now
 
 if TYPE_CHECKING:
 	from saashq.model.document import Document
 
+stream_prefix = "insert_stream_for_"
+# lists in which records were queued before streams were used, they are still written
 queue_prefix = "insert_queue_for_"
+consumer_group = "deferred_insert"
+
+CLAIM_IDLE_TIME = 10 * 60 * 1000
+DEFAULT_BATCH_SIZE = 500
+
+# Logs without any logic on insert, their queued records are written as they are with one query.
+bulk_insert_doctypes = {"Version", "Access Log", "View Log", "Route History", "Web Page View"}
 
 
 def deferred_insert(doctype: str, records: list[Union[dict, "Document"]] | str):
@@ -19,28 +48,166 @@ def deferred_insert(doctype: str, records: list[Union[dict, "Document"]] | str):
 		_records = records
 
 	try:
-		saashq.cache.rpush(f"{queue_prefix}{doctype}", _records)
+		key = saashq.cache.make_key(f"{stream_prefix}{doctype}")
+		pipeline = saashq.cache.pipeline()
+		pipeline.xadd(key, {"records": _records})
+		pipeline.xlen(key)
+		_, backlog = pipeline.execute()
 	except redis.exceptions.ConnectionError:
-		for record in records:
+		if isinstance(records, str):
+			records = json.loads(records)
+		for record in records if isinstance(records, list) else [records]:
 			insert_record(record, doctype)
+		return
+
+	max_backlog = cint(saashq.conf.deferred_insert_max_backlog)
+	if max_backlog and backlog > max_backlog:
+		saashq.enqueue(
+			"saashq.deferred_insert.save_to_db",
+			queue="short",
+			job_id="deferred_insert::save_to_db",
+			deduplicate=True,
+		)
 
 
 def save_to_db():
-	queue_keys = saashq.cache.get_keys(queue_prefix)
-	for key in queue_keys:
-		record_count = 0
-		queue_key = get_key_name(key)
-		doctype = get_doctype_name(key)
-		while saashq.cache.llen(queue_key) > 0 and record_count <= 500:
-			records = saashq.cache.lpop(queue_key)
-			records = json.loads(records.decode("utf-8"))
-			if isinstance(records, dict):
-				record_count += 1
-				insert_record(records, doctype)
+	batch_size = cint(saashq.conf.deferred_insert_batch_size) or DEFAULT_BATCH_SIZE
+
+	for key in saashq.cache.get_keys(stream_prefix):
+		save_stream_to_db(key, get_doctype_name(key, stream_prefix), batch_size)
+
+	for key in saashq.cache.get_keys(queue_prefix):
+		save_queue_to_db(key, get_doctype_name(key), batch_size)
+
+
+def save_stream_to_db(key: bytes | str, doctype: str, batch_size: int):
+	"""Write records of all entries of the stream at `key`, committing and acknowledging every batch."""
+	create_consumer_group(key)
+	consumer = f"{socket.gethostname()}:{os.getpid()}"
+
+	# entries added while writing are left for the next run
+	max_batches = -(-saashq.cache.xlen(key) // batch_size)
+	written = 0
+
+	for _ in range(max_batches):
+		entries = read_stream_entries(key, consumer, batch_size)
+		if not entries:
+			break
+
+		records = []
+		for _id, fields in entries:
+			if fields is None:
+				# deleted from the stream while pending, returned without fields by Redis < 7
 				continue
-			for record in records:
-				record_count += 1
-				insert_record(record, doctype)
+
+			_records = json.loads(fields[b"records"].decode("utf-8"))
+			if isinstance(_records, dict):
+				records.append(_records)
+			else:
+				records.extend(_records)
+
+		insert_records(sort_records(records), doctype)
+		saashq.db.commit()
+
+		entry_ids = [entry_id for entry_id, _fields in entries]
+		pipeline = saashq.cache.pipeline()
+		pipeline.xack(key, consumer_group, *entry_ids)
+		pipeline.xdel(key, *entry_ids)
+		pipeline.execute()
+		written += len(records)
+
+	if written:
+		saashq.logger("deferred_insert").info(
+			f"Wrote {written} deferred {doctype} records, {saashq.cache.xlen(key)} entries left in queue"
+		)
+
+
+def read_stream_entries(key: bytes | str, consumer: str, count: int) -> list:
+	"""Return up to `count` entries that no other consumer is working on, orphaned ones first."""
+	_next_id, entries, *_deleted = saashq.cache.xautoclaim(
+		key, consumer_group, consumer, min_idle_time=CLAIM_IDLE_TIME, count=count
+	)
+	if entries:
+		return entries
+
+	streams = saashq.cache.xreadgroup(consumer_group, consumer, {key: ">"}, count=count)
+	return streams[0][1] if streams else []
+
+
+def create_consumer_group(key: bytes | str):
+	try:
+		saashq.cache.xgroup_create(key, consumer_group, id="0", mkstream=True)
+	except redis.exceptions.ResponseError as e:
+		if "BUSYGROUP" not in str(e):
+			raise
+
+
+def save_queue_to_db(key: bytes | str, doctype: str, batch_size: int):
+	queue_key = get_key_name(key)
+	records = []
+	while saashq.cache.llen(queue_key) > 0 and len(records) <= batch_size:
+		_records = json.loads(saashq.cache.lpop(queue_key).decode("utf-8"))
+		if isinstance(_records, dict):
+			records.append(_records)
+		else:
+			records.extend(_records)
+
+	insert_records(sort_records(records), doctype)
+
+
+def sort_records(records: list[dict]) -> list[dict]:
+	# records can be pushed after commit, in a different order than they were created in
+	return sorted(records, key=lambda record: record.get("creation") or "")
+
+
+def get_backlog() -> dict[str, dict]:
+	"""Return number of queued entries and of entries being written (or orphaned) by doctype."""
+	backlog = {}
+	for key in saashq.cache.get_keys(stream_prefix):
+		try:
+			pending = saashq.cache.xpending(key, consumer_group)["pending"]
+		except redis.exceptions.ResponseError:
+			# no consumer group yet
+			pending = 0
+
+		backlog[get_doctype_name(key, stream_prefix)] = {"queued": saashq.cache.xlen(key), "pending": pending}
+
+	return backlog
+
+
+def insert_records(records: list[dict], doctype: str):
+	if doctype in bulk_insert_doctypes and records:
+		saashq.db.savepoint("deferred_insert")
+		try:
+			bulk_insert_records(records, doctype)
+		except Exception as e:
+			saashq.db.rollback(save_point="deferred_insert")
+			saashq.logger().error(f"Error while bulk inserting deferred {doctype} records: {e}")
+		else:
+			return
+
+	for record in records:
+		insert_record(record, doctype)
+
+
+def bulk_insert_records(records: list[dict], doctype: str):
+	"""Write `records` with `bulk_insert`, keeping `owner` and timestamps set when they were queued."""
+	timestamp = now()
+	rows = []
+	for record in records:
+		doc = saashq.get_doc({**record, "doctype": doctype})
+		if not doc.name:
+			set_new_name(doc)
+
+		doc.creation = doc.creation or timestamp
+		doc.modified = doc.modified or doc.creation
+		doc.owner = doc.owner or saashq.session.user
+		doc.modified_by = doc.modified_by or doc.owner
+		doc.docstatus = doc.docstatus or 0
+		rows.append(doc.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True))
+
+	fields = list(rows[0])
+	saashq.db.bulk_insert(doctype, fields, [[row.get(field) for field in fields] for row in rows])
 
 
 def insert_record(record: Union[dict, "Document"], doctype: str):
@@ -55,5 +222,5 @@ def get_key_name(key: str) -> str:
 	return cstr(key).split("|")[1]
 
 
-def get_doctype_name(key: str) -> str:
-	return cstr(key).split(queue_prefix)[1]
+def get_doctype_name(key: str, prefix: str = queue_prefix) -> str:
+	return cstr(key).split(prefix)[1]
@@ -7,6 +7,7 @@ import saashq
 from saashq import _
 from saashq.model.document import Document
 from saashq.modules.export_file import export_to_files
+from saashq.permissions import has_permission_bulk
 from saashq.query_builder import DocType
 from saashq.utils.modules import get_modules_from_all_apps_for_user
 
@@ -88,8 +89,9 @@ def get_permission_query_conditions(user):
 def get_permitted_charts(dashboard_name):
 	permitted_charts = []
 	dashboard = saashq.get_doc("Dashboard", dashboard_name)
-	for chart in dashboard.charts:
-		if saashq.has_permission("Dashboard Chart", doc=chart.chart):
+	permitted = has_permission_bulk("Dashboard Chart", [chart.chart for chart in dashboard.charts])
+	for chart, is_permitted in zip(dashboard.charts, permitted, strict=True):
+		if is_permitted:
 			chart_dict = saashq._dict()
 			chart_dict.update(chart.as_dict())
 
@@ -103,7 +105,8 @@ def get_permitted_charts(dashboard_name):
 @saashq.whitelist()
 def get_permitted_cards(dashboard_name):
 	dashboard = saashq.get_doc("Dashboard", dashboard_name)
-	return [card for card in dashboard.cards if saashq.has_permission("Number Card", doc=card.card)]
+	permitted = has_permission_bulk("Number Card", [card.card for card in dashboard.cards])
+	return [card for card, is_permitted in zip(dashboard.cards, permitted, strict=True) if is_permitted]
 
 
 def get_non_standard_charts_in_dashboard(dashboard):
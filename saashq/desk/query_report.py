@@ -2,6 +2,7 @@
 # License: MIT. See LICENSE
 
 import datetime
+import hashlib
 import json
 import os
 from datetime import timedelta
@@ -9,13 +10,16 @@ from datetime import timedelta
 import saashq
 import saashq.desk.reportview
 from saashq import _
+from saashq.core.doctype.server_script.server_script_utils import get_server_script_map
 from saashq.core.utils import ljust_list
 from saashq.desk.reportview import clean_params, parse_json
 from saashq.model.utils import render_include
 from saashq.modules import get_module_path, scrub
 from saashq.monitor import add_data_to_monitor
 from saashq.permissions import get_role_permissions, has_permission
-from saashq.utils import cint, cstr, flt, format_duration, get_html_format, sbool
+from saashq.utils import cint, create_batch, cstr, flt, format_duration, get_html_format, sbool
+
+REPORT_RESULT_CACHE_DOCTYPES_KEY = "report_result_cache_doctypes"
 
 
 def get_report_doc(report_name):
@@ -55,33 +59,53 @@ def get_report_doc(report_name):
 	return doc
 
 
-def get_report_result(report, filters):
+def get_report_result(report, filters, incremental=False):
 	res = None
 
 	if report.report_type == "Query Report":
 		res = report.execute_query_report(filters)
 
 	elif report.report_type == "Script Report":
-		res = report.execute_script_report(filters)
+		if incremental:
+			from saashq.core.doctype.prepared_report.incremental import (
+				execute_incremental_report,
+				get_partition_settings,
+			)
+
+			if settings := get_partition_settings(report):
+				res = execute_incremental_report(report, filters, settings)
+
+		if res is None:
+			res = report.execute_script_report(filters)
 
 	elif report.report_type == "Custom Report":
 		ref_report = get_report_doc(report.report_name)
-		res = get_report_result(ref_report, filters)
+		res = get_report_result(ref_report, filters, incremental=incremental)
 
 	return res
 
 
 @saashq.read_only()
 def generate_report_result(
-	report, filters=None, user=None, custom_columns=None, is_tree=False, parent_field=None
+	report,
+	filters=None,
+	user=None,
+	custom_columns=None,
+	is_tree=False,
+	parent_field=None,
+	incremental=False,
 ):
+	"""Run `report` and return its result.
+
+	:param incremental: Only execute time windows of reports declaring `prepared_report_partition`
+	        that changed since they were last prepared."""
 	user = user or saashq.session.user
 	filters = filters or []
 
 	if filters and isinstance(filters, str):
 		filters = json.loads(filters)
 
-	res = get_report_result(report, filters) or []
+	res = get_report_result(report, filters, incremental=incremental) or []
 
 	columns, result, message, chart, report_summary, skip_total_row = ljust_list(res, 6)
 	columns = [get_column_as_dict(col) for col in (columns or [])]
@@ -194,6 +218,7 @@ def run(
 	is_tree=False,
 	parent_field=None,
 	are_default_filters=True,
+	prepared_report_page_length=None,
 ):
 	validate_filters_permissions(report_name, filters, user)
 	report = get_report_doc(report_name)
@@ -219,7 +244,12 @@ def run(
 				dn = filters.pop("prepared_report_name", None)
 			else:
 				dn = ""
-			result = get_prepared_report_result(report, filters, dn, user)
+			result = get_prepared_report_result(
+				report, filters, dn, user, page_length=cint(prepared_report_page_length)
+			)
+		elif cint(report.result_cache_ttl) and not custom_columns:
+			result = get_cached_report_result(report, filters, user, is_tree, parent_field)
+			add_data_to_monitor(report=report.reference_report or report.name)
 		else:
 			result = generate_report_result(report, filters, user, custom_columns, is_tree, parent_field)
 			add_data_to_monitor(report=report.reference_report or report.name)
@@ -235,6 +265,121 @@ def run(
 	return result
 
 
+def get_cached_report_result(report, filters, user, is_tree=False, parent_field=None):
+	"""Return result of `report` for `user`, cached for `result_cache_ttl` seconds.
+
+	Reports that can share results (see `can_share_report_result`) share them between users with the
+	same permissions. Cached results are discarded once a document of the report's `ref_doctype` is
+	changed."""
+	key = get_report_result_cache_key(report, filters, user, is_tree, parent_field)
+	if (result := saashq.cache.get_value(key, expires=True)) is None:
+		result = generate_report_result(report, filters, user, is_tree=is_tree, parent_field=parent_field)
+		saashq.cache.set_value(key, result, expires_in_sec=cint(report.result_cache_ttl))
+
+	return result
+
+
+def get_report_result_cache_key(report, filters, user, is_tree=False, parent_field=None) -> str:
+	from saashq.core.doctype.user_permission.user_permission import get_user_permissions
+
+	if filters and isinstance(filters, str):
+		filters = json.loads(filters)
+
+	if isinstance(filters, dict):
+		# unset filters and filters set to an empty value give the same result
+		filters = {key: value for key, value in filters.items() if value not in (None, "", [])}
+
+	fingerprint = saashq.as_json(
+		[
+			report.get("custom_report") or report.name,
+			str(report.modified),
+			get_report_result_cache_version(report.ref_doctype),
+			filters or {},
+			sorted(saashq.get_roles(user)),
+			get_user_permissions(user),
+			None if can_share_report_result(report) else user,
+			saashq.local.lang,
+			cint(is_tree),
+			parent_field,
+		],
+		indent=None,
+	)
+	return f"report_result:{report.name}:{hashlib.sha256(fingerprint.encode()).hexdigest()}"
+
+
+def can_share_report_result(report) -> bool:
+	"""Return whether users with the same roles and user permissions can share results of `report`.
+
+	Reports have to opt in, and rows of their `ref_doctype` mustn't depend on the user other than by
+	roles and user permissions: no "If Owner" permissions, shared documents or permission query
+	conditions from hooks or server scripts."""
+	doctype = report.ref_doctype
+	if not (cint(report.get("share_cached_results")) and doctype):
+		return False
+
+	hooks = saashq.get_hooks("permission_query_conditions", {})
+	if hooks.get(doctype) or hooks.get("*"):
+		return False
+
+	if get_server_script_map().get("permission_query", {}).get(doctype):
+		return False
+
+	if_owner_filters = {"parent": doctype, "if_owner": 1}
+	return not (
+		saashq.db.exists("DocPerm", if_owner_filters)
+		or saashq.db.exists("Custom DocPerm", if_owner_filters)
+		or saashq.db.exists("DocShare", {"share_doctype": doctype})
+	)
+
+
+def get_report_result_cache_version(doctype: str) -> int:
+	return cint(saashq.cache.get(saashq.cache.make_key(f"report_result_cache_version:{doctype}")))
+
+
+def get_report_result_cache_doctypes() -> set[str]:
+	"""Return doctypes of reports with cached results."""
+
+	def get_doctypes():
+		reports = saashq.get_all(
+			"Report", filters={"result_cache_ttl": (">", 0), "disabled": 0}, pluck="ref_doctype"
+		)
+		# wrapped, an empty set wouldn't be cached
+		return {"doctypes": set(reports)}
+
+	return saashq.cache.get_value(REPORT_RESULT_CACHE_DOCTYPES_KEY, generator=get_doctypes)["doctypes"]
+
+
+def clear_report_result_cache(doc, method=None):
+	"""Discard cached results of reports on the doctype of `doc`, again once the change is committed."""
+	if saashq.flags.in_install or saashq.flags.in_migrate:
+		return
+
+	if doc.doctype not in get_report_result_cache_doctypes():
+		return
+
+	changed_doctypes = getattr(saashq.local, "_report_result_cache_changes", None)
+	if changed_doctypes is None:
+		changed_doctypes = saashq.local._report_result_cache_changes = set()
+		saashq.db.after_commit.add(flush_report_result_cache_changes)
+		saashq.db.after_rollback.add(flush_report_result_cache_changes)
+
+	if doc.doctype not in changed_doctypes:
+		# results generated before the change is committed are discarded after commit
+		changed_doctypes.add(doc.doctype)
+		increment_report_result_cache_version(doc.doctype)
+
+
+def flush_report_result_cache_changes():
+	changed_doctypes = getattr(saashq.local, "_report_result_cache_changes", None) or ()
+	saashq.local._report_result_cache_changes = None
+	for doctype in changed_doctypes:
+		increment_report_result_cache_version(doctype)
+
+
+def increment_report_result_cache_version(doctype: str):
+	saashq.cache.incrby(saashq.cache.make_key(f"report_result_cache_version:{doctype}"), 1)
+
+
 def add_custom_column_data(custom_columns, result):
 	doctype_names_from_custom_field = []
 	for column in custom_columns:
@@ -268,7 +413,11 @@ def add_custom_column_data(custom_columns, result):
 	return result
 
 
-def get_prepared_report_result(report, filters, dn="", user=None):
+def get_prepared_report_result(report, filters, dn="", user=None, page_length=0):
+	"""Return the result of the prepared report, only the first `page_length` rows if it is paged.
+
+	`total_count` of a paged result is the number of rows (without the total row), the next pages
+	are fetched with `get_prepared_report_page`."""
 	from saashq.core.doctype.prepared_report.prepared_report import get_completed_prepared_report
 
 	def get_report_data(doc, data):
@@ -295,7 +444,7 @@ def get_prepared_report_result(report, filters, dn="", user=None):
 	doc = saashq.get_doc("Prepared Report", dn) if dn else None
 	if doc:
 		try:
-			if data := json.loads(doc.get_prepared_data().decode("utf-8")):
+			if data := load_prepared_report_data(doc, report, page_length):
 				report_data = get_report_data(doc, data)
 		except Exception as e:
 			doc.log_error("Prepared report render failed")
@@ -305,6 +454,26 @@ def get_prepared_report_result(report, filters, dn="", user=None):
 	return report_data | {"prepared_report": True, "doc": doc}
 
 
+def load_prepared_report_data(doc, report, page_length=0):
+	if page_length:
+		with doc.open_prepared_result() as result:
+			if result:
+				data = result.index["data"]
+				row_count = result.row_count
+				# the total row is the last one, keep it out of the pages
+				has_total_row = bool(
+					cint(report.add_total_row) and row_count and not data.get("skip_total_row")
+				)
+				row_count -= has_total_row
+				indexes = list(range(min(page_length, row_count)))
+				if has_total_row:
+					indexes.append(row_count)
+
+				return data | {"result": result.get_rows(indexes), "total_count": row_count}
+
+	return doc.load_prepared_data()
+
+
 @saashq.whitelist()
 def export_query():
 	"""export from query reports"""
@@ -601,6 +770,14 @@ def get_filtered_data(ref_doctype, columns, data, user):
 	if_owner = role_permissions.get("if_owner", {}).get("report")
 
 	if match_filters_per_doctype:
+		shared = set(shared)
+		# lists of allowed values to sets, they are checked for every cell
+		match_filters_per_doctype = {
+			doctype: [{dt: set(values) for dt, values in filters.items()} for filters in filter_list]
+			for doctype, filter_list in match_filters_per_doctype.items()
+		}
+		existing_links = get_existing_link_values(data, linked_doctypes, match_filters_per_doctype)
+
 		for row in data:
 			# Why linked_doctypes.get(ref_doctype)? because if column is empty, linked_doctypes[ref_doctype] is removed
 			if (
@@ -618,6 +795,7 @@ def get_filtered_data(ref_doctype, columns, data, user):
 				if_owner,
 				columns_dict,
 				user,
+				existing_links=existing_links,
 			):
 				result.append(row)
 	else:
@@ -634,6 +812,7 @@ def has_match(
 	if_owner,
 	columns_dict,
 	user,
+	existing_links=None,
 ):
 	"""Return True if after evaluating permissions for each linked doctype:
 	        - There is an owner match for the ref_doctype
@@ -645,6 +824,8 @@ def has_match(
 	Each doctype could have multiple conflicting user permission doctypes.
 	Hence even if one of the sets allows a match, it is true.
 	This behavior is equivalent to the trickling of user permissions of linked doctypes to the ref doctype.
+
+	`existing_links` (see `get_existing_link_values`) avoids a query per link value that isn't allowed.
 	"""
 	resultant_match = True
 
@@ -678,7 +859,11 @@ def has_match(
 					if (
 						dt in match_filters
 						and cell_value not in match_filters.get(dt)
-						and saashq.db.exists(dt, cell_value)
+						and (
+							cstr(cell_value).casefold() in existing_links[dt]
+							if existing_links is not None
+							else saashq.db.exists(dt, cell_value)
+						)
 					):
 						match = False
 						break
@@ -699,6 +884,38 @@ def has_match(
 	return resultant_match
 
 
+def get_existing_link_values(data, linked_doctypes, doctype_match_filters) -> dict[str, set[str]]:
+	"""Return `{linked doctype: casefolded names}` of the link values in `data` that exist, for all
+	linked doctypes restricted by user permissions. Runs one query per doctype (and batch of values).
+
+	Names are compared casefolded, like the (case insensitive) lookup MariaDB does."""
+	restricted_doctypes = {
+		dt for filter_list in doctype_match_filters.values() for filters in filter_list for dt in filters
+	}
+	existing_links = {}
+
+	for dt, idx in linked_doctypes.items():
+		if dt not in restricted_doctypes:
+			continue
+
+		values = set()
+		for row in data:
+			if isinstance(row, dict):
+				values.add(row.get(idx))
+			elif isinstance(row, list | tuple) and row:
+				values.add(row[idx])
+
+		values = [value for value in values if value]
+		existing_links[dt] = set()
+		for batch in create_batch(values, 1000):
+			existing_links[dt].update(
+				cstr(name).casefold()
+				for name in saashq.get_all(dt, {"name": ("in", batch)}, pluck="name", order_by=None)
+			)
+
+	return existing_links
+
+
 def get_linked_doctypes(columns, data):
 	linked_doctypes = {}
 
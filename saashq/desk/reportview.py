@@ -3,8 +3,12 @@
 
 """build query for doclistview and return results"""
 
+import io
 import json
+import tempfile
+from contextlib import nullcontext
 from functools import lru_cache
+from typing import TYPE_CHECKING
 
 from sql_metadata import Parser
 
@@ -16,9 +20,15 @@ from saashq.model import child_table_fields, default_fields, get_permitted_field
 from saashq.model.base_document import get_controller
 from saashq.model.db_query import DatabaseQuery
 from saashq.model.utils import is_virtual_doctype
-from saashq.utils import add_user_info, cint, format_duration
+from saashq.realtime import publish_progress
+from saashq.utils import add_user_info, cint, format_duration, get_files_path
 from saashq.utils.data import sbool
 
+if TYPE_CHECKING:
+	from saashq.core.doctype.docfield.docfield import DocField
+
+EXPORT_PROGRESS_INTERVAL = 1000  # rows between progress updates of background exports
+
 
 @saashq.whitelist()
 @saashq.read_only()
@@ -351,7 +361,7 @@ def delete_report(name):
 @saashq.read_only()
 def export_query():
 	"""export from report builder"""
-	from saashq.desk.utils import get_csv_bytes, pop_csv_params, provide_binary_file
+	from saashq.desk.utils import pop_csv_params, provide_binary_file
 
 	form_params = get_form_params()
 	form_params["limit_page_length"] = None
@@ -362,6 +372,7 @@ def export_query():
 	csv_params = pop_csv_params(form_params)
 	add_totals_row = 1 if form_params.pop("add_totals_row", None) == "1" else None
 	translate_values = 1 if form_params.pop("translate_values", None) == "1" else None
+	export_in_background = sbool(form_params.pop("export_in_background", False))
 
 	saashq.permissions.can_export(doctype, raise_exception=True)
 
@@ -375,47 +386,168 @@ def export_query():
 		filters=form_params.filters,
 	)
 
-	db_query = DatabaseQuery(doctype)
-	ret = db_query.execute(**form_params)
+	export_args = {
+		"doctype": doctype,
+		"form_params": form_params,
+		"file_format_type": file_format_type,
+		"csv_params": csv_params,
+		"add_totals_row": add_totals_row,
+		"translate_values": translate_values,
+	}
+
+	if export_in_background:
+		saashq.enqueue(
+			"saashq.desk.reportview.export_query_to_file", queue="long", title=title, **export_args
+		)
+		saashq.msgprint(
+			_("Export of {0} has been queued. You will be notified once the file is ready.").format(
+				_(doctype)
+			),
+			alert=True,
+		)
+		return
+
+	file = tempfile.TemporaryFile()
+	try:
+		file_extension = write_export(file, **export_args)
+	except Exception:
+		file.close()
+		raise
+
+	file.seek(0)
+	provide_binary_file(title, file_extension, file)
+
+
+def export_query_to_file(
+	doctype, form_params, file_format_type, title, csv_params, add_totals_row=None, translate_values=None
+):
+	"""Write an export to a private File and send its link to the user (background job)."""
+	file_name = f"{saashq.scrub(_(title))}-{saashq.generate_hash(length=6)}"
+	file_extension = "csv" if file_format_type == "CSV" else "xlsx"
+	file_name = f"{file_name}.{file_extension}"
+
+	with open(get_files_path(file_name, is_private=1), "wb") as file:
+		write_export(
+			file,
+			doctype,
+			form_params,
+			file_format_type,
+			csv_params,
+			add_totals_row,
+			translate_values,
+			progress_title=_("Exporting {0}").format(_(doctype)),
+		)
+
+	_file = saashq.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+		}
+	)
+	_file.flags.written_to_disk = True
+	_file.flags.ignore_duplicate_entry_error = True
+	_file.insert(ignore_permissions=True)
+	saashq.db.commit()
 
-	if add_totals_row:
-		ret = append_totals_row(ret)
+	saashq.msgprint(
+		_("Your export is ready: {0}").format(
+			f'<a href="{_file.file_url}" target="_blank">{saashq.utils.escape_html(file_name)}</a>'
+		),
+		title=_("Export Ready"),
+		realtime=True,
+	)
 
+
+def write_export(
+	file,
+	doctype,
+	form_params,
+	file_format_type,
+	csv_params,
+	add_totals_row=None,
+	translate_values=None,
+	progress_title=None,
+) -> str:
+	"""Write result of a report view query to a binary `file` as CSV or Excel, return the file extension.
+
+	Rows are read with an unbuffered cursor and written as they arrive, so memory use doesn't grow
+	with the number of rows."""
+	db_query = DatabaseQuery(doctype)
+	query = db_query.execute(**form_params, run=False)
 	fields_info = get_field_info(db_query.fields, doctype)
 
-	labels = [info["label"] for info in fields_info]
-	data = [[_("Sr"), *labels]]
-	processed_data = []
-
-	if saashq.local.lang == "en" or not translate_values:
-		data.extend([i + 1, *list(row)] for i, row in enumerate(ret))
-	elif translate_values:
-		translatable_fields = [field["translatable"] for field in fields_info]
-		processed_data = []
-		for i, row in enumerate(ret):
-			processed_row = [i + 1] + [
-				_(value) if translatable_fields[idx] else value for idx, value in enumerate(row)
-			]
-			processed_data.append(processed_row)
-			data.extend(processed_data)
-
-	data = handle_duration_fieldtype_values(doctype, data, db_query.fields)
-
-	if file_format_type == "CSV":
-		from saashq.utils.xlsxutils import handle_html
-
-		file_extension = "csv"
-		content = get_csv_bytes(
-			[[handle_html(saashq.as_unicode(v)) if isinstance(v, str) else v for v in r] for r in data],
-			csv_params,
+	total = None
+	if progress_title:
+		total = saashq.db.sql(f"select count(*) from ({query}) as export_query")[0][0]
+
+	# postgres has no unbuffered cursor yet, rows are still processed one by one
+	cursor = nullcontext() if saashq.db.db_type == "postgres" else saashq.db.unbuffered_cursor()
+	with cursor:
+		rows = _get_export_rows(
+			doctype,
+			query,
+			db_query.fields,
+			fields_info,
+			add_totals_row=add_totals_row,
+			translate_values=translate_values,
+			progress_title=progress_title,
+			total=total,
 		)
-	elif file_format_type == "Excel":
+
+		if file_format_type == "CSV":
+			from saashq.desk.utils import write_csv
+			from saashq.utils.xlsxutils import handle_html
+
+			text_file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+			write_csv(
+				text_file,
+				([handle_html(saashq.as_unicode(v)) if isinstance(v, str) else v for v in r] for r in rows),
+				csv_params,
+			)
+			text_file.detach()
+			return "csv"
+
 		from saashq.utils.xlsxutils import make_xlsx
 
-		file_extension = "xlsx"
-		content = make_xlsx(data, doctype).getvalue()
+		make_xlsx(rows, doctype, file=file)
+		return "xlsx"
+
+
+def _get_export_rows(
+	doctype, query, fields, fields_info, add_totals_row, translate_values, progress_title, total
+):
+	"""Yield header, data rows and the totals row of an export."""
+	yield [_("Sr"), *(info["label"] for info in fields_info)]
+
+	translatable = None
+	if translate_values and saashq.local.lang != "en":
+		translatable = [info["translatable"] for info in fields_info]
+
+	durations = get_duration_fields(doctype, fields)
+	totals = None
+	count = 0
+
+	for count, row in enumerate(saashq.db.sql(query, as_list=True, as_iterator=True), 1):
+		if add_totals_row:
+			totals = totals or [""] * len(row)
+			for i, value in enumerate(row):
+				if isinstance(value, float | int):
+					totals[i] = (totals[i] or 0) + value
+
+		if translatable:
+			row = [_(value) if translatable[idx] else value for idx, value in enumerate(row)]
 
-	provide_binary_file(title, file_extension, content)
+		yield format_duration_values([count, *row], durations)
+
+		if total and count % EXPORT_PROGRESS_INTERVAL == 0:
+			publish_progress(count * 100 / total, title=progress_title, description=f"{count} / {total}")
+
+	if totals:
+		if not isinstance(totals[0], int | float):
+			totals[0] = "Total"
+		yield format_duration_values([count + 1, *totals], durations)
 
 
 def append_totals_row(data):
@@ -489,7 +621,9 @@ def get_field_info(fields, doctype):
 	return field_info
 
 
-def handle_duration_fieldtype_values(doctype, data, fields):
+def get_duration_fields(doctype, fields) -> list[tuple[int, "DocField"]]:
+	"""Return `(index, docfield)` of Duration fields, index is offset by the Sr column of exports."""
+	durations = []
 	for field in fields:
 		try:
 			parenttype, fieldname = parse_field(field)
@@ -500,15 +634,25 @@ def handle_duration_fieldtype_values(doctype, data, fields):
 		df = saashq.get_meta(parenttype).get_field(fieldname)
 
 		if df and df.fieldtype == "Duration":
-			index = fields.index(field) + 1
-			for i in range(1, len(data)):
-				val_in_seconds = data[i][index]
-				if val_in_seconds:
-					duration_val = format_duration(val_in_seconds, df.hide_days)
-					data[i][index] = duration_val
+			durations.append((fields.index(field) + 1, df))
+
+	return durations
+
+
+def handle_duration_fieldtype_values(doctype, data, fields):
+	durations = get_duration_fields(doctype, fields)
+	for row in data[1:]:
+		format_duration_values(row, durations)
 	return data
 
 
+def format_duration_values(row: list, durations: list[tuple[int, "DocField"]]) -> list:
+	for index, df in durations:
+		if val_in_seconds := row[index]:
+			row[index] = format_duration(val_in_seconds, df.hide_days)
+	return row
+
+
 def parse_field(field: str) -> tuple[str | None, str]:
 	"""Parse a field into parenttype and fieldname."""
 	key = field.split(" as ", 1)[0]
@@ -1,6 +1,9 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
 
+from collections.abc import Iterable
+from typing import BinaryIO
+
 import saashq
 
 
@@ -58,6 +61,20 @@ def get_csv_bytes(data: list[list], csv_params: dict) -> bytes:
 	return file.getvalue().encode("utf-8")
 
 
+def write_csv(file, data: Iterable[list], csv_params: dict) -> None:
+	"""Write rows of `data` to a text `file` one by one, `data` can be a generator."""
+	from csv import writer
+
+	csv_params = csv_params.copy()
+	decimal_sep = csv_params.pop("decimal_sep", None)
+
+	csv_writer = writer(file, **csv_params)
+	for row in data:
+		if decimal_sep:
+			row = apply_csv_decimal_sep([row], decimal_sep)[0]
+		csv_writer.writerow(row)
+
+
 def apply_csv_decimal_sep(data: list[list], decimal_sep: str) -> list[list]:
 	"""Apply decimal separator to csv data."""
 	if decimal_sep == ".":
@@ -69,8 +86,8 @@ def apply_csv_decimal_sep(data: list[list], decimal_sep: str) -> list[list]:
 	]
 
 
-def provide_binary_file(filename: str, extension: str, content: bytes) -> None:
-	"""Provide a binary file to the client."""
+def provide_binary_file(filename: str, extension: str, content: "bytes | BinaryIO") -> None:
+	"""Provide a binary file to the client, an open file is streamed and closed once sent."""
 	from saashq import _
 
 	saashq.response["type"] = "binary"
@@ -5,8 +5,13 @@ import email.utils
 import functools
 import imaplib
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import suppress
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from poplib import error_proto
+from typing import TYPE_CHECKING
 
 import saashq
 from saashq import _, are_emails_muted, safe_encode
@@ -15,13 +20,21 @@ from saashq.email.doctype.email_domain.email_domain import EMAIL_DOMAIN_FIELDS
 from saashq.email.saashqmail import SaashqMail
 from saashq.email.receive import EmailServer, InboundMail, SentEmailInInboxError
 from saashq.email.smtp import SMTPServer
-from saashq.email.utils import get_port
+from saashq.email.utils import get_port, submit_in_context
 from saashq.model.document import Document
-from saashq.utils import cint, comma_or, cstr, parse_addr, validate_email_address
+from saashq.utils import cint, comma_or, create_batch, cstr, parse_addr, validate_email_address
 from saashq.utils.background_jobs import enqueue, get_jobs
 from saashq.utils.jinja import render_template
 from saashq.utils.user import get_system_managers
 
+if TYPE_CHECKING:
+	from saashq.email.doctype.imap_folder.imap_folder import IMAPFolder
+
+# Threads pulling mails of IMAP accounts in one job, set `email_pull_workers` to more than 1 to enable.
+EMAIL_PULL_WORKERS = 1
+# Mails saved per commit when pulling concurrently
+PULL_COMMIT_BATCH_SIZE = 20
+
 
 class SentEmailInInbox(Exception):
 	pass
@@ -251,24 +264,24 @@ class EmailAccount(Document):
 
 	def there_must_be_only_one_default(self):
 		"""If current Email Account is default, un-default all other accounts."""
-		for field in ("default_incoming", "default_outgoing"):
-			if not self.get(field):
+		for fieldname in ("default_incoming", "default_outgoing"):
+			if not self.get(fieldname):
 				continue
 
-			for email_account in saashq.get_all("Email Account", filters={field: 1}):
+			for email_account in saashq.get_all("Email Account", filters={fieldname: 1}):
 				if email_account.name == self.name:
 					continue
 
 				email_account = saashq.get_doc("Email Account", email_account.name)
-				email_account.set(field, 0)
+				email_account.set(fieldname, 0)
 				email_account.save()
 
 	@saashq.whitelist()
 	def get_domain_values(self, domain: str):
 		return saashq.db.get_value("Email Domain", domain, EMAIL_DOMAIN_FIELDS, as_dict=True)
 
-	def get_incoming_server(self, in_receive=False, email_sync_rule="UNSEEN"):
-		"""Return logged in POP3/IMAP connection object."""
+	def get_incoming_server(self, in_receive=False, email_sync_rule="UNSEEN", connect=True):
+		"""Return logged in POP3/IMAP connection object, not connected if `connect` is false."""
 		oauth_token = self.get_oauth_token()
 		args = saashq._dict(
 			{
@@ -294,6 +307,9 @@ class EmailAccount(Document):
 			saashq.throw(_("{0} is required").format("Email Server"))
 
 		email_server = EmailServer(saashq._dict(args))
+		if not connect:
+			return email_server
+
 		self.check_email_server_connection(email_server, in_receive)
 
 		if not in_receive and self.use_imap:
@@ -308,6 +324,7 @@ class EmailAccount(Document):
 
 			# reset failed attempts count - do it after succesful connection
 			self.set_failed_attempts_count(0)
+			return True
 		except (error_proto, imaplib.IMAP4.error) as e:
 			message = cstr(e).lower().replace(" ", "")
 			auth_error_codes = [
@@ -878,12 +895,17 @@ def pull(now=False):
 			doctype.auth_method,
 			doctype.connected_app,
 			doctype.connected_user,
+			doctype.use_imap,
+			doctype.service,
 		)
 		.where(doctype.enable_incoming == 1)
 		.where(doctype.awaiting_password == 0)
 		.run(as_dict=1)
 	)
 
+	workers = cint(saashq.conf.email_pull_workers) or EMAIL_PULL_WORKERS
+	concurrent_accounts = []
+
 	for email_account in email_accounts:
 		if (
 			email_account.auth_method == "OAuth"
@@ -893,7 +915,10 @@ def pull(now=False):
 			# don't try to pull from accounts which dont have access token (for Oauth)
 			continue
 
-		if now:
+		if workers > 1 and email_account.use_imap and email_account.service != "Saashq Mail":
+			concurrent_accounts.append(email_account.name)
+
+		elif now:
 			pull_from_email_account(email_account.name)
 
 		else:
@@ -910,6 +935,24 @@ def pull(now=False):
 					email_account=email_account.name,
 				)
 
+	if not concurrent_accounts:
+		return
+
+	if now:
+		pull_from_email_accounts(concurrent_accounts)
+		return
+
+	queued_jobs = get_jobs(site=saashq.local.site, key="job_name")[saashq.local.site]
+	if "pull_from_email_accounts" not in queued_jobs:
+		# a single job for all accounts, it can take longer than jobs of the short queue
+		enqueue(
+			pull_from_email_accounts,
+			"long",
+			event="all",
+			job_name="pull_from_email_accounts",
+			email_accounts=concurrent_accounts,
+		)
+
 
 @saashq.whitelist()
 def pull_emails(email_account: str) -> None:
@@ -931,6 +974,215 @@ def pull_from_email_account(email_account):
 	email_account.receive()
 
 
+def pull_from_email_accounts(email_accounts: list[str]):
+	"""Pull mails of many IMAP accounts concurrently. Runs within a worker process"""
+	workers = cint(saashq.conf.email_pull_workers) or EMAIL_PULL_WORKERS
+	EmailAccountsPuller(email_accounts, max(workers, 1)).pull()
+
+
+@dataclass
+class PulledFolder:
+	"""Mails fetched from an IMAP folder, and the state of its uids."""
+
+	folder: "IMAPFolder"
+	uid_state: saashq._dict | None = None
+	messages: list[tuple[int, str, bytes]] = field(default_factory=list)
+	error: str | None = None
+
+
+@dataclass
+class PulledAccount:
+	email_account: EmailAccount
+	server: EmailServer
+	sync_rule: str
+	folders: list[PulledFolder]
+	connected: bool = False
+
+
+class EmailAccountsPuller:
+	"""Pull mails of many IMAP Email Accounts, fetching them from a pool of threads.
+
+	Each account is connected to and its folders are fetched by a thread, only mails after the last
+	synced uid of the folder are fetched. As soon as an account is fetched, the calling thread saves
+	its mails as Communications in batches of `PULL_COMMIT_BATCH_SIZE`, each committed along with the
+	uid of its last mail, so that the next pull resumes after it if the job stops."""
+
+	def __init__(self, names: list[str], workers: int):
+		self.names = names
+		self.workers = workers
+		self.max_attachment_size = 0
+
+	def pull(self):
+		from saashq.core.api.file import get_max_file_size
+
+		self.max_attachment_size = get_max_file_size()
+		accounts = [account for name in self.names if (account := self.get_pulled_account(name))]
+
+		with ThreadPoolExecutor(max_workers=self.workers) as executor:
+			futures = {
+				submit_in_context(executor, fetch_mails, account, self.max_attachment_size): account
+				for account in accounts
+			}
+			# save mails of each account while the others are still being fetched
+			for future in as_completed(futures):
+				future.result()
+				self.save_account(futures.pop(future))
+
+	def save_account(self, account: PulledAccount):
+		try:
+			self.receive(account)
+		except Exception:
+			saashq.db.rollback()
+			account.email_account.log_error(
+				title=_("Error while connecting to email account {0}").format(account.email_account.name)
+			)
+		finally:
+			for folder in account.folders:
+				folder.messages = []
+
+			if account.connected:
+				with suppress(Exception):
+					account.server.logout()
+
+	def get_pulled_account(self, name: str) -> PulledAccount | None:
+		email_account = saashq.get_doc("Email Account", name)
+		if not (email_account.enable_incoming and email_account.use_imap):
+			return
+
+		try:
+			sync_rule = email_account.build_email_sync_rule()
+			server = email_account.get_incoming_server(
+				in_receive=True, email_sync_rule=sync_rule, connect=False
+			)
+			folders = [PulledFolder(folder) for folder in email_account.imap_folder]
+			account = PulledAccount(email_account, server, sync_rule, folders)
+			# OAuth accounts connect on this thread, see `submit_in_context`
+			if email_account.auth_method == "OAuth" and not self.connect(account):
+				return
+		except Exception:
+			saashq.db.rollback()
+			email_account.log_error(title=_("Error while connecting to email account {0}").format(name))
+			return
+
+		return account
+
+	def connect(self, account: PulledAccount) -> bool:
+		"""Connect on this thread, handling failures like `EmailAccount.receive`."""
+		account.connected = bool(
+			account.email_account.check_email_server_connection(account.server, in_receive=True)
+		)
+		return account.connected
+
+	def receive(self, account: PulledAccount):
+		email_account, server = account.email_account, account.server
+		if account.connected:
+			email_account.set_failed_attempts_count(0)
+		else:
+			# connecting from the thread failed, try again to handle the failure like `receive`
+			if not self.connect(account):
+				return
+
+			fetch_mails(account, self.max_attachment_size)
+
+		for folder in account.folders:
+			folder_name = f'"{folder.folder.folder_name}"'
+			if folder.uid_state:
+				server.save_imap_uid_state(folder_name, folder.uid_state)
+				saashq.db.commit()
+
+			if folder.error:
+				email_account.log_error(
+					title=_("Error while connecting to email account {0}").format(email_account.name),
+					message=folder.error,
+				)
+
+			self.save_mails(email_account, folder)
+
+			if account.sync_rule == "UNSEEN" and folder.uid_state and not folder.uid_state.reindexed:
+				with suppress(Exception):
+					server.mark_as_seen(folder_name, [uid for uid, _status, _content in folder.messages])
+
+	def save_mails(self, email_account: EmailAccount, folder: PulledFolder):
+		for batch in create_batch(folder.messages, PULL_COMMIT_BATCH_SIZE):
+			new_mails = []
+			for uid, seen_status, content in batch:
+				# only save mails with status != 'SEEN' if sync option is set to 'UNSEEN'
+				if email_account.email_sync_option == "UNSEEN" and seen_status == "SEEN":
+					continue
+
+				if new_mail := self.save_mail(email_account, folder, uid, seen_status, content):
+					new_mails.append(new_mail)
+
+			saashq.db.set_value(
+				"IMAP Folder", folder.folder.name, "last_synced_uid", batch[-1][0], update_modified=False
+			)
+			saashq.db.commit()
+
+			for communication, mail in new_mails:
+				self.notify(email_account, communication, mail)
+
+	def save_mail(
+		self, email_account: EmailAccount, folder: PulledFolder, uid: int, seen_status: str, content: bytes
+	) -> tuple | None:
+		"""Save the mail as Communication, return it and the mail if it is new."""
+		savepoint = f"pull_mail_{uid}"
+		saashq.db.savepoint(savepoint)
+		try:
+			mail = InboundMail(content, email_account, str(uid), seen_status, folder.folder.append_to)
+			communication = mail.process()
+		except SentEmailInInboxError:
+			saashq.db.rollback(save_point=savepoint)
+		except Exception:
+			saashq.db.rollback(save_point=savepoint)
+			email_account.log_error(title="EmailAccount.receive")
+			email_account.handle_bad_emails(uid, content, saashq.get_traceback())
+		else:
+			saashq.db.release_savepoint(savepoint)
+			if communication and mail.flags.is_new_communication:
+				return communication, mail
+
+	def notify(self, email_account: EmailAccount, communication, mail: InboundMail):
+		try:
+			# notify all participants of this thread
+			if email_account.enable_auto_reply:
+				email_account.send_auto_reply(communication, mail)
+
+			communication.send_email(is_inbound_mail_communcation=True)
+		except Exception:
+			saashq.db.rollback()
+			email_account.log_error(title="EmailAccount.receive")
+		else:
+			saashq.db.commit()
+
+
+def fetch_mails(account: PulledAccount, max_attachment_size: int):
+	"""Connect to the server of `account` and fetch new mails of its folders. Runs in a worker thread."""
+	server = account.server
+	if not account.connected:
+		try:
+			account.connected = bool(server.connect())
+		except Exception:
+			return
+
+	for folder in account.folders:
+		server.settings.email_sync_rule = account.sync_rule
+		server.settings.uid_validity = folder.folder.uidvalidity
+		try:
+			if not server.select_imap_folder(folder.folder.folder_name):
+				continue
+
+			folder_name = f'"{folder.folder.folder_name}"'
+			folder.uid_state = server.get_imap_uid_state(folder_name)
+			last_uid = 0 if folder.uid_state.reindexed else cint(folder.folder.last_synced_uid)
+			for message in server.fetch_new_messages(
+				folder_name, last_uid, max_attachment_size=max_attachment_size
+			):
+				folder.messages.append(message)
+		except Exception:
+			# keep mails fetched until then
+			folder.error = traceback.format_exc()
+
+
 def get_max_email_uid(email_account):
 	"""get maximum uid of emails"""
 
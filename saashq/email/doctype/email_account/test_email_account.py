@@ -3,16 +3,18 @@
 
 import email
 import os
+import re
 import unittest
 from datetime import datetime, timedelta
-from unittest.mock import patch
+from email.message import EmailMessage
+from unittest.mock import MagicMock, patch
 
 import saashq
 from saashq.core.doctype.communication.email import make
 from saashq.desk.form.load import get_attachments
-from saashq.email.doctype.email_account.email_account import notify_unreplied
+from saashq.email.doctype.email_account.email_account import notify_unreplied, pull_from_email_accounts
 from saashq.email.email_body import get_message_id
-from saashq.email.receive import Email, InboundMail, SentEmailInInboxError
+from saashq.email.receive import Email, EmailServer, InboundMail, SentEmailInInboxError
 from saashq.tests import IntegrationTestCase, UnitTestCase
 
 
@@ -22,7 +24,55 @@ class UnitTestEmailAccount(UnitTestCase):
 	Use this class for testing individual functions and methods.
 	"""
 
-	pass
+	def test_fetch_without_large_attachments(self):
+		mail = EmailMessage()
+		mail["Subject"] = "Large attachment"
+		mail["From"] = "test_sender@example.com"
+		mail.set_content("plain content")
+		mail.add_alternative("<p>html content</p>", subtype="html")
+		mail.add_attachment(b"x" * 100_000, maintype="application", subtype="pdf", filename="large.pdf")
+
+		# sets boundaries of multiparts
+		raw = mail.as_bytes()
+
+		def get_section(section):
+			if section == "HEADER":
+				return raw.split(b"\n\n", 1)[0] + b"\n\n"
+
+			part = mail
+			for number in section.removesuffix(".MIME").split("."):
+				part = part.get_payload()[int(number) - 1]
+
+			header, body = part.as_bytes().split(b"\n\n", 1)
+			return header + b"\n\n" if section.endswith(".MIME") else body
+
+		def uid(command, uid_set, items):
+			if "BODYSTRUCTURE" in items:
+				return "OK", [
+					b'1 (UID 7 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 14 1)'
+					b'("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 20 1) "ALTERNATIVE")'
+					b'("APPLICATION" "PDF" NIL NIL NIL "BASE64" 136000) "MIXED"))'
+				]
+
+			sections = re.findall(r"BODY\.PEEK\[([^\]]*)\]", items)
+			response = [b"1 (UID 7"]
+			for section in sections:
+				content = get_section(section)
+				response[-1] += f" BODY[{section}] {{{len(content)}}}".encode()
+				response[-1] = (response[-1], content)
+				response.append(b"")
+			response[-1] += b")"
+			return "OK", response
+
+		server = EmailServer(saashq._dict())
+		server.imap = MagicMock()
+		server.imap.uid.side_effect = uid
+
+		content = server.fetch_without_large_attachments(7, max_attachment_size=10_000)
+		parts = [part.get_content_type() for part in email.message_from_bytes(content).walk()]
+		self.assertEqual(parts, ["multipart/mixed", "multipart/alternative", "text/plain", "text/html"])
+
+		self.assertIsNone(server.fetch_without_large_attachments(7, max_attachment_size=1_000_000))
 
 
 class TestEmailAccount(IntegrationTestCase):
@@ -69,6 +119,46 @@ class TestEmailAccount(IntegrationTestCase):
 		# check if todo is created
 		self.assertTrue(saashq.db.get_value(comm.reference_doctype, comm.reference_name, "name"))
 
+	@patch.object(EmailServer, "logout")
+	@patch.object(EmailServer, "mark_as_seen")
+	@patch.object(EmailServer, "select_imap_folder", return_value=True)
+	@patch.object(EmailServer, "connect", return_value=True)
+	def test_pull_from_email_accounts(self, connect, select_imap_folder, mark_as_seen, logout):
+		cleanup("test_sender@example.com")
+		saashq.db.set_value("IMAP Folder", {"parent": "_Test Email Account 1"}, "last_synced_uid", 0)
+
+		messages = {'"INBOX"': [(2, "UNSEEN", self.get_test_mail("incoming-1.raw"))]}
+		fetched_after = []
+
+		def fetch_new_messages(self, folder, last_uid=0, **kwargs):
+			fetched_after.append((folder, last_uid))
+			return [message for message in messages.get(folder, []) if message[0] > last_uid]
+
+		with (
+			patch.object(EmailServer, "fetch_new_messages", autospec=True, side_effect=fetch_new_messages),
+			patch.object(
+				EmailServer,
+				"get_imap_uid_state",
+				return_value=saashq._dict(uidvalidity="1", uidnext=3, reindexed=False),
+			),
+		):
+			pull_from_email_accounts(["_Test Email Account 1"])
+			pull_from_email_accounts(["_Test Email Account 1"])
+
+		comm = saashq.get_doc("Communication", {"sender": "test_sender@example.com"})
+		self.assertEqual(comm.uid, 2)
+		self.assertEqual(comm.reference_doctype, "ToDo")
+		self.assertEqual(
+			saashq.db.get_value(
+				"IMAP Folder", {"parent": "_Test Email Account 1", "folder_name": "INBOX"}, "last_synced_uid"
+			),
+			2,
+		)
+		# the second pull resumes after the last synced mail
+		self.assertEqual(fetched_after.count(('"INBOX"', 0)), 1)
+		self.assertIn(('"INBOX"', 2), fetched_after)
+		mark_as_seen.assert_any_call('"INBOX"', [2])
+
 	def test_unread_notification(self):
 		todo = saashq.get_last_doc("ToDo")
 
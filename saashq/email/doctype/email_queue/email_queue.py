@@ -3,10 +3,16 @@
 
 import json
 import quopri
+import re
 import traceback
+from collections import defaultdict
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from contextlib import suppress
+from dataclasses import dataclass, field
 from email.parser import Parser
 from email.policy import SMTP
+from itertools import zip_longest
+from typing import TYPE_CHECKING
 
 import saashq
 from saashq import _, safe_encode, task
@@ -15,15 +21,23 @@ from saashq.database.database import savepoint
 from saashq.email.doctype.email_account.email_account import EmailAccount
 from saashq.email.email_body import add_attachment, get_email, get_formatted_html
 from saashq.email.saashqmail import SaashqMail
-from saashq.email.queue import get_unsubcribed_url, get_unsubscribe_message
-from saashq.email.smtp import SMTPServer
+from saashq.email.queue import (
+	EMAIL_QUEUE_CHUNK_SIZE,
+	EMAIL_QUEUE_CONNECTIONS_PER_ACCOUNT,
+	get_unsubcribed_url,
+	get_unsubscribe_message,
+)
+from saashq.email.smtp import SendRateLimiter, SMTPConnectionPool, SMTPServer
+from saashq.email.utils import submit_in_context
 from saashq.model.document import Document
 from saashq.query_builder import DocType, Interval
 from saashq.query_builder.functions import Now
 from saashq.utils import (
 	add_days,
 	cint,
+	create_batch,
 	cstr,
+	flt,
 	get_hook_method,
 	get_string_between,
 	get_url,
@@ -34,6 +48,12 @@ from saashq.utils import (
 )
 from saashq.utils.verified_command import get_signed_params
 
+if TYPE_CHECKING:
+	from saashq.email.doctype.email_queue_recipient.email_queue_recipient import EmailQueueRecipient
+
+# placeholders replaced per recipient in the serialized message
+RECIPIENT_PLACEHOLDERS = re.compile(rb"(<!--email_open_check-->|<!--unsubscribe_url-->|<!--recipient-->)")
+
 
 class EmailQueue(Document):
 	# begin: auto-generated types
@@ -222,6 +242,275 @@ class EmailQueue(Document):
 		).run()
 
 
+@dataclass
+class QueuedEmail:
+	"""Messages of an Email Queue to send, and the outcome of sending them."""
+
+	ctx: "SendMailContext"
+	messages: list[tuple["EmailQueueRecipient", bytes]] = field(default_factory=list)
+	sent: list["EmailQueueRecipient"] = field(default_factory=list)
+	error: str | None = None
+
+	@property
+	def message_count(self) -> int:
+		return sum(not recipient.is_mail_sent() for recipient in self.ctx.queue_doc.recipients)
+
+
+@dataclass
+class OutgoingAccount:
+	"""Emails of an Email Account in chunks, and the connections to send them."""
+
+	chunks: list[list[QueuedEmail]]
+	pool: SMTPConnectionPool | None = None
+	rate_limiter: SendRateLimiter | None = None
+	error: str | None = None
+
+
+class EmailQueueFlusher:
+	"""Send a batch of Email Queues over persistent SMTP connections, from a pool of threads.
+
+	Emails are grouped by Email Account and sent in chunks of about `EMAIL_QUEUE_CHUNK_SIZE`
+	messages. Every account gets a pool of up to `email_queue_connections_per_account` connections
+	and sends at most `email_queue_rate_limit` messages per second. The calling thread builds the
+	messages of a chunk and marks its emails "Sending" when handing it to a thread, then commits
+	their statuses as soon as the chunk is sent; the threads only talk to outgoing servers.
+
+	Emails of accounts that don't send over SMTP are sent one by one."""
+
+	def __init__(self, names: list[str], workers: int):
+		self.names = names
+		self.workers = workers
+		self.failed: list[str] = []
+		self.dry_run = saashq.flags.in_test and not saashq.flags.testing_email
+
+	def flush(self) -> list[str]:
+		"""Send the emails, return names of Email Queues that failed."""
+		if saashq.are_emails_muted():
+			return self.failed
+
+		emails_by_account = defaultdict(list)
+		for doc in self.get_email_queues():
+			if not doc.is_to_be_sent():
+				continue
+
+			try:
+				email_account = doc.get_email_account(raise_error=True)
+			except Exception:
+				email_account = None
+
+			if not email_account or email_account.service == "Saashq Mail":
+				self.send_one_by_one(doc)
+				continue
+
+			ctx = SendMailContext(doc)
+			ctx.email_account_doc = email_account
+			emails_by_account[email_account.name].append(QueuedEmail(ctx))
+
+		accounts = [OutgoingAccount(get_chunks(emails)) for emails in emails_by_account.values()]
+		if accounts:
+			self.send(accounts)
+
+		return self.failed
+
+	def get_email_queues(self) -> list[EmailQueue]:
+		"""Load Email Queues of the batch with their recipients, with one query for each."""
+		recipients = defaultdict(list)
+		for recipient in saashq.get_all(
+			"Email Queue Recipient",
+			filters={"parent": ("in", self.names), "parenttype": "Email Queue"},
+			fields=["*"],
+			order_by="idx asc",
+		):
+			recipients[recipient.parent].append(recipient)
+
+		email_queues = {
+			row.name: row
+			for row in saashq.get_all("Email Queue", filters={"name": ("in", self.names)}, fields=["*"])
+		}
+		return [
+			saashq.get_doc({**email_queues[name], "doctype": "Email Queue", "recipients": recipients[name]})
+			for name in self.names
+			if name in email_queues
+		]
+
+	def send_one_by_one(self, doc: EmailQueue):
+		try:
+			doc.send()
+		except Exception:
+			doc.log_error()
+			self.failed.append(doc.name)
+
+	def send(self, accounts: list[OutgoingAccount]):
+		if not self.dry_run:
+			self.connect(accounts)
+
+		# chunks of all accounts take turns, so that every account is sending
+		chunks = [
+			(account, chunk)
+			for account_chunks in zip_longest(*(account.chunks for account in accounts))
+			for account, chunk in zip(accounts, account_chunks, strict=True)
+			if chunk
+		]
+		pending = {}
+
+		try:
+			with ThreadPoolExecutor(max_workers=self.workers) as executor:
+				for account, chunk in chunks:
+					# only messages of the chunks being sent, or next in line, are kept in memory
+					while len(pending) >= 2 * self.workers:
+						self.save_sent_chunks(pending, FIRST_COMPLETED)
+
+					if emails := self.prepare_chunk(account, chunk):
+						self.update_status([email.ctx.queue_doc for email in emails], "Sending")
+
+					if not emails or self.dry_run:
+						self.save_results(chunk)
+						continue
+
+					future = submit_in_context(
+						executor, send_emails, emails, account.pool, account.rate_limiter
+					)
+					pending[future] = chunk
+
+				self.save_sent_chunks(pending, ALL_COMPLETED)
+		finally:
+			for account in accounts:
+				if account.pool:
+					account.pool.quit()
+
+	def connect(self, accounts: list[OutgoingAccount]):
+		connections = (
+			cint(saashq.conf.email_queue_connections_per_account) or EMAIL_QUEUE_CONNECTIONS_PER_ACCOUNT
+		)
+		for account in accounts:
+			email_account = account.chunks[0][0].ctx.email_account_doc
+			account.rate_limiter = SendRateLimiter(flt(saashq.conf.email_queue_rate_limit))
+			try:
+				account.pool = SMTPConnectionPool(
+					email_account.sendmail_config(), min(connections, len(account.chunks))
+				)
+				if not account.pool.connect_in_threads:
+					account.pool.connect()
+			except Exception:
+				account.error = saashq.get_traceback()
+
+	def prepare_chunk(self, account: OutgoingAccount, chunk: list[QueuedEmail]) -> list[QueuedEmail]:
+		"""Build messages of the chunk, return emails that can be sent."""
+		for email in chunk:
+			if account.error:
+				email.error = account.error
+				continue
+
+			try:
+				email.messages = [
+					(recipient, email.ctx.build_message(recipient.recipient))
+					for recipient in email.ctx.queue_doc.recipients
+					if not recipient.is_mail_sent()
+				]
+			except Exception:
+				email.error = saashq.get_traceback()
+
+			if self.dry_run and not email.error:
+				email.sent = [recipient for recipient, _message in email.messages]
+				if email.messages:
+					saashq.flags.sent_mail = email.messages[-1][1]
+
+		return [email for email in chunk if not email.error]
+
+	def save_sent_chunks(self, pending: dict[Future, list[QueuedEmail]], return_when: str):
+		done, _not_done = wait(pending, return_when=return_when)
+		for future in done:
+			chunk = pending.pop(future)
+			future.result()
+			self.save_results(chunk)
+
+	def save_results(self, emails: list[QueuedEmail]):
+		sent_recipients = [recipient for email in emails for recipient in email.sent]
+		if sent_recipients:
+			saashq.db.set_value(
+				"Email Queue Recipient",
+				{"name": ("in", [recipient.name for recipient in sent_recipients])},
+				"status",
+				"Sent",
+			)
+			for recipient in sent_recipients:
+				recipient.status = "Sent"
+
+		sent = [email for email in emails if not email.error]
+		self.update_status([email.ctx.queue_doc for email in sent], "Sent")
+		saashq.db.commit()
+
+		for email in sent:
+			email_account = email.ctx.email_account_doc
+			if email_account.append_emails_to_sent_folder and email.messages and not self.dry_run:
+				email_account.append_email_to_sent_folder(email.messages[-1][1])
+
+		for email in emails:
+			# only the statuses are needed from now on
+			email.messages = []
+			email.ctx._message_template = None
+			if not email.error:
+				continue
+
+			email.ctx.sent_to_atleast_one_recipient |= bool(email.sent)
+			email.ctx.queue_doc.log_error(message=email.error)
+			email.ctx.update_status_on_failure(email.error)
+			self.failed.append(email.ctx.queue_doc.name)
+
+	def update_status(self, docs: list[EmailQueue], status: str):
+		if not docs:
+			return
+
+		saashq.db.set_value("Email Queue", {"name": ("in", [doc.name for doc in docs])}, "status", status)
+		for doc in docs:
+			doc.status = status
+			if doc.communication:
+				saashq.get_doc("Communication", doc.communication).set_delivery_status()
+
+		saashq.db.commit()
+
+
+def get_chunks(emails: list[QueuedEmail]) -> list[list[QueuedEmail]]:
+	"""Split `emails` into chunks of about `EMAIL_QUEUE_CHUNK_SIZE` messages."""
+	chunks, chunk, message_count = [], [], 0
+	for email in emails:
+		chunk.append(email)
+		message_count += email.message_count
+		if message_count >= EMAIL_QUEUE_CHUNK_SIZE:
+			chunks.append(chunk)
+			chunk, message_count = [], 0
+
+	if chunk:
+		chunks.append(chunk)
+
+	return chunks
+
+
+def send_emails(emails: list[QueuedEmail], pool: SMTPConnectionPool, rate_limiter: SendRateLimiter):
+	"""Send messages of `emails` over one connection of `pool`. Runs in a worker thread."""
+	try:
+		with pool.server() as server:
+			for email in emails:
+				sender = email.ctx.queue_doc.sender
+				try:
+					session = pool.get_session(server)
+					for recipient, message in email.messages:
+						rate_limiter.wait()
+						session.sendmail(
+							from_addr=sender,
+							to_addrs=recipient.recipient,
+							msg=message.decode("utf-8").encode(),
+						)
+						email.sent.append(recipient)
+				except Exception:
+					email.error = traceback.format_exc()
+	except Exception:
+		# no connection to send over
+		error = traceback.format_exc()
+		for email in emails:
+			email.error = error
+
+
 from saashq.deprecation_dumpster import send_mail as _send_mail
 
 send_mail = task(queue="short")(_send_mail)
@@ -241,6 +530,7 @@ class SendMailContext:
 			rec.recipient for rec in self.queue_doc.recipients if rec.is_mail_sent()
 		)
 		self.email_account_doc = None
+		self._message_template: list[bytes] | None = None
 
 	def fetch_outgoing_server(self):
 		self.email_account_doc = self.queue_doc.get_email_account(raise_error=True)
@@ -257,19 +547,22 @@ class SendMailContext:
 
 	def __exit__(self, exc_type, exc_val, exc_tb):
 		if exc_type:
-			update_fields = {"error": saashq.get_traceback()}
-			if self.queue_doc.retry < get_email_retry_limit():
-				update_fields.update(
-					{
-						"status": "Partially Sent" if self.sent_to_atleast_one_recipient else "Not Sent",
-						"retry": self.queue_doc.retry + 1,
-					}
-				)
-			else:
-				update_fields.update({"status": "Error"})
-				self.notify_failed_email()
+			self.update_status_on_failure(saashq.get_traceback())
+		else:
+			self.queue_doc.update_status(status="Sent", commit=True)
+
+	def update_status_on_failure(self, error: str):
+		update_fields = {"error": error}
+		if self.queue_doc.retry < get_email_retry_limit():
+			update_fields.update(
+				{
+					"status": "Partially Sent" if self.sent_to_atleast_one_recipient else "Not Sent",
+					"retry": self.queue_doc.retry + 1,
+				}
+			)
 		else:
-			update_fields = {"status": "Sent"}
+			update_fields.update({"status": "Error"})
+			self.notify_failed_email()
 
 		self.queue_doc.update_status(**update_fields, commit=True)
 
@@ -307,21 +600,30 @@ class SendMailContext:
 
 	def build_message(self, recipient_email) -> bytes:
 		"""Build message specific to the recipient."""
-		message = self.queue_doc.message
-
-		if not message:
+		if not self.queue_doc.message:
 			return ""
 
-		message = message.replace(self.message_placeholder("tracker"), self.get_tracker_str(recipient_email))
-		message = message.replace(
-			self.message_placeholder("unsubscribe_url"), self.get_unsubscribe_str(recipient_email)
-		)
-		message = message.replace(self.message_placeholder("cc"), self.get_receivers_str())
-		message = message.replace(
-			self.message_placeholder("recipient"), self.get_recipient_str(recipient_email)
+		if self._message_template is None:
+			self._message_template = self.get_message_template()
+
+		recipient_values = {
+			b"<!--email_open_check-->": self.get_tracker_str(recipient_email),
+			b"<!--unsubscribe_url-->": self.get_unsubscribe_str(recipient_email),
+			b"<!--recipient-->": self.get_recipient_str(recipient_email),
+		}
+		# odd parts are placeholders
+		return b"".join(
+			safe_encode(recipient_values[part]) if i % 2 else part
+			for i, part in enumerate(self._message_template)
 		)
+
+	def get_message_template(self) -> list[bytes]:
+		"""Return the message with attachments, split at placeholders that differ per recipient.
+
+		Attachments are read and encoded only once for all recipients of the queue."""
+		message = self.queue_doc.message.replace(self.message_placeholder("cc"), self.get_receivers_str())
 		message = self.include_attachments(message)
-		return message
+		return RECIPIENT_PLACEHOLDERS.split(message)
 
 	def get_tracker_str(self, recipient_email) -> str:
 		tracker_url = ""
@@ -818,3 +1120,61 @@ class QueueBuilder:
 			d["recipients"] = self.final_recipients()
 
 		return d
+
+
+def benchmark(recipients: int = 20, attachment_size_mb: float = 5):
+	"""Compare cost of building the message per recipient, with and without the cached template.
+
+	Uses a newsletter-like Email Queue with an attached file of `attachment_size_mb`.
+
+	wrench --site <site> execute saashq.email.doctype.email_queue.email_queue.benchmark"""
+	import os
+	import time
+	import tracemalloc
+
+	from saashq.utils.commands import render_table
+
+	file = saashq.get_doc(
+		doctype="File",
+		file_name="email-queue-benchmark.bin",
+		is_private=1,
+		content=os.urandom(int(attachment_size_mb * 1024 * 1024)),
+	).insert(ignore_permissions=True)
+
+	try:
+		mail = get_email(
+			recipients=["newsletter@example.com"],
+			sender="benchmark@example.com",
+			subject="Newsletter",
+			msg='<p>Hello</p><a href="<!--unsubscribe_url-->">Unsubscribe</a>',
+		)
+		queue_doc = saashq.get_doc(
+			doctype="Email Queue",
+			name="email-queue-benchmark",
+			message=mail.as_string(),
+			attachments=json.dumps([{"fid": file.name}]),
+			add_unsubscribe_link=1,
+			reference_doctype="User",
+			reference_name="Administrator",
+		)
+		emails = [f"recipient{i}@example.com" for i in range(recipients)]
+
+		rows = [["Template", "Per recipient (ms)", "Message size (KB)", "Peak memory (KB)"]]
+		for cached in (False, True):
+			ctx = SendMailContext(queue_doc)
+			tracemalloc.start()
+			start = time.perf_counter()
+			for email in emails:
+				if not cached:
+					ctx._message_template = None
+				message = ctx.build_message(email)
+			elapsed_ms = (time.perf_counter() - start) * 1000 / recipients
+			_, peak = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+			label = "cached" if cached else "per recipient"
+			rows.append([label, round(elapsed_ms, 2), len(message) // 1024, peak // 1024])
+	finally:
+		file.delete(ignore_permissions=True)
+
+	render_table(rows)
+	return rows
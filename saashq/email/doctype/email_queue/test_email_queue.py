@@ -1,6 +1,8 @@
 # Copyright (c) 2015, Saashq Technologies and Contributors
 # License: MIT. See LICENSE
+import smtplib
 import textwrap
+from unittest.mock import MagicMock, PropertyMock, patch
 
 import saashq
 from saashq.email.doctype.email_queue.email_queue import SendMailContext, get_email_retry_limit
@@ -102,3 +104,36 @@ class TestEmailQueue(IntegrationTestCase):
 		q2 = saashq.new_doc("Email Queue", email_account="_Test Email Account 1")
 		self.assertIsNot(get_server(saashq.new_doc("Email Queue")), get_server(q1))
 		self.assertIs(get_server(q1), get_server(q2))
+
+	def test_flush_over_connection_pool(self):
+		from saashq.email.queue import flush
+
+		for i in range(3):
+			saashq.sendmail(
+				recipients=[f"test{i}@example.com", "common@example.com"],
+				sender="admin@example.com",
+				subject=f"Testing Connection Pool {i}",
+				message="This mail is queued!",
+			)
+
+		def sendmail(from_addr, to_addrs, msg):
+			if to_addrs == "test1@example.com":
+				raise smtplib.SMTPRecipientsRefused({to_addrs: (550, b"Mailbox unavailable")})
+
+		session = MagicMock()
+		session.sendmail.side_effect = sendmail
+		with (
+			patch.dict(saashq.flags, {"testing_email": True}),
+			patch.dict(saashq.conf, {"email_queue_workers": 2}),
+			patch("saashq.email.doctype.email_queue.email_queue.EMAIL_QUEUE_CHUNK_SIZE", 2),
+			patch("saashq.email.smtp.SMTPServer.session", new_callable=PropertyMock, return_value=session),
+		):
+			flush()
+
+		self.assertEqual(session.sendmail.call_count, 5)
+		self.assertEqual(saashq.db.count("Email Queue", {"status": "Sent"}), 2)
+		self.assertEqual(saashq.db.count("Email Queue Recipient", {"status": "Sent"}), 4)
+
+		failed = saashq.get_doc("Email Queue", {"status": "Not Sent"})
+		self.assertEqual(failed.retry, 1)
+		self.assertIn("SMTPRecipientsRefused", failed.error)
@@ -16,6 +16,7 @@ class IMAPFolder(Document):
 
 		append_to: DF.Link | None
 		folder_name: DF.Data
+		last_synced_uid: DF.Int
 		parent: DF.Data
 		parentfield: DF.Data
 		parenttype: DF.Data
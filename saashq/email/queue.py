@@ -3,7 +3,7 @@
 
 import saashq
 from saashq import _, msgprint
-from saashq.utils import cint, cstr, get_url, now_datetime
+from saashq.utils import cint, cstr, get_hook_method, get_url, now_datetime
 from saashq.utils.data import getdate
 from saashq.utils.verified_command import get_signed_params, verify_request
 
@@ -12,6 +12,13 @@ from saashq.utils.verified_command import get_signed_params, verify_request
 EMAIL_QUEUE_BATCH_FAILURE_THRESHOLD_PERCENT = 0.33
 EMAIL_QUEUE_BATCH_FAILURE_THRESHOLD_COUNT = 10
 
+# Threads sending a batch of emails, set `email_queue_workers` to 1 to send them one by one.
+EMAIL_QUEUE_WORKERS = 4
+# Connections kept open to the outgoing server of each email account while sending a batch.
+EMAIL_QUEUE_CONNECTIONS_PER_ACCOUNT = 2
+# Messages built and handed to a thread at once, their emails' statuses are committed together.
+EMAIL_QUEUE_CHUNK_SIZE = 20
+
 
 def get_emails_sent_this_month(email_account=None):
 	"""Get count of emails sent from a specific email account.
@@ -143,6 +150,18 @@ def flush():
 	if not email_queue_batch:
 		return
 
+	workers = cint(saashq.conf.email_queue_workers) or EMAIL_QUEUE_WORKERS
+	if workers > 1 and not get_hook_method("override_email_send"):
+		from saashq.email.doctype.email_queue.email_queue import EmailQueueFlusher
+
+		failed_email_queues = EmailQueueFlusher([row.name for row in email_queue_batch], workers).flush()
+		if (
+			len(failed_email_queues) / len(email_queue_batch) > EMAIL_QUEUE_BATCH_FAILURE_THRESHOLD_PERCENT
+			and len(failed_email_queues) > EMAIL_QUEUE_BATCH_FAILURE_THRESHOLD_COUNT
+		):
+			saashq.throw(_("Email Queue flushing aborted due to too many failures."))
+		return
+
 	failed_email_queues = []
 	for row in email_queue_batch:
 		try:
@@ -9,9 +9,11 @@ import json
 import poplib
 import re
 import ssl
+from collections.abc import Iterator
 from contextlib import suppress
 from email.errors import HeaderParseError
 from email.header import decode_header
+from itertools import takewhile
 from urllib.parse import unquote
 
 import _socket
@@ -27,6 +29,7 @@ from saashq.utils import (
 	add_days,
 	cint,
 	convert_utc_to_system_timezone,
+	create_batch,
 	cstr,
 	extract_email_id,
 	get_datetime,
@@ -45,6 +48,10 @@ poplib._MAXLINE = 1_00_000
 
 THREAD_ID_PATTERN = re.compile(r"(?<=\[)[\w/-]+")
 WORDS_PATTERN = re.compile(r"\w+")
+# parentheses, quoted strings, literals (`{size}` at the end of a line) and atoms of IMAP responses
+IMAP_TOKEN_PATTERN = re.compile(rb'[()]|"(?:[^"\\]|\\.)*"|\{\d+\}$|[^\s()"\[]+(?:\[[^\]]*\](?:<\d+>)?)?')
+# mails fetched with one command
+IMAP_FETCH_BATCH_SIZE = 20
 
 ALTERNATE_CHARSET_MAP = {
 	"windows-874": "cp874",
@@ -209,48 +216,63 @@ class EmailServer:
 
 	def check_imap_uidvalidity(self, folder):
 		# compare the UIDVALIDITY of email account and imap server
+		uid_state = self.get_imap_uid_state(folder)
+		self.save_imap_uid_state(folder, uid_state)
+
+	def get_imap_uid_state(self, folder) -> saashq._dict:
+		"""Return UIDVALIDITY and UIDNEXT of `folder`, and whether uids were reindexed by the server.
+
+		If they were, the sync rule is changed to fetch the latest mails."""
 		uid_validity = self.settings.uid_validity
 
 		response, message = self.imap.status(folder, "(UIDVALIDITY UIDNEXT)")
 		current_uid_validity = self.parse_imap_response("UIDVALIDITY", message[0]) or 0
 
 		uidnext = int(self.parse_imap_response("UIDNEXT", message[0]) or "1")
-		saashq.db.set_value("Email Account", self.settings.email_account, "uidnext", uidnext)
+		uid_state = saashq._dict(uidvalidity=current_uid_validity, uidnext=uidnext, reindexed=False)
 
 		if not uid_validity or uid_validity != current_uid_validity:
-			# uidvalidity changed & all email uids are reindexed by server
-			saashq.db.set_value(
-				"Communication",
-				{"communication_medium": "Email", "email_account": self.settings.email_account},
-				"uid",
-				-1,
-				update_modified=False,
-			)
-
-			if self.settings.use_imap:
-				# Remove {"} quotes that are added to handle spaces in IMAP Folder names
-				if folder[0] == folder[-1] == '"':
-					folder = folder[1:-1]
-
-				saashq.db.set_value(
-					"IMAP Folder",
-					{"parent": self.settings.email_account_name, "folder_name": folder},
-					{"uidvalidity": current_uid_validity, "uidnext": uidnext},
-					update_modified=False,
-				)
-			else:
-				saashq.db.set_value(
-					"Email Account",
-					self.settings.email_account_name,
-					{"uidvalidity": current_uid_validity, "uidnext": uidnext},
-					update_modified=False,
-				)
-
 			sync_count = 100 if uid_validity else int(self.settings.initial_sync_count)
 			from_uid = 1 if uidnext < (sync_count + 1) or (uidnext - sync_count) < 1 else uidnext - sync_count
 			# sync last 100 email
 			self.settings.email_sync_rule = f"UID {from_uid}:{uidnext}"
-			self.uid_reindexed = True
+			self.uid_reindexed = uid_state.reindexed = True
+
+		return uid_state
+
+	def save_imap_uid_state(self, folder, uid_state: saashq._dict):
+		saashq.db.set_value("Email Account", self.settings.email_account, "uidnext", uid_state.uidnext)
+
+		if not uid_state.reindexed:
+			return
+
+		# uidvalidity changed & all email uids are reindexed by server
+		saashq.db.set_value(
+			"Communication",
+			{"communication_medium": "Email", "email_account": self.settings.email_account},
+			"uid",
+			-1,
+			update_modified=False,
+		)
+
+		if self.settings.use_imap:
+			# Remove {"} quotes that are added to handle spaces in IMAP Folder names
+			if folder[0] == folder[-1] == '"':
+				folder = folder[1:-1]
+
+			saashq.db.set_value(
+				"IMAP Folder",
+				{"parent": self.settings.email_account_name, "folder_name": folder},
+				{"uidvalidity": uid_state.uidvalidity, "uidnext": uid_state.uidnext, "last_synced_uid": 0},
+				update_modified=False,
+			)
+		else:
+			saashq.db.set_value(
+				"Email Account",
+				self.settings.email_account_name,
+				{"uidvalidity": uid_state.uidvalidity, "uidnext": uid_state.uidnext},
+				update_modified=False,
+			)
 
 	def parse_imap_response(self, cmd, response):
 		pattern = rf"(?<={cmd} )[0-9]*"
@@ -360,6 +382,84 @@ Traceback:
 			except Exception:
 				continue
 
+	def fetch_new_messages(
+		self, folder, last_uid: int = 0, limit: int = 100, max_attachment_size: int = 0
+	) -> Iterator[tuple[int, str, bytes]]:
+		"""Yield uid, seen status and content of mails in `folder` matching the sync rule, after `last_uid`.
+
+		Mails are fetched in batches of uids. Attachments bigger than `max_attachment_size` are not
+		downloaded, they would be skipped when saving the mail anyway. Neither flags on the server nor
+		the database are changed, so mails of many accounts can be fetched from threads."""
+		self.imap.select(folder, readonly=True)
+
+		criteria = self.settings.email_sync_rule
+		if last_uid:
+			criteria = f"{criteria} UID {last_uid + 1}:*"
+
+		_response, message = self.imap.uid("search", None, criteria)
+		# `UID n:*` also matches the last mail if its uid is lower than n
+		uids = sorted(uid for uid in map(int, message[0].split()) if uid > last_uid)[:limit]
+
+		for batch in create_batch(uids, IMAP_FETCH_BATCH_SIZE):
+			summaries = self.uid_fetch(batch, "(UID FLAGS RFC822.SIZE)")
+			large = {
+				uid
+				for uid, summary in summaries.items()
+				if max_attachment_size and cint(summary.get("RFC822.SIZE")) > max_attachment_size
+			}
+			small = [uid for uid in batch if uid in summaries and uid not in large]
+			contents = self.uid_fetch(small, "(UID BODY.PEEK[])") if small else {}
+
+			for uid in batch:
+				if uid not in summaries:
+					# deleted since the search
+					continue
+
+				if uid in large:
+					content = self.fetch_without_large_attachments(uid, max_attachment_size)
+				else:
+					content = contents.get(uid, {}).get("BODY[]")
+
+				if content is None:
+					content = self.uid_fetch([uid], "(UID BODY.PEEK[])").get(uid, {}).get("BODY[]") or b""
+
+				flags = summaries[uid].get("FLAGS") or []
+				yield uid, "SEEN" if "\\Seen" in flags else "UNSEEN", content
+
+	def fetch_without_large_attachments(self, uid: int, max_attachment_size: int) -> bytes | None:
+		"""Return the mail without attachments bigger than `max_attachment_size`, `None` if it has none.
+
+		Parts of the mail are found from its BODYSTRUCTURE and fetched separately."""
+		structure = self.uid_fetch([uid], "(UID BODYSTRUCTURE)").get(uid, {}).get("BODYSTRUCTURE")
+		if not structure or not isinstance(structure[0], list):
+			return
+
+		tree = get_mime_tree(structure, max_attachment_size)
+		sections = list(get_mime_sections(tree))
+		if len(sections) == len(list(get_mime_sections(tree, include_skipped=True))):
+			return
+
+		items = " ".join(f"BODY.PEEK[{section}]" for section in sections)
+		if not (response := self.uid_fetch([uid], f"(UID {items})").get(uid)):
+			return
+
+		try:
+			return assemble_mime(tree, response)
+		except ValueError:
+			# multipart without boundary
+			return
+
+	def uid_fetch(self, uids: list[int], items: str) -> dict[int, dict]:
+		response, data = self.imap.uid("fetch", get_uid_set(uids), items)
+		return parse_fetch_response(data) if response == "OK" else {}
+
+	def mark_as_seen(self, folder, uids: list[int]):
+		if not uids:
+			return
+
+		self.imap.select(folder)
+		self.imap.uid("STORE", get_uid_set(uids), "+FLAGS", "(\\SEEN)")
+
 
 class Email:
 	"""Wrapper for an email."""
@@ -907,3 +1007,107 @@ class InboundMail(Email):
 			"has_attachment": 1 if self.attachments else 0,
 			"seen": self.seen_status or 0,
 		}
+
+
+def get_uid_set(uids) -> str:
+	"""Return `uids` as an IMAP sequence set of ranges, like `1:3,7`."""
+	ranges = []
+	for uid in sorted(uids):
+		if ranges and uid == ranges[-1][1] + 1:
+			ranges[-1][1] = uid
+		else:
+			ranges.append([uid, uid])
+
+	return ",".join(str(start) if start == end else f"{start}:{end}" for start, end in ranges)
+
+
+def parse_fetch_response(data: list) -> dict[int, dict]:
+	"""Return items of the messages in the response of an IMAP FETCH command, by uid.
+
+	Lists are returned as lists, strings and literals as bytes, numbers as int and NIL as None.
+	Names of items (like `BODY[HEADER]`) and other atoms are returned as str."""
+	values, stack = [], []
+	for line in data:
+		literal = None
+		if isinstance(line, tuple):
+			line, literal = line
+
+		for token in IMAP_TOKEN_PATTERN.findall(line or b""):
+			if token == b"(":
+				child = []
+				values.append(child)
+				stack.append(values)
+				values = child
+			elif token == b")":
+				values = stack.pop() if stack else values
+			elif token.startswith(b"{"):
+				values.append(literal)
+			elif token.startswith(b'"'):
+				values.append(re.sub(rb"\\(.)", rb"\1", token[1:-1]))
+			elif token.upper() == b"NIL":
+				values.append(None)
+			elif token.isdigit():
+				values.append(int(token))
+			else:
+				values.append(token.decode(errors="replace"))
+
+	messages = {}
+	for value in values:
+		if not isinstance(value, list):
+			continue
+
+		items = {cstr(key).upper(): item for key, item in zip(value[::2], value[1::2], strict=False)}
+		if isinstance(items.get("UID"), int):
+			messages[items["UID"]] = items
+
+	return messages
+
+
+def get_mime_tree(structure: list, max_attachment_size: int, section: str = "") -> saashq._dict:
+	"""Return parts of a parsed BODYSTRUCTURE with their sections, attachments bigger than
+	`max_attachment_size` are marked to be skipped."""
+	if isinstance(structure[0], list):
+		parts = takewhile(lambda part: isinstance(part, list), structure)
+		children = [
+			get_mime_tree(part, max_attachment_size, f"{section}.{i}" if section else str(i))
+			for i, part in enumerate(parts, 1)
+		]
+		return saashq._dict(section=section, children=children, skip=False)
+
+	maintype = safe_decode(structure[0] or b"").lower()
+	size = structure[6] if len(structure) > 6 and isinstance(structure[6], int) else 0
+	# size of the encoded body, attachments are base64 encoded
+	skip = maintype not in ("text", "message") and size * 3 // 4 > max_attachment_size
+	return saashq._dict(section=section or "1", children=None, skip=skip)
+
+
+def get_mime_sections(node: saashq._dict, include_skipped: bool = False) -> Iterator[str]:
+	"""Yield sections to fetch to assemble `node`."""
+	if node.skip and not include_skipped:
+		return
+
+	yield f"{node.section}.MIME" if node.section else "HEADER"
+	if node.children is None:
+		yield node.section
+		return
+
+	for child in node.children:
+		yield from get_mime_sections(child, include_skipped)
+
+
+def assemble_mime(node: saashq._dict, response: dict) -> bytes:
+	"""Return the raw content of `node` from its fetched sections, without skipped parts."""
+	header = response.get(f"BODY[{node.section}.MIME]" if node.section else "BODY[HEADER]") or b""
+	if node.children is None:
+		return header + (response.get(f"BODY[{node.section}]") or b"")
+
+	if not (boundary := email.message_from_bytes(header).get_boundary()):
+		raise ValueError(node.section)
+
+	delimiter = b"--" + safe_encode(boundary)
+	parts = [
+		delimiter + b"\r\n" + assemble_mime(child, response) + b"\r\n"
+		for child in node.children
+		if not child.skip
+	]
+	return header + b"".join(parts) + delimiter + b"--\r\n"
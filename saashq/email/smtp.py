@@ -1,8 +1,12 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
 
+import queue
 import smtplib
-from contextlib import suppress
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
 
 import saashq
 from saashq import _
@@ -135,3 +139,79 @@ class SMTPServer:
 			title=_("Invalid Credentials"),
 			exc=InvalidEmailCredentials,
 		)
+
+
+class SMTPConnectionPool:
+	"""Persistent sessions to an outgoing server, each used by one thread at a time.
+
+	Up to `size` connections are opened as they are needed, and kept open until `quit`. OAuth sessions
+	are only opened by `connect`, from the calling thread (see `submit_in_context`), and aren't reopened
+	by other threads."""
+
+	def __init__(self, config: dict, size: int):
+		self.config = config
+		self.size = size
+		self.connect_in_threads = not config.get("use_oauth")
+		self._servers: list[SMTPServer] = []
+		self._idle = queue.LifoQueue()
+		self._lock = threading.Lock()
+
+	def connect(self):
+		"""Open all sessions of the pool now."""
+		while len(self._servers) < self.size:
+			server = SMTPServer(**self.config)
+			self._servers.append(server)
+			server.session
+			self._idle.put(server)
+
+	@contextmanager
+	def server(self) -> Iterator[SMTPServer]:
+		server = self._acquire()
+		try:
+			yield server
+		finally:
+			self._idle.put(server)
+
+	def get_session(self, server: SMTPServer) -> smtplib.SMTP:
+		"""Return the session of `server`, reopened if it was closed and the pool connects in threads."""
+		if self.connect_in_threads:
+			return server.session
+
+		if not server.is_session_active():
+			raise saashq.OutgoingEmailError(_("Connection to the outgoing email server was closed"))
+
+		return server._session
+
+	def _acquire(self) -> SMTPServer:
+		with self._lock:
+			if self._idle.empty() and len(self._servers) < self.size and self.connect_in_threads:
+				server = SMTPServer(**self.config)
+				self._servers.append(server)
+				return server
+
+		return self._idle.get()
+
+	def quit(self):
+		for server in self._servers:
+			server.quit()
+
+
+class SendRateLimiter:
+	"""Let at most `rate` messages per second through `wait`, across threads. No limit if `rate` is 0."""
+
+	def __init__(self, rate: float):
+		self.interval = 1 / rate if rate > 0 else 0
+		self._next_slot = time.monotonic()
+		self._lock = threading.Lock()
+
+	def wait(self):
+		if not self.interval:
+			return
+
+		with self._lock:
+			now = time.monotonic()
+			slot = max(self._next_slot, now)
+			self._next_slot = slot + self.interval
+
+		if slot > now:
+			time.sleep(slot - now)
@@ -3,6 +3,8 @@
 
 import base64
 import os
+import quopri
+from unittest.mock import patch
 
 import saashq
 from saashq import safe_decode
@@ -13,6 +15,7 @@ from saashq.email.email_body import (
 	inline_style_in_html,
 	replace_filename_with_cid,
 )
+from saashq.email.queue import get_unsubcribed_url
 from saashq.email.receive import Email
 from saashq.tests import IntegrationTestCase
 
@@ -81,6 +84,43 @@ This is the text version of this email
 
 		self.assertTrue(result.count("\n") == result.count("\r"))
 
+	def test_build_message_reuses_attachments(self):
+		file = saashq.get_doc(
+			doctype="File", file_name="test_attachment.txt", is_private=1, content="attached content"
+		).insert()
+		QueueBuilder(
+			recipients=["test@example.com", "test1@example.com"],
+			sender="me@example.com",
+			subject="Test Subject",
+			message="This is a newsletter",
+			reference_doctype="User",
+			reference_name="Administrator",
+			unsubscribe_message="Unsubscribe",
+			attachments=[{"fid": file.name}],
+		).process()
+		queue_doc = saashq.get_last_doc("Email Queue")
+		mail_ctx = SendMailContext(queue_doc=queue_doc)
+
+		include_attachments = SendMailContext.include_attachments
+		with patch.object(
+			SendMailContext, "include_attachments", autospec=True, side_effect=include_attachments
+		) as include_attachments:
+			messages = {
+				email: safe_decode(mail_ctx.build_message(recipient_email=email))
+				for email in ("test@example.com", "test1@example.com")
+			}
+
+		include_attachments.assert_called_once()
+		for email, message in messages.items():
+			self.assertIn(f"To: {email}", message)
+			self.assertIn('filename="test_attachment.txt"', message)
+			self.assertNotIn("<!--unsubscribe_url-->", message)
+			self.assertNotIn("<!--recipient-->", message)
+			unsubscribe_url = get_unsubcribed_url(
+				"User", "Administrator", email, queue_doc.unsubscribe_method, queue_doc.unsubscribe_param
+			)
+			self.assertIn(unsubscribe_url, safe_decode(quopri.decodestring(message)))
+
 	def test_image(self):
 		img_signature = """
 Content-Type: image/svg+xml
@@ -1,8 +1,10 @@
 # Copyright (c) 2023-Present, SaasHQ and contributors
 # License: MIT. See LICENSE
 
+import contextvars
 import imaplib
 import poplib
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from saashq.utils import cint
 
@@ -16,3 +18,12 @@ def get_port(doc):
 			doc.incoming_port = poplib.POP3_SSL_PORT if doc.use_ssl else poplib.POP3_PORT
 
 	return cint(doc.incoming_port)
+
+
+def submit_in_context(executor: ThreadPoolExecutor, fn, *args) -> Future:
+	"""Run `fn(*args)` in a thread of `executor`, within a copy of the calling thread's context.
+
+	`saashq.local` is bound to the context, so the threads share it with the calling thread: they may only
+	use it to report connection errors, and must leave the database to the calling thread. Failed OAuth
+	logins are logged to the database, so OAuth sessions are opened from the calling thread instead."""
+	return executor.submit(contextvars.copy_context().run, fn, *args)
@@ -168,6 +168,7 @@ doc_events = {
 		"on_trash": [
 			"saashq.desk.notifications.clear_doctype_notifications",
 			"saashq.workflow.doctype.workflow_action.workflow_action.process_workflow_actions",
+			"saashq.desk.query_report.clear_report_result_cache",
 		],
 		"on_update_after_submit": [
 			"saashq.workflow.doctype.workflow_action.workflow_action.process_workflow_actions",
@@ -178,6 +179,7 @@ doc_events = {
 		"on_change": [
 			"saashq.social.doctype.energy_point_rule.energy_point_rule.process_energy_points",
 			"saashq.automation.doctype.milestone_tracker.milestone_tracker.evaluate_milestone",
+			"saashq.desk.query_report.clear_report_result_cache",
 		],
 		"after_delete": ["saashq.core.doctype.permission_log.permission_log.make_perm_log"],
 	},
@@ -576,6 +578,7 @@ default_log_clearing_doctypes = {
 persistent_cache_keys = [
 	"changelog-*",  # version update notifications
 	"insert_queue_for_*",  # Deferred Insert
+	"insert_stream_for_*",  # Deferred Insert
 	"recorder-*",  # Recorder
 	"global_search_queue",
 ]
@@ -0,0 +1,249 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+"""
+Save many existing documents with batched writes.
+
+`Document.save` writes one `UPDATE` per document and per child row and deletes removed child
+rows per child table. `bulk_update_docs` runs the same checks and controller hooks once per
+document, but groups the row writes by doctype and column set:
+
+- MariaDB: one `UPDATE ... SET col = CASE name WHEN ... END ... WHERE name IN (...)` per group
+- PostgreSQL: one `INSERT ... ON CONFLICT (name) DO UPDATE` per group
+
+New child rows are inserted with one multi-row `INSERT` per group and removed child rows are
+deleted with one `DELETE` per child table.
+
+Usage:
+	todos = saashq.get_docs("ToDo", names)
+	for todo in todos:
+	        todo.status = "Closed"
+
+	saashq.bulk_update_docs(todos, ignore_version=True)
+"""
+
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+import saashq
+from saashq.model.base_document import DOCTYPES_FOR_DOCTYPE, BaseDocument
+from saashq.model.naming import set_new_name
+from saashq.utils import create_batch, cstr, now
+
+if TYPE_CHECKING:
+	from saashq.model.document import Document
+
+BULK_UPDATE_BATCH_SIZE = 200  # documents validated, written and hooked together
+
+
+def bulk_update_docs(
+	docs: Iterable["Document"],
+	*,
+	ignore_permissions: bool | None = None,
+	ignore_version: bool | None = None,
+	batch_size: int = BULK_UPDATE_BATCH_SIZE,
+) -> list["Document"]:
+	"""Save all `docs`, writing rows of the same doctype and column set with a single query.
+
+	Validations, `before_*` and `on_*` controller methods run once per document, as with
+	`doc.save()`. Within a batch, all documents are validated before any of them is written and
+	`on_update` etc. run after all of them are written.
+
+	New documents, singles, virtual doctypes and documents whose controller writes its own rows
+	are saved one by one.
+
+	:param docs: Documents to save.
+	:param ignore_permissions: Skip write permission checks.
+	:param ignore_version: Don't create a Version for the changes.
+	:param batch_size: Number of documents written together.
+	"""
+	docs = list(docs)
+
+	for batch in create_batch(docs, batch_size):
+		writer = _BulkRowWriter()
+		prepared = []
+
+		for doc in batch:
+			if doc.flags.in_print:
+				continue
+
+			if not _can_bulk_update(doc):
+				doc.save(ignore_permissions=ignore_permissions, ignore_version=ignore_version)
+				continue
+
+			doc._set_save_flags(ignore_permissions, ignore_version)
+			doc._prepare_for_update()
+			writer.add(doc)
+			prepared.append(doc)
+
+		writer.flush()
+
+		for doc in prepared:
+			doc._after_update()
+
+	return docs
+
+
+def _can_bulk_update(doc: "Document") -> bool:
+	if doc.get("__islocal") or not doc.get("name"):
+		return False
+
+	if doc.meta.issingle or doc.meta.is_virtual or doc.doctype in DOCTYPES_FOR_DOCTYPE:
+		return False
+
+	return not _writes_own_rows(doc)
+
+
+def _writes_own_rows(doc: BaseDocument) -> bool:
+	cls = type(doc)
+	return cls.db_update is not BaseDocument.db_update or cls.db_insert is not BaseDocument.db_insert
+
+
+class _BulkRowWriter:
+	"""Collect rows of prepared documents and write them grouped by doctype and columns."""
+
+	def __init__(self):
+		self.updates: dict[tuple[str, tuple[str, ...]], list[tuple[BaseDocument, dict]]] = {}
+		self.inserts: dict[tuple[str, tuple[str, ...]], list[tuple[BaseDocument, dict]]] = {}
+		# (child doctype, parenttype, parentfield) -> (parents, names of rows to keep)
+		self.child_tables: dict[tuple[str, str, str], tuple[list[str], list[str]]] = {}
+		self.single_rows: list[BaseDocument] = []
+
+	def add(self, doc: "Document"):
+		self.add_row(doc)
+
+		for df in doc.meta.get_table_fields():
+			rows = doc.get(df.fieldname)
+			if not (
+				df.options in (doc.flags.ignore_children_type or ()) or saashq.get_meta(df.options).is_virtual
+			):
+				key = (df.options, doc.doctype, df.fieldname)
+				parents, keep = self.child_tables.setdefault(key, ([], []))
+				parents.append(doc.name)
+				keep.extend(row.name for row in rows if row.name and not row.is_new())
+
+			for row in rows:
+				self.add_row(row)
+
+	def add_row(self, doc: BaseDocument):
+		if _writes_own_rows(doc) or getattr(doc.meta, "is_virtual", False):
+			self.single_rows.append(doc)
+			return
+
+		is_new = doc.get("__islocal") or not doc.name
+		if is_new:
+			if not doc.name:
+				set_new_name(doc)
+
+			if not doc.creation:
+				doc.creation = doc.modified = now()
+				doc.owner = doc.modified_by = saashq.session.user
+
+		values = doc.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True)
+		groups = self.inserts if is_new else self.updates
+		groups.setdefault((doc.doctype, tuple(values)), []).append((doc, values))
+
+	def flush(self):
+		for (doctype, parenttype, parentfield), (parents, keep) in self.child_tables.items():
+			self.delete_removed_rows(doctype, parenttype, parentfield, parents, keep)
+
+		for (doctype, columns), rows in self.updates.items():
+			self.write(self.update_rows, doctype, columns, rows, fallback=lambda doc: doc.db_update())
+
+		for (doctype, columns), rows in self.inserts.items():
+			self.write(self.insert_rows, doctype, columns, rows, fallback=lambda doc: doc.db_insert())
+			for doc, _values in rows:
+				doc.set("__islocal", False)
+
+		for doc in self.single_rows:
+			doc.db_update()
+
+	@staticmethod
+	def delete_removed_rows(doctype, parenttype, parentfield, parents, keep):
+		table = saashq.qb.DocType(doctype)
+		query = (
+			saashq.qb.from_(table)
+			.where(table.parent.isin(parents))
+			.where(table.parenttype == parenttype)
+			.where(table.parentfield == parentfield)
+			.delete()
+		)
+		if keep:
+			query = query.where(table.name.notin(keep))
+
+		query.run()
+
+	@staticmethod
+	def write(write_rows, doctype, columns, rows, fallback):
+		"""Write `rows` with one query, or row by row if the batch fails on a constraint.
+
+		The row by row write raises the same errors (e.g. `UniqueValidationError`) as `save`."""
+		if len(rows) == 1:
+			fallback(rows[0][0])
+			return
+
+		saashq.db.savepoint("bulk_update_docs")
+		try:
+			write_rows(doctype, columns, [values for _doc, values in rows])
+		except Exception as e:
+			if not (
+				saashq.db.is_unique_key_violation(e)
+				or saashq.db.is_primary_key_violation(e)
+				or isinstance(e, saashq.db.DataError)
+			):
+				raise
+
+			saashq.db.rollback(save_point="bulk_update_docs")
+			for doc, _values in rows:
+				fallback(doc)
+		else:
+			saashq.db.release_savepoint("bulk_update_docs")
+
+	@staticmethod
+	def update_rows(doctype: str, columns: tuple[str, ...], rows: list[dict]):
+		if saashq.db.db_type == "postgres":
+			# An upsert on the primary key keeps value types intact, `CASE` would make them text.
+			_BulkRowWriter.insert_rows(
+				doctype,
+				columns,
+				rows,
+				conflict_handler="ON CONFLICT (`name`) DO UPDATE SET {}".format(
+					", ".join(f"`{c}` = EXCLUDED.`{c}`" for c in columns if c != "name")
+				),
+			)
+			return
+
+		# `ON DUPLICATE KEY UPDATE` would also match rows on other unique keys, `CASE` only
+		# touches the rows being saved.
+		names = [cstr(row["name"]) for row in rows]
+		assignments = []
+		values = []
+		for column in columns:
+			if column == "name":
+				# don't update name, as case might've been changed
+				continue
+
+			assignments.append(
+				"`{0}` = CASE `name` {1} END".format(column, " ".join(["WHEN %s THEN %s"] * len(rows)))
+			)
+			for name, row in zip(names, rows, strict=True):
+				values.extend((name, row[column]))
+
+		saashq.db.sql(
+			"UPDATE `tab{doctype}` SET {assignments} WHERE `name` IN ({names})".format(
+				doctype=doctype, assignments=", ".join(assignments), names=", ".join(["%s"] * len(names))
+			),
+			values + names,
+		)
+
+	@staticmethod
+	def insert_rows(doctype: str, columns: tuple[str, ...], rows: list[dict], conflict_handler: str = ""):
+		row_placeholder = "({})".format(", ".join(["%s"] * len(columns)))
+		saashq.db.sql(
+			"INSERT INTO `tab{doctype}` ({columns}) VALUES {rows} {conflict_handler}".format(
+				doctype=doctype,
+				columns=", ".join(f"`{c}`" for c in columns),
+				rows=", ".join([row_placeholder] * len(rows)),
+				conflict_handler=conflict_handler,
+			),
+			[row[column] for row in rows for column in columns],
+		)
@@ -14,6 +14,7 @@ import saashq.defaults
 import saashq.permissions
 import saashq.share
 from saashq import _
+from saashq.cache_manager import get_match_conditions_version
 from saashq.core.doctype.server_script.server_script_utils import get_server_script_map
 from saashq.database.utils import DefaultOrderBy, FallBackDateTimeStr, NestedSetHierarchy
 from saashq.model import get_permitted_fields, optional_fields
@@ -46,6 +47,7 @@ STRICT_FIELD_PATTERN = re.compile(r".*/\*.*")
 STRICT_UNION_PATTERN = re.compile(r".*\s(union).*\s")
 ORDER_GROUP_PATTERN = re.compile(r".*[^a-z0-9-_ ,`'\"\.\(\)].*")
 SPECIAL_FIELD_CHARS = frozenset(("(", "`", ".", "'", '"', "*"))
+MATCH_CONDITIONS_CACHE_TTL = 10 * 60
 
 
 class DatabaseQuery:
@@ -109,6 +111,8 @@ class DatabaseQuery:
 		ignore_ddl=False,
 		*,
 		parent_doctype=None,
+		cache=False,
+		as_rows=False,
 	) -> list:
 		if not ignore_permissions:
 			self.check_read_permission(self.doctype, parent_doctype=parent_doctype)
@@ -149,6 +153,7 @@ class DatabaseQuery:
 		self.join = join
 		self.distinct = distinct
 		self.as_list = as_list
+		self.as_rows = as_rows and not as_list
 		self.ignore_ifnull = ignore_ifnull
 		self.flags.ignore_permissions = ignore_permissions
 		self.user = user or saashq.session.user
@@ -158,6 +163,7 @@ class DatabaseQuery:
 		self.strict = strict
 		self.ignore_ddl = ignore_ddl
 		self.parent_doctype = parent_doctype
+		self.cache = cache
 
 		# for contextual user permission check
 		# to determine which user permission is applicable on link field of specific doctype
@@ -192,7 +198,7 @@ class DatabaseQuery:
 
 		result = self.build_and_run()
 
-		if sbool(with_comment_count) and not as_list and self.doctype:
+		if sbool(with_comment_count) and not (as_list or self.as_rows) and self.doctype:
 			self.add_comment_count(result)
 
 		if save_user_settings:
@@ -234,10 +240,12 @@ class DatabaseQuery:
 		return saashq.db.sql(
 			query,
 			as_dict=not self.as_list,
+			as_rows=self.as_rows,
 			debug=self.debug,
 			update=self.update,
 			ignore_ddl=self.ignore_ddl,
 			run=self.run,
+			cache=self.cache,
 		)
 
 	def prepare_args(self):
@@ -923,15 +931,78 @@ class DatabaseQuery:
 
 	def build_match_conditions(self, as_condition=True) -> str | list:
 		"""add match conditions if applicable"""
-		self.match_filters = []
-		self.match_conditions = []
-		only_if_shared = False
 		if not self.user:
 			self.user = saashq.session.user
 
 		if not self.tables:
 			self.extract_tables()
 
+		compiled = self.get_compiled_match_conditions()
+		self.match_conditions = compiled.match_conditions.copy()
+		self.match_filters = copy.deepcopy(compiled.match_filters)
+		self.shared = compiled.shared.copy()
+		self._fetch_shared_documents = compiled.fetch_shared
+
+		if compiled.only_if_shared:
+			if not self.shared:
+				saashq.throw(_("No permission to read {0}").format(_(self.doctype)), saashq.PermissionError)
+			else:
+				self.conditions.append(self.get_share_condition())
+
+		if as_condition:
+			conditions = ""
+			if self.match_conditions:
+				# will turn out like ((blog_post in (..) and blogger in (...)) or (blog_category in (...)))
+				conditions = "((" + ") or (".join(self.match_conditions) + "))"
+
+			doctype_conditions = self.get_permission_query_conditions()
+			if doctype_conditions:
+				conditions += (" and " + doctype_conditions) if conditions else doctype_conditions
+
+			# share is an OR condition, if there is a role permission
+			if not compiled.only_if_shared and self.shared and conditions:
+				conditions = f"(({conditions}) or ({self.get_share_condition()}))"
+
+			return conditions
+
+		else:
+			return self.match_filters
+
+	def get_compiled_match_conditions(self) -> "saashq._dict":
+		"""Return user permission and share based conditions of this query's doctype for `self.user`.
+
+		These only depend on role permissions, user permissions and shares of the user, so they are
+		cached per user and invalidated when any of those change (see `clear_match_conditions_cache`), or
+		when the doctype changes (see `bump_match_conditions_version`).
+		Conditions from `permission_query_conditions` hooks and server scripts are not cached."""
+		key = (
+			self.doctype,
+			self.reference_doctype,
+			bool(self.flags.ignore_permissions),
+			cint(saashq.get_system_settings("apply_strict_user_permissions")),
+		)
+		version = get_match_conditions_version(self.doctype)
+		compiled_for_user = saashq.cache.get_value("match_conditions", user=self.user, expires=True) or {}
+		if key in compiled_for_user and compiled_for_user[key][0] == version:
+			return compiled_for_user[key][1]
+
+		compiled = self.compile_match_conditions()
+		# expires in case it was compiled from permissions changed (and cleared) in the meantime
+		saashq.cache.set_value(
+			"match_conditions",
+			{**compiled_for_user, key: (version, compiled)},
+			user=self.user,
+			expires_in_sec=MATCH_CONDITIONS_CACHE_TTL,
+		)
+		return compiled
+
+	def compile_match_conditions(self) -> "saashq._dict":
+		self.match_filters = []
+		self.match_conditions = []
+		self.shared = []
+		self._fetch_shared_documents = False
+		only_if_shared = False
+
 		role_permissions = saashq.permissions.get_role_permissions(self.doctype_meta, user=self.user)
 		if (
 			not self.doctype_meta.istable
@@ -942,10 +1013,6 @@ class DatabaseQuery:
 		):
 			only_if_shared = True
 			self.shared = saashq.share.get_shared(self.doctype, self.user)
-			if not self.shared:
-				saashq.throw(_("No permission to read {0}").format(_(self.doctype)), saashq.PermissionError)
-			else:
-				self.conditions.append(self.get_share_condition())
 
 		else:
 			# skip user perm check if owner constraint is required
@@ -969,24 +1036,13 @@ class DatabaseQuery:
 			if self._fetch_shared_documents:
 				self.shared = saashq.share.get_shared(self.doctype, self.user)
 
-		if as_condition:
-			conditions = ""
-			if self.match_conditions:
-				# will turn out like ((blog_post in (..) and blogger in (...)) or (blog_category in (...)))
-				conditions = "((" + ") or (".join(self.match_conditions) + "))"
-
-			doctype_conditions = self.get_permission_query_conditions()
-			if doctype_conditions:
-				conditions += (" and " + doctype_conditions) if conditions else doctype_conditions
-
-			# share is an OR condition, if there is a role permission
-			if not only_if_shared and self.shared and conditions:
-				conditions = f"(({conditions}) or ({self.get_share_condition()}))"
-
-			return conditions
-
-		else:
-			return self.match_filters
+		return saashq._dict(
+			match_conditions=self.match_conditions,
+			match_filters=self.match_filters,
+			shared=self.shared,
+			fetch_shared=self._fetch_shared_documents,
+			only_if_shared=only_if_shared,
+		)
 
 	def get_share_condition(self):
 		return (
@@ -24,7 +24,7 @@ from saashq.model.naming import set_new_name, validate_name
 from saashq.model.utils import is_virtual_doctype, simple_singledispatch
 from saashq.model.workflow import set_workflow_state_on_action, validate_workflow
 from saashq.types import DF, DocRef
-from saashq.utils import compare, cstr, date_diff, file_lock, flt, now
+from saashq.utils import compare, create_batch, cstr, date_diff, file_lock, flt, now
 from saashq.utils.data import get_absolute_url, get_datetime, get_timedelta, getdate
 from saashq.utils.global_search import update_global_search
 
@@ -36,6 +36,7 @@ if TYPE_CHECKING:
 
 DOCUMENT_LOCK_EXPIRTY = 12 * 60 * 60  # All locks expire in 12 hours automatically
 DOCUMENT_LOCK_SOFT_EXPIRY = 60 * 60  # Let users force-unlock after 60 minutes
+GET_DOCS_BATCH_SIZE = 1000  # Max number of names in a single `IN` clause of `get_docs`
 
 
 @simple_singledispatch
@@ -65,6 +66,12 @@ def get_doc(*args, **kwargs) -> "Document":
 
 	        # select a document for update
 	        user = get_doc("User", "test@example.com", for_update=True)
+
+	        # load child tables only when they are used
+	        user = get_doc("User", "test@example.com", lazy_children=True)
+
+	        # load only some fields, documents loaded this way can't be saved
+	        user = get_doc("User", "test@example.com", fields=["enabled", "roles"])
 	"""
 	if not args and kwargs:
 		return get_doc_from_dict(kwargs)
@@ -107,6 +114,148 @@ def get_doc_from_dict(data: dict[str, Any], **kwargs) -> "Document":
 	raise ImportError(data["doctype"])
 
 
+def get_docs(doctype: str, names: Iterable[str | int], *, for_update: bool = False) -> list["Document"]:
+	"""Return documents of `doctype` for all `names`, in the order they are passed.
+
+	Unlike calling `get_doc` in a loop, parents are fetched with one `IN` query and each child
+	doctype with one query (per batch of `GET_DOCS_BATCH_SIZE` names). Duplicate names are
+	loaded once. Singles, virtual doctypes and controllers with a custom `load_from_db` are
+	loaded one by one.
+
+	        todos = get_docs("ToDo", ["TD0001", "TD0002"])
+	"""
+	names = list(dict.fromkeys(names))
+	controller = get_controller(doctype)
+	meta = saashq.get_meta(doctype)
+	kwargs = {"for_update": for_update} if for_update else {}
+
+	if meta.issingle or meta.is_virtual or controller.load_from_db is not Document.load_from_db:
+		return [get_doc(doctype, name, **kwargs) for name in names]
+
+	docs = []
+	for batch in create_batch(names, GET_DOCS_BATCH_SIZE):
+		parents = {
+			cstr(d.name): d
+			for d in saashq.db.get_values(
+				doctype, {"name": ("in", batch)}, "*", as_dict=True, order_by=None, for_update=for_update
+			)
+		}
+		children = _get_children_of(doctype, meta.get_table_fields(), list(parents), for_update)
+
+		for name in batch:
+			if (parent := parents.get(cstr(name))) is None:
+				saashq.throw(_("{0} {1} not found").format(_(doctype), name), saashq.DoesNotExistError)
+
+			prefetched = (parent, children.get(cstr(name), {}))
+			docs.append(controller(doctype, parent.name, _prefetched=prefetched, **kwargs))
+
+	return docs
+
+
+def _get_children_of(
+	parenttype: str, table_fields: list["DocField"], parents: list[str], for_update: bool = False
+) -> dict[str, dict[str, list[dict]]]:
+	"""Return child rows of all `parents`, as `{parent: {parentfield: [rows]}}`."""
+	children = {}
+	if not parents:
+		return children
+
+	fieldnames_by_doctype = {}
+	for df in table_fields:
+		if not is_virtual_doctype(df.options):
+			fieldnames_by_doctype.setdefault(df.options, []).append(df.fieldname)
+
+	for child_doctype, fieldnames in fieldnames_by_doctype.items():
+		rows = saashq.db.get_values(
+			child_doctype,
+			{"parent": ("in", parents), "parenttype": parenttype, "parentfield": ("in", fieldnames)},
+			"*",
+			as_dict=True,
+			order_by="idx asc",
+			for_update=for_update,
+		)
+		for row in rows:
+			children.setdefault(cstr(row.parent), {}).setdefault(row.parentfield, []).append(row)
+
+	return children
+
+
+class LazyChildTable(list):
+	"""Rows of a child table, loaded from the database the first time the list is used.
+
+	Set instead of the loaded rows by `Document.load_children_from_db` if the document is loaded
+	with `lazy_children=True`, or with `fields` that don't include the table field."""
+
+	__slots__ = ("_df", "_parent")
+
+	def __init__(self, parent: "Document", df: "DocField"):
+		super().__init__()
+		self._parent = parent
+		self._df = df
+
+	def load(self):
+		if (parent := self._parent) is None:
+			return
+
+		self._parent = None
+		# rows are added through the parent to set their parent fields, a replaced table stays empty
+		if parent.__dict__.get(self._df.fieldname) is self:
+			parent.extend(self._df.fieldname, parent.get_children_from_db(self._df))
+
+	@property
+	def is_loaded(self) -> bool:
+		return self._parent is None
+
+	def __reduce_ex__(self, protocol):
+		# pickled and copied as the loaded rows, unpickling replays them before the slots are restored
+		self.load()
+		return list, (list(self),)
+
+
+def _load_before(method):
+	@wraps(method)
+	def wrapper(self, *args, **kwargs):
+		self.load()
+		return method(self, *args, **kwargs)
+
+	return wrapper
+
+
+for _method in (
+	"__add__",
+	"__contains__",
+	"__delitem__",
+	"__eq__",
+	"__ge__",
+	"__getitem__",
+	"__gt__",
+	"__iadd__",
+	"__imul__",
+	"__iter__",
+	"__le__",
+	"__len__",
+	"__lt__",
+	"__mul__",
+	"__ne__",
+	"__repr__",
+	"__reversed__",
+	"__rmul__",
+	"__setitem__",
+	"append",
+	"clear",
+	"copy",
+	"count",
+	"extend",
+	"index",
+	"insert",
+	"pop",
+	"remove",
+	"reverse",
+	"sort",
+):
+	setattr(LazyChildTable, _method, _load_before(getattr(list, _method)))
+
+
 @contextmanager
 def read_only_document(context=None):
 	# Store original methods
@@ -205,6 +354,13 @@ class Document(BaseDocument, DocRef):
 		# for_update is set in flags to avoid changing load_from_db signature
 		# since it is used in virtual doctypes and inherited in child classes
 		self.flags.for_update = kwargs.get("for_update")
+		if "_prefetched" in kwargs:
+			# rows already fetched by `get_docs`
+			self.flags.prefetched = kwargs.pop("_prefetched")
+		if kwargs.pop("lazy_children", False):
+			self.flags.lazy_children = True
+		if fields := kwargs.pop("fields", None):
+			self.flags.loaded_fields = set(fields)
 		self.load_from_db()
 		if kwargs:  # ad-hoc overrides
 			self._init_from_kwargs(kwargs)
@@ -247,13 +403,22 @@ class Document(BaseDocument, DocRef):
 			self.init_valid_columns()
 			self._fix_numeric_types()
 
+		elif self.flags.prefetched:
+			d = self.flags.prefetched[0]
+			super().__init__(d)
+
 		else:
 			get_value_kwargs = {"for_update": self.flags.for_update, "as_dict": True}
 			if not isinstance(self.name, dict | list):
 				get_value_kwargs["order_by"] = None
 
+			fieldname = "*"
+			if self.flags.loaded_fields:
+				table_fieldnames = {df.fieldname for df in self._get_table_fields()}
+				fieldname = ["name", *(f for f in self.flags.loaded_fields if f not in table_fieldnames)]
+
 			d = saashq.db.get_value(
-				doctype=self.doctype, filters=self.name, fieldname="*", **get_value_kwargs
+				doctype=self.doctype, filters=self.name, fieldname=fieldname, **get_value_kwargs
 			)
 
 			if not d:
@@ -265,6 +430,7 @@ class Document(BaseDocument, DocRef):
 		self.flags.pop("ignore_children", None)
 
 		self.load_children_from_db()
+		self.flags.pop("prefetched", None)
 
 		# sometimes __setup__ can depend on child values, hence calling again at the end
 		if hasattr(self, "__setup__"):
@@ -273,6 +439,8 @@ class Document(BaseDocument, DocRef):
 		return self
 
 	def load_children_from_db(self):
+		prefetched_children = self.flags.prefetched[1] if self.flags.get("prefetched") else None
+
 		for df in self._get_table_fields():
 			# Make sure not to query the DB for a child table, if it is a virtual one.
 			# During saashq is installed, the property "is_virtual" is not available in tabDocType, so
@@ -281,22 +449,33 @@ class Document(BaseDocument, DocRef):
 				self.set(df.fieldname, [])
 				continue
 
-			children = (
-				saashq.db.get_values(
-					df.options,
-					{"parent": self.name, "parenttype": self.doctype, "parentfield": df.fieldname},
-					"*",
-					as_dict=True,
-					order_by="idx asc",
-					for_update=self.flags.for_update,
-				)
-				or []
-			)
+			if prefetched_children is not None:
+				self.set(df.fieldname, prefetched_children.get(df.fieldname, []))
+				continue
 
-			self.set(df.fieldname, children)
+			if self.flags.lazy_children or (
+				self.flags.loaded_fields and df.fieldname not in self.flags.loaded_fields
+			):
+				self.__dict__[df.fieldname] = LazyChildTable(self, df)
+				continue
+
+			self.set(df.fieldname, self.get_children_from_db(df))
 
 		return self
 
+	def get_children_from_db(self, df) -> list[dict]:
+		return (
+			saashq.db.get_values(
+				df.options,
+				{"parent": self.name, "parenttype": self.doctype, "parentfield": df.fieldname},
+				"*",
+				as_dict=True,
+				order_by="idx asc",
+				for_update=self.flags.for_update,
+			)
+			or []
+		)
+
 	def reload(self) -> "Self":
 		"""Reload document from database"""
 		return self.load_from_db()
@@ -442,6 +621,32 @@ class Document(BaseDocument, DocRef):
 		if self.flags.in_print:
 			return self
 
+		if self.flags.loaded_fields:
+			saashq.throw(
+				_("{0} {1} can't be saved, only some of its fields were loaded").format(
+					_(self.doctype), self.name
+				)
+			)
+
+		self._set_save_flags(ignore_permissions, ignore_version)
+
+		if self.get("__islocal") or not self.get("name"):
+			return self.insert()
+
+		self._prepare_for_update()
+
+		# parent
+		if self.meta.issingle:
+			self.update_single(self.get_valid_dict())
+		else:
+			self.db_update()
+
+		self.update_children()
+		self._after_update()
+
+		return self
+
+	def _set_save_flags(self, ignore_permissions=None, ignore_version=None):
 		self.flags.notifications_executed = []
 
 		if ignore_permissions is not None:
@@ -449,9 +654,8 @@ class Document(BaseDocument, DocRef):
 
 		self.flags.ignore_version = saashq.flags.in_test if ignore_version is None else ignore_version
 
-		if self.get("__islocal") or not self.get("name"):
-			return self.insert()
-
+	def _prepare_for_update(self):
+		"""Run checks, validations and `before_*` methods before an existing document is written."""
 		self.check_if_locked()
 		self._set_defaults()
 		self.check_permission("write", "save")
@@ -474,21 +678,14 @@ class Document(BaseDocument, DocRef):
 
 		self.set_docstatus()
 
-		# parent
-		if self.meta.issingle:
-			self.update_single(self.get_valid_dict())
-		else:
-			self.db_update()
-
-		self.update_children()
+	def _after_update(self):
+		"""Run `on_*` methods after an existing document is written."""
 		self.run_post_save_methods()
 
 		# clear unsaved flag
 		if hasattr(self, "__unsaved"):
 			delattr(self, "__unsaved")
 
-		return self
-
 	def copy_attachments_from_amended_from(self):
 		"""Copy attachments from `amended_from`"""
 		from saashq.desk.form.load import get_attachments
@@ -1399,7 +1596,10 @@ class Document(BaseDocument, DocRef):
 
 		version = saashq.new_doc("Version")
 		if version.update_version_info(doc_to_compare, self):
-			version.insert(ignore_permissions=True)
+			if self.meta.get("defer_version_tracking"):
+				version.deferred_insert_after_commit()
+			else:
+				version.insert(ignore_permissions=True)
 
 			if not saashq.flags.in_migrate:
 				# follow since you made a change?
@@ -39,6 +39,7 @@ from saashq.model.base_document import (
 	BaseDocument,
 )
 from saashq.model.document import Document
+from saashq.model.meta_codec import UnsupportedValueError, decode_meta, decode_table, encode_meta
 from saashq.model.workflow import get_workflow_name
 from saashq.modules import load_doctype_module
 from saashq.types import DocRef
@@ -143,6 +144,66 @@ class Meta(Document):
 		super().__init__(doc.as_dict())
 		self.process()
 
+	def __reduce_ex__(self, protocol):
+		# cached meta is stored in a compact format, see `saashq.model.meta_codec`
+		try:
+			return (decode_meta, (type(self), self.name, encode_meta(self)))
+		except UnsupportedValueError:
+			return super().__reduce_ex__(protocol)
+
+	def __getstate__(self):
+		self._load_lazy_tables()
+		state = super().__getstate__()
+		state.pop("_lazy_tables", None)
+		return state
+
+	def __getattr__(self, name):
+		# only called for attributes missing on meta decoded by `decode_meta`
+		lazy_tables = self.__dict__.get("_lazy_tables")
+		if lazy_tables and name in lazy_tables:
+			self._load_lazy_table(name)
+			return self.__dict__[name]
+
+		if name in ("_fields", "_table_fields") and "_lazy_tables" in self.__dict__:
+			self.init_field_caches()
+			return self.__dict__[name]
+
+		raise AttributeError(name)
+
+	def _load_lazy_table(self, fieldname):
+		# cached meta is shared between threads: decode into a local list and publish it with a single
+		# `setdefault`, so a table is only ever seen fully decoded and a concurrent load doesn't replace it
+		lazy_tables = self.__dict__["_lazy_tables"]
+		if fieldname in self.__dict__ or fieldname not in lazy_tables:
+			return
+
+		table = decode_table(self, lazy_tables[fieldname])
+		if self.__dict__.setdefault(fieldname, table) is not table:
+			return
+
+		# don't mutate the mapping in place, it's shared with copies like `FormMeta`
+		self.__dict__["_lazy_tables"] = {
+			name: value for name, value in self.__dict__["_lazy_tables"].items() if name != fieldname
+		}
+
+		if fieldname == "fields":
+			# field caches may have been copied from another meta, rebuild them for these objects
+			self.__dict__.pop("_fields", None)
+			self.__dict__.pop("_table_fields", None)
+
+	def _load_lazy_tables(self):
+		for fieldname in list(self.__dict__.get("_lazy_tables") or ()):
+			self._load_lazy_table(fieldname)
+
+	def get(self, key, filters=None, limit=None, default=None):
+		if lazy_tables := self.__dict__.get("_lazy_tables"):
+			if isinstance(key, dict):
+				self._load_lazy_tables()
+			elif key in lazy_tables:
+				self._load_lazy_table(key)
+
+		return super().get(key, filters=filters, limit=limit, default=default)
+
 	def load_from_db(self):
 		try:
 			super().load_from_db()
@@ -168,6 +229,10 @@ class Meta(Document):
 		self.add_custom_links_and_actions()
 
 	def as_dict(self, no_nulls=False):
+		self._load_lazy_tables()
+		if "_fields" not in self.__dict__:
+			self.init_field_caches()
+
 		def serialize(doc):
 			out = {}
 			for key, value in doc.__dict__.items():
@@ -479,7 +544,7 @@ class Meta(Document):
 		if self.name == "DocType":
 			self._table_fields = DOCTYPE_TABLE_FIELDS
 		else:
-			self._table_fields = self.get("fields", {"fieldtype": ["in", table_fields]})
+			self._table_fields = [df for df in self.fields if df.fieldtype in table_fields]
 
 	def sort_fields(self):
 		"""
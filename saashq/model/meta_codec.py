@@ -0,0 +1,328 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+"""
+Compact, pickle-free serialization for cached `Meta` objects.
+
+A `Meta` is encoded with `marshal` as a header (scalar DocType properties) plus one
+interned table per child table field: each distinct set of column names is stored once and
+every row is a tuple of values in column order. Child rows are only turned into `DocField` (etc.)
+objects when the table is first accessed, see `Meta._load_lazy_table`.
+
+Usage:
+	`Meta.__reduce_ex__` uses this codec, so `saashq.cache.hset("doctype_meta", ...)`
+	transparently stores the compact format. Compare both formats with:
+
+	wrench --site <site> execute saashq.model.meta_codec.benchmark
+"""
+
+import importlib
+import io
+import marshal
+import pickle
+import sys
+import time
+import tracemalloc
+import weakref
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from decimal import Decimal
+from functools import cache
+
+import saashq
+from saashq.model.base_document import BaseDocument
+
+CODEC_VERSION = 1
+
+# marshal's format may change between python versions, entries written by another
+# interpreter are discarded and rebuilt instead of being decoded.
+FORMAT_HEADER = (CODEC_VERSION, marshal.version, tuple(sys.version_info[:2]))
+
+# Caches computed from child tables, these are rebuilt on access instead of being stored.
+DERIVED_KEYS = frozenset(
+	(
+		"_fields",
+		"_table_fields",
+		"_dynamic_link_fields",
+		"_set_only_once_fields",
+		"high_permlevel_fields",
+		"_lazy_tables",
+	)
+)
+
+_TUPLE = "\x00tuple"
+_DICT = "\x00_dict"
+_DATETIME = "\x00datetime"
+_DATE = "\x00date"
+_TIME = "\x00time"
+_TIMEDELTA = "\x00timedelta"
+_DECIMAL = "\x00decimal"
+
+_PRIMITIVE_TYPES = frozenset((str, int, float, bool, bytes, type(None)))
+
+
+class UnsupportedValueError(TypeError):
+	pass
+
+
+def encode_meta(meta) -> bytes:
+	"""Encode `Meta` into compact bytes.
+
+	Raise `UnsupportedValueError` if meta contains values this codec can't represent."""
+	header = {}
+	complex_header = {}
+	tables = {}
+
+	for key, value in meta.__getstate__().items():
+		if key in DERIVED_KEYS:
+			continue
+
+		if key in meta._table_fieldnames and isinstance(value, list):
+			tables[key] = _encode_table(value)
+			continue
+
+		value = _encode_value(value)
+		if _needs_decoding(value):
+			complex_header[key] = value
+		else:
+			header[key] = value
+
+	return marshal.dumps((FORMAT_HEADER, header, complex_header, tables))
+
+
+def decode_meta(cls, name: str, data: bytes):
+	"""Rebuild an instance of `cls` (Meta or a subclass) from `encode_meta` output.
+
+	Child tables are decoded lazily on first access."""
+	try:
+		format_header, header, complex_header, tables = marshal.loads(data)
+	except (EOFError, ValueError, TypeError):
+		format_header = None
+
+	if format_header != FORMAT_HEADER:
+		# written by a different version, build it again from the database
+		return cls(name)
+
+	meta = cls.__new__(cls)
+	meta.__dict__ = header
+	for key, value in complex_header.items():
+		header[key] = _decode_value(value)
+
+	header["_lazy_tables"] = tables
+
+	return meta
+
+
+def decode_table(parent, table) -> list:
+	classes, shapes, rows = table
+	classes = [_import_class(*path) for path in classes]
+	parent_ref = weakref.ref(parent)
+	out = []
+
+	for class_index, shape_index, values in rows:
+		columns, complex_columns = shapes[shape_index]
+		doc = object.__new__(classes[class_index])
+		doc.__dict__ = state = dict(zip(columns, values, strict=True))
+		for column in complex_columns:
+			state[column] = _decode_value(state[column])
+
+		state["_parent_doc"] = parent_ref
+		out.append(doc)
+
+	return out
+
+
+def _encode_table(rows: list[BaseDocument]):
+	"""Encode child rows as `(classes, shapes, rows)`.
+
+	A shape is the tuple of keys set on a row along with the keys whose values need decoding,
+	rows only store a class index, a shape index and the tuple of values."""
+	classes = {}
+	shapes = {}
+	encoded_rows = []
+
+	for row in rows:
+		if not isinstance(row, BaseDocument):
+			raise UnsupportedValueError(type(row))
+
+		cls = type(row)
+		class_path = (cls.__module__, cls.__qualname__)
+		class_index = classes.setdefault(class_path, len(classes))
+
+		state = {key: _encode_value(value) for key, value in row.__getstate__().items()}
+		columns = tuple(state)
+		complex_columns = tuple(key for key, value in state.items() if _needs_decoding(value))
+		shape_index = shapes.setdefault((columns, complex_columns), len(shapes))
+
+		encoded_rows.append((class_index, shape_index, tuple(state.values())))
+
+	return (tuple(classes), tuple(shapes), tuple(encoded_rows))
+
+
+def _encode_value(value):
+	value_type = type(value)
+
+	if value_type in _PRIMITIVE_TYPES:
+		return value
+
+	if value_type is list:
+		return [_encode_value(v) for v in value]
+
+	if value_type is dict:
+		return {k: _encode_value(v) for k, v in value.items()}
+
+	if value_type is saashq._dict:
+		return (_DICT, {k: _encode_value(v) for k, v in value.items()})
+
+	if value_type is tuple:
+		return (_TUPLE, [_encode_value(v) for v in value])
+
+	if value_type in (set, frozenset) and all(type(v) in _PRIMITIVE_TYPES for v in value):
+		# copy, marshal would share objects that were identical while dumping
+		return value_type(value)
+
+	if value_type is datetime:
+		return (_DATETIME, value.isoformat())
+
+	if value_type is date:
+		return (_DATE, value.isoformat())
+
+	if value_type is dt_time:
+		return (_TIME, value.isoformat())
+
+	if value_type is timedelta:
+		return (_TIMEDELTA, (value.days, value.seconds, value.microseconds))
+
+	if value_type is Decimal:
+		return (_DECIMAL, str(value))
+
+	raise UnsupportedValueError(value_type)
+
+
+def _needs_decoding(encoded_value) -> bool:
+	"""Containers of primitives come out of `marshal.loads` as new objects, no work needed."""
+	value_type = type(encoded_value)
+
+	if value_type is tuple:
+		return True
+
+	if value_type is list:
+		return any(_needs_decoding(v) for v in encoded_value)
+
+	if value_type is dict:
+		return any(_needs_decoding(v) for v in encoded_value.values())
+
+	return False
+
+
+def _decode_value(value):
+	value_type = type(value)
+
+	if value_type is list:
+		return [_decode_value(v) for v in value]
+
+	if value_type is dict:
+		return {k: _decode_value(v) for k, v in value.items()}
+
+	if value_type is not tuple:
+		return value
+
+	tag, value = value
+	if tag == _DICT:
+		return saashq._dict({k: _decode_value(v) for k, v in value.items()})
+	if tag == _TUPLE:
+		return tuple(_decode_value(v) for v in value)
+	if tag == _DATETIME:
+		return datetime.fromisoformat(value)
+	if tag == _DATE:
+		return date.fromisoformat(value)
+	if tag == _TIME:
+		return dt_time.fromisoformat(value)
+	if tag == _TIMEDELTA:
+		return timedelta(*value)
+	if tag == _DECIMAL:
+		return Decimal(value)
+
+	raise ValueError(f"Unknown tag: {tag}")
+
+
+@cache
+def _import_class(module: str, qualname: str):
+	obj = importlib.import_module(module)
+	for attr in qualname.split("."):
+		obj = getattr(obj, attr)
+
+	return obj
+
+
+class _PlainMetaPickler(pickle.Pickler):
+	"""Pickler that ignores `Meta.__reduce_ex__`, i.e. the format used before this codec."""
+
+	def reducer_override(self, obj):
+		from saashq.model.meta import Meta
+
+		if isinstance(obj, Meta):
+			return object.__reduce_ex__(obj, pickle.DEFAULT_PROTOCOL)
+
+		return NotImplemented
+
+
+def _dumps_plain(meta) -> bytes:
+	buffer = io.BytesIO()
+	_PlainMetaPickler(buffer, protocol=pickle.DEFAULT_PROTOCOL).dump(meta)
+	return buffer.getvalue()
+
+
+def _measure(loads, blob, touch_fields: bool, iterations: int) -> tuple[float, int]:
+	start = time.perf_counter()
+	for _ in range(iterations):
+		meta = loads(blob)
+		if touch_fields:
+			meta.get_field("name")
+	elapsed_ms = (time.perf_counter() - start) * 1000 / iterations
+
+	tracemalloc.start()
+	meta = loads(blob)
+	if touch_fields:
+		meta.get_field("name")
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return elapsed_ms, peak
+
+
+def benchmark(doctypes: list[str] | None = None, iterations: int = 100):
+	"""Compare decoding cost of the pickle and the compact format for the largest doctypes.
+
+	Reports size of the cached value, time per decode (plain and with fields accessed) and
+	peak memory allocated while decoding."""
+	from saashq.utils.commands import render_table
+
+	if not doctypes:
+		field_counts = saashq.get_all(
+			"DocField",
+			fields=["parent", "count(*) as count"],
+			group_by="parent",
+			order_by="count desc",
+			limit=5,
+		)
+		doctypes = [d.parent for d in field_counts]
+
+	rows = [["DocType", "Format", "Size (KB)", "Load (ms)", "Load + fields (ms)", "Peak memory (KB)"]]
+	for doctype in doctypes:
+		meta = saashq.get_meta(doctype, cached=False)
+		for label, blob in (("pickle", _dumps_plain(meta)), ("compact", pickle.dumps(meta))):
+			load_ms, _ = _measure(pickle.loads, blob, False, iterations)
+			full_ms, peak = _measure(pickle.loads, blob, True, iterations)
+			rows.append(
+				[
+					doctype,
+					label,
+					round(len(blob) / 1024, 1),
+					round(load_ms, 3),
+					round(full_ms, 3),
+					peak // 1024,
+				]
+			)
+
+	render_table(rows)
+	return rows
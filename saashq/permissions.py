@@ -7,7 +7,7 @@ import saashq
 import saashq.share
 from saashq import _, msgprint
 from saashq.query_builder import DocType
-from saashq.utils import cint, cstr
+from saashq.utils import cint, create_batch, cstr
 
 rights = (
 	"select",
@@ -197,6 +197,74 @@ def has_permission(
 	return bool(perm)
 
 
+def has_permission_bulk(doctype: str, docs, ptype: str = "read", user: str | None = None) -> list[bool]:
+	"""Return `has_permission(doctype, ptype, doc, user=user)` for each of `docs`, in order.
+
+	Role permissions and allowed User Permission values are evaluated once for all documents,
+	link values are checked against sets and shares are fetched with a single query. Controller
+	`has_permission` hooks still run for every document. No messages are logged or shown.
+
+	:param doctype: DocType of the documents.
+	:param docs: Documents, or names of documents which are loaded with `saashq.get_docs`.
+	:param ptype: Permission Type to check.
+	:param user: User to check permission for. Defaults to current user.
+	"""
+	docs = list(docs)
+
+	if not user:
+		user = saashq.session.user
+
+	if user == "Administrator":
+		return [True] * len(docs)
+
+	if ptype == "share" and saashq.get_system_settings("disable_document_sharing"):
+		return [False] * len(docs)
+
+	if saashq.is_table(doctype):
+		return [has_child_permission(doctype, ptype, doc, user, print_logs=False) for doc in docs]
+
+	if names := [doc for doc in docs if isinstance(doc, str | int)]:
+		loaded = {cstr(doc.name): doc for doc in saashq.get_docs(doctype, names)}
+		docs = [loaded[cstr(doc)] if isinstance(doc, str | int) else doc for doc in docs]
+
+	meta = saashq.get_meta(doctype)
+	is_allowed_by_user_permissions = _get_user_permission_check(meta, user)
+	# owner or not -> (permission, permission if not allowed by User Permissions)
+	role_permissions = {}
+	for is_owner in (False, True):
+		permissions = _get_doc_role_permissions(meta, user, is_owner)
+		role_permissions[is_owner] = (
+			permissions.get(ptype),
+			_get_permissions_without_user_permission(permissions, is_owner).get(ptype),
+		)
+
+	result = []
+	for doc in docs:
+		if not has_controller_permissions(doc, ptype, user=user):
+			result.append(False)
+			continue
+
+		is_owner = (doc.get("owner") or "").lower() == user.lower()
+		permission, permission_without_user_permission = role_permissions[is_owner]
+		if permission and not is_allowed_by_user_permissions(doc):
+			permission = permission_without_user_permission
+
+		result.append(bool(permission))
+
+	not_permitted = [cstr(doc.name) for doc, permitted in zip(docs, result, strict=True) if not permitted]
+	if not_permitted and ptype in ("read", "write", "share", "submit", "email", "print"):
+		rights = ["read" if ptype in ("email", "print") else ptype]
+		shared = set()
+		for names in create_batch(not_permitted, 1000):
+			shared.update(
+				saashq.share.get_shared(doctype, user, rights=rights, filters=[["share_name", "in", names]])
+			)
+
+		result = [permitted or cstr(doc.name) in shared for doc, permitted in zip(docs, result, strict=True)]
+
+	return result
+
+
 def get_doc_permissions(doc, user=None, ptype=None, debug=False):
 	"""Return a dict of evaluated permissions for given `doc` like `{"read":1, "write":1}`"""
 	if not user:
@@ -211,7 +279,21 @@ def get_doc_permissions(doc, user=None, ptype=None, debug=False):
 		push_perm_check_log(_("Not allowed via controller permission check"), debug=debug)
 		return {ptype: 0}
 
-	permissions = copy.deepcopy(get_role_permissions(meta, user=user, is_owner=is_user_owner(), debug=debug))
+	permissions = _get_doc_role_permissions(meta, user, is_user_owner(), debug=debug)
+
+	if not has_user_permission(doc, user, debug=debug):
+		permissions = _get_permissions_without_user_permission(permissions, is_user_owner(), debug=debug)
+
+	debug and _debug_log(
+		"Final applicable permissions after evaluating user permissions: "
+		+ saashq.as_json(permissions, indent=8)
+	)
+	return permissions
+
+
+def _get_doc_role_permissions(meta, user, is_owner, debug=False) -> dict:
+	"""Return role permissions of `user` on a document of `meta`, with `if_owner` permissions applied."""
+	permissions = copy.deepcopy(get_role_permissions(meta, user=user, is_owner=is_owner, debug=debug))
 
 	debug and _debug_log(
 		"User has following permissions using role permission system: "
@@ -234,21 +316,21 @@ def get_doc_permissions(doc, user=None, ptype=None, debug=False):
 			"User is owner of document, so permissions are updated to: " + saashq.as_json(permissions)
 		)
 
-	if not has_user_permission(doc, user, debug=debug):
-		if is_user_owner():
-			# replace with owner permissions
-			permissions = permissions.get("if_owner", {})
-			# if_owner does not come with create rights...
-			permissions["create"] = 0
-			debug and _debug_log("User has only 'If owner' permissions because of User Permissions")
-		else:
-			debug and _debug_log("User has no permissions because of User Permissions")
-			permissions = {}
+	return permissions
+
+
+def _get_permissions_without_user_permission(permissions, is_owner, debug=False) -> dict:
+	"""Return what is left of `permissions` on a document that isn't allowed by User Permissions."""
+	if is_owner:
+		# replace with owner permissions
+		permissions = permissions.get("if_owner", {})
+		# if_owner does not come with create rights...
+		permissions["create"] = 0
+		debug and _debug_log("User has only 'If owner' permissions because of User Permissions")
+	else:
+		debug and _debug_log("User has no permissions because of User Permissions")
+		permissions = {}
 
-	debug and _debug_log(
-		"Final applicable permissions after evaluating user permissions: "
-		+ saashq.as_json(permissions, indent=8)
-	)
 	return permissions
 
 
@@ -430,6 +512,60 @@ def has_user_permission(doc, user=None, debug=False):
 	return True
 
 
+def _get_user_permission_check(meta, user):
+	"""Return a function that works like `has_user_permission(doc, user)` for documents of `meta`.
+
+	Allowed values of every linked doctype are computed once and kept as sets."""
+	user_permissions = get_user_permissions(user)
+	if not user_permissions:
+		return lambda doc: True
+
+	doctype = meta.name
+	apply_strict_user_permissions = (
+		False if meta.issingle else saashq.get_system_settings("apply_strict_user_permissions")
+	)
+	allowed_docs = {}
+	link_fields = {}
+
+	def get_allowed_docs(link_doctype) -> set[str]:
+		if link_doctype not in allowed_docs:
+			allowed_docs[link_doctype] = set(
+				get_allowed_docs_for_doctype(user_permissions.get(link_doctype, []), doctype)
+			)
+		return allowed_docs[link_doctype]
+
+	def get_link_fields(row_doctype) -> list[tuple[str, str]]:
+		if row_doctype not in link_fields:
+			link_fields[row_doctype] = [
+				(df.fieldname, df.options)
+				for df in saashq.get_meta(row_doctype).get_link_fields()
+				if not df.ignore_user_permissions and df.options in user_permissions
+			]
+		return link_fields[row_doctype]
+
+	def check_link_fields(d) -> bool:
+		for fieldname, options in get_link_fields(d.get("doctype")):
+			value = d.get(fieldname)
+			if not value and not apply_strict_user_permissions:
+				continue
+
+			allowed = get_allowed_docs(options)
+			if allowed and str(value) not in allowed:
+				return False
+
+		return True
+
+	def check(doc) -> bool:
+		if doctype in user_permissions:
+			allowed = get_allowed_docs(doctype)
+			if allowed and str(doc.get("name")) not in allowed:
+				return False
+
+		return check_link_fields(doc) and all(check_link_fields(d) for d in doc.get_all_children())
+
+	return check
+
+
 def has_controller_permissions(doc, ptype, user=None, debug=False) -> bool:
 	"""Return controller permissions if denied, True if not defined.
 
@@ -139,7 +139,8 @@ saashq.ui.form.Toolbar = class Toolbar {
 					// handle document renaming queued action
 					if (input_name != docname) {
 						saashq.realtime.on("list_update", (data) => {
-							if (data.doctype == doctype && data.name == input_name) {
+							const names = data.names || [data.name];
+							if (data.doctype == doctype && names.includes(input_name)) {
 								reload_form(input_name);
 								saashq.show_alert({
 									message: __("Document renamed from {0} to {1}", [
@@ -1519,7 +1519,16 @@ saashq.views.ListView = class ListView extends saashq.views.BaseList {
 				return;
 			}
 
-			this.pending_document_refreshes.push(data);
+			if (data.refresh_list) {
+				// too many documents changed to refresh them one by one
+				this.refresh();
+				return;
+			}
+
+			// updates of many documents are merged by the server
+			for (const name of data.names || [data.name]) {
+				this.pending_document_refreshes.push({ ...data, name });
+			}
 			this.debounced_refresh();
 		});
 		this.realtime_events_setup = true;
@@ -5,6 +5,9 @@ import DataTable from "saashq-datatable";
 // Expose DataTable globally to allow customizations.
 window.DataTable = DataTable;
 
+// rows of a prepared report fetched at once, the rest are loaded on demand
+const PREPARED_REPORT_PAGE_LENGTH = 1000;
+
 saashq.provide("saashq.widget.utils");
 saashq.provide("saashq.views");
 saashq.provide("saashq.query_reports");
@@ -665,6 +668,7 @@ saashq.views.QueryReport = class QueryReport extends saashq.views.BaseList {
 					is_tree: this.report_settings.tree,
 					parent_field: this.report_settings.parent_field,
 					are_default_filters: are_default_filters,
+					prepared_report_page_length: PREPARED_REPORT_PAGE_LENGTH,
 				},
 				callback: resolve,
 				always: () => this.page.btn_secondary.prop("disabled", false),
@@ -1985,6 +1989,21 @@ saashq.views.QueryReport = class QueryReport extends saashq.views.BaseList {
 			this.$tree_footer.find("[data-action=expand_all_rows]").hide();
 		}
 
+		const unloaded_rows = this.get_unloaded_prepared_report_rows();
+		if (unloaded_rows > 0) {
+			const $load_more = $(`<div class="col-md-12 text-center">
+				<button class="btn btn-xs btn-default" data-action="load_more">
+					${__("Load {0} more of {1} rows", [
+						format_number(Math.min(PREPARED_REPORT_PAGE_LENGTH, unloaded_rows), null, 0),
+						format_number(this.raw_data.total_count, null, 0),
+					])}</button>
+			</div>`).appendTo(this.$report_footer);
+			$load_more.find("[data-action=load_more]").on("click", (e) => {
+				$(e.currentTarget).prop("disabled", true);
+				this.load_more_prepared_report_rows();
+			});
+		}
+
 		const message = __(
 			"For comparison, use >5, <10 or =324. For ranges, use 5:10 (for values between 5 & 10)."
 		);
@@ -1995,6 +2014,37 @@ saashq.views.QueryReport = class QueryReport extends saashq.views.BaseList {
 		</div>`);
 	}
 
+	get_prepared_report_rows() {
+		// the total row is always sent last, after the loaded pages
+		const data = this.raw_data;
+		return data.add_total_row ? data.result.slice(0, -1) : data.result.slice();
+	}
+
+	get_unloaded_prepared_report_rows() {
+		if (!this.prepared_report_document || !this.data?.length || !this.raw_data.total_count) {
+			return 0;
+		}
+		return this.raw_data.total_count - this.get_prepared_report_rows().length;
+	}
+
+	load_more_prepared_report_rows() {
+		const data = this.raw_data;
+		const rows = this.get_prepared_report_rows();
+		return saashq
+			.xcall("saashq.core.doctype.prepared_report.prepared_report.get_prepared_report_page", {
+				dn: this.prepared_report_document.name,
+				start: rows.length,
+				page_length: Math.min(PREPARED_REPORT_PAGE_LENGTH, data.total_count - rows.length),
+			})
+			.then((page) => {
+				const total_row = data.add_total_row ? data.result.slice(-1) : [];
+				data.result = rows.concat(page.result, total_row);
+				this.data = this.prepare_data(data.result);
+				this.render_datatable();
+			})
+			.finally(() => this.show_footer_message());
+	}
+
 	expand_all_rows() {
 		this.$tree_footer.find("[data-action=expand_all_rows]").hide();
 		let rows = this.datatable.rowmanager.datamanager.getRows();
@@ -6,6 +6,8 @@ import DataTable from "saashq-datatable";
 window.DataTable = DataTable;
 saashq.provide("saashq.views");
 
+const EXPORT_IN_BACKGROUND_THRESHOLD = 50000; // rows
+
 saashq.views.ReportView = class ReportView extends saashq.views.ListView {
 	get view_name() {
 		return "Report";
@@ -231,7 +233,10 @@ saashq.views.ReportView = class ReportView extends saashq.views.ListView {
 	}
 
 	on_update(data) {
-		if (this.doctype === data.doctype && data.name) {
+		if (this.doctype === data.doctype && (data.names || data.refresh_list)) {
+			// updates of many documents, merged by the server
+			this.refresh();
+		} else if (this.doctype === data.doctype && data.name) {
 			// flash row when doc is updated by some other user
 			const flash_row = data.user !== saashq.session.user;
 			if (this.data.find((d) => d.name === data.name)) {
@@ -1641,7 +1646,17 @@ saashq.views.ReportView = class ReportView extends saashq.views.ListView {
 								delete args.page_length;
 							}
 
-							open_url_post(saashq.request.url, args);
+							if (
+								data.export_all_rows &&
+								!selected_items.length &&
+								this.total_count > EXPORT_IN_BACKGROUND_THRESHOLD
+							) {
+								// large exports are written to a file by a background job
+								args.export_in_background = 1;
+								saashq.call(args.cmd, args);
+							} else {
+								open_url_post(saashq.request.url, args);
+							}
 
 							d.hide();
 						}
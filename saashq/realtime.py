@@ -6,7 +6,12 @@ from contextlib import suppress
 import redis
 
 import saashq
-from saashq.utils.data import cstr
+from saashq.utils.data import cint, cstr
+
+# Seconds between list updates of a doctype while they are aggregated, see `get_list_update_interval`
+LIST_UPDATE_INTERVAL = 5
+# Names of changed documents sent with a merged list update, clients refresh the whole list if more changed
+LIST_UPDATE_MAX_NAMES = 100
 
 
 def publish_progress(percent, title=None, doctype=None, docname=None, description=None, task_id=None):
@@ -72,29 +77,126 @@ def publish_realtime(
 
 	if after_commit:
 		if not hasattr(saashq.local, "_realtime_log"):
-			saashq.local._realtime_log = []
+			saashq.local._realtime_log = {}
 			saashq.db.after_commit.add(flush_realtime_log)
 			saashq.db.after_rollback.add(clear_realtime_log)
 
-		params = [event, message, room]
-		if params not in saashq.local._realtime_log:
-			saashq.local._realtime_log.append(params)
+		add_to_realtime_log(saashq.local._realtime_log, event, message, room)
 	else:
 		emit_via_redis(event, message, room)
 
 
-def flush_realtime_log():
-	for args in saashq.local._realtime_log:
-		saashq.realtime.emit_via_redis(*args)
+def add_to_realtime_log(log: dict, event: str, message: dict, room: str):
+	"""Add an event to `log`, dropping duplicates.
+
+	List updates of the same room are merged, the latest message wins."""
+	if event == "list_update":
+		key = (event, room)
+		if previous := log.pop(key, None):
+			message = merge_list_updates(previous[1], message)
+	else:
+		key = (event, room, saashq.as_json(message, indent=None))
+
+	log[key] = (event, message, room)
+
 
+def merge_list_updates(previous: dict, message: dict) -> dict:
+	"""Return `message` with the names of documents changed by both list updates, in `names`."""
+	if previous.get("refresh_list"):
+		return {**message, "refresh_list": True}
+
+	names = dict.fromkeys(previous.get("names") or [previous.get("name")])
+	names[message.get("name")] = None
+	if len(names) > LIST_UPDATE_MAX_NAMES:
+		return {**message, "refresh_list": True}
+
+	return {**message, "names": list(names)}
+
+
+def flush_realtime_log():
+	events = list(saashq.local._realtime_log.values())
 	clear_realtime_log()
 
+	if interval := get_list_update_interval():
+		events = aggregate_list_updates(events, interval)
+
+	emit_via_redis_batch(events)
+
 
 def clear_realtime_log():
 	if hasattr(saashq.local, "_realtime_log"):
 		del saashq.local._realtime_log
 
 
+def get_list_update_interval() -> int:
+	"""Return seconds between list updates of a doctype, 0 to not aggregate them.
+
+	List updates are aggregated during imports, or always if `realtime_list_update_interval` is set."""
+	if interval := cint(saashq.conf.realtime_list_update_interval):
+		return interval
+
+	return LIST_UPDATE_INTERVAL if saashq.flags.in_import else 0
+
+
+def aggregate_list_updates(events: list[tuple], interval: int) -> list[tuple]:
+	"""Hold back list updates, return the other events and the list updates of rooms that weren't
+	updated in the last `interval` seconds, by any process of the site.
+
+	List updates still held at the end of the request or job are published then."""
+	if saashq.request and hasattr(saashq.request, "after_response"):
+		end_callbacks = saashq.request.after_response
+	elif saashq.job:
+		end_callbacks = saashq.job.after_job
+	else:
+		# nothing to publish the last list updates at
+		return events
+
+	if not hasattr(saashq.local, "_realtime_list_updates"):
+		saashq.local._realtime_list_updates = {}
+		end_callbacks.add(flush_list_updates)
+
+	pending = saashq.local._realtime_list_updates
+
+	to_publish = []
+	for event, message, room in events:
+		if event == "list_update":
+			add_to_realtime_log(pending, event, message, room)
+		else:
+			to_publish.append((event, message, room))
+
+	keys = list(pending)
+	rooms = [pending[key][2] for key in keys]
+	for key, claimed in zip(keys, claim_list_update_rooms(rooms, interval), strict=True):
+		if claimed:
+			to_publish.append(pending.pop(key))
+
+	return to_publish
+
+
+def claim_list_update_rooms(rooms: list[str], interval: int) -> list[bool]:
+	"""Return whether a list update can be published to each of `rooms`, claiming it for `interval`
+	seconds in redis so that other processes hold back their list updates meanwhile."""
+	if not rooms:
+		return []
+
+	try:
+		pipeline = saashq.cache.pipeline(transaction=False)
+		for room in rooms:
+			pipeline.set(saashq.cache.make_key(f"realtime_list_update:{room}"), 1, nx=True, ex=interval)
+		return [bool(claimed) for claimed in pipeline.execute()]
+	except redis.exceptions.ConnectionError:
+		return [True] * len(rooms)
+
+
+def flush_list_updates():
+	"""Publish list updates held back by `aggregate_list_updates`."""
+	if pending := getattr(saashq.local, "_realtime_list_updates", None):
+		emit_via_redis_batch(list(pending.values()))
+
+	if hasattr(saashq.local, "_realtime_list_updates"):
+		del saashq.local._realtime_list_updates
+
+
 def emit_via_redis(event, message, room):
 	"""Publish real-time updates via redis
 
@@ -105,12 +207,25 @@ def emit_via_redis(event, message, room):
 
 	with suppress(redis.exceptions.ConnectionError):
 		r = get_redis_connection_without_auth()
-		r.publish(
-			"events",
-			saashq.as_json(
-				{"event": event, "message": message, "room": room, "namespace": saashq.local.site}
-			),
-		)
+		r.publish("events", get_event_payload(event, message, room))
+
+
+def emit_via_redis_batch(events: list[tuple]):
+	"""Publish `(event, message, room)` real-time updates via redis, in one pipeline."""
+	from saashq.utils.background_jobs import get_redis_connection_without_auth
+
+	if not events:
+		return
+
+	with suppress(redis.exceptions.ConnectionError):
+		pipeline = get_redis_connection_without_auth().pipeline(transaction=False)
+		for event, message, room in events:
+			pipeline.publish("events", get_event_payload(event, message, room))
+		pipeline.execute()
+
+
+def get_event_payload(event, message, room) -> str:
+	return saashq.as_json({"event": event, "message": message, "room": room, "namespace": saashq.local.site})
 
 
 @saashq.whitelist(allow_guest=True)
@@ -1,11 +1,12 @@
 import time
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import saashq
 from saashq.core.doctype.doctype.test_doctype import new_doctype
 from saashq.tests import IntegrationTestCase
 from saashq.tests.test_api import SaashqAPITestCase
 from saashq.utils.caching import redis_cache, request_cache, site_cache
+from saashq.utils.redis_wrapper import L1Cache, RedisWrapper
 
 CACHE_TTL = 4
 external_service = MagicMock(return_value=30)
@@ -348,3 +349,65 @@ class TestRedisWrapper(SaashqAPITestCase):
 
 	def test_backward_compat_cache(self):
 		self.assertEqual(saashq.cache, saashq.cache())
+
+
+class TestL1Cache(IntegrationTestCase):
+	def test_lru_and_ttl(self):
+		l1 = L1Cache(maxsize=2, ttl=1)
+		l1.set(b"a", 1)
+		l1.set(b"b", 2)
+		l1.get(b"a")
+		l1.set(b"c", 3)
+
+		# least recently used key is dropped
+		self.assertEqual(l1.get(b"b"), (False, None))
+		self.assertEqual(l1.get(b"a"), (True, 1))
+
+		time.sleep(1.1)
+		self.assertEqual(l1.get(b"a"), (False, None))
+
+	def test_stale_set_after_eviction_is_ignored(self):
+		l1 = L1Cache()
+		generation = l1.generation
+		l1.set(b"hash", "value", field="field")
+		l1.evict(b"hash")
+		self.assertEqual(l1.get(b"hash", "field"), (False, None))
+
+		l1.set(b"hash", "stale", field="field", generation=generation)
+		self.assertEqual(l1.get(b"hash", "field"), (False, None))
+
+	@patch.dict(saashq.conf, {"enable_l1_cache": True})
+	def test_get_value_served_from_l1(self):
+		worker = RedisWrapper.from_url(saashq.conf.redis_cache)
+		saashq.cache.set_value("roles", ["System Manager"])
+
+		saashq.local.cache = {}
+		self.assertEqual(worker.get_value("roles"), ["System Manager"])
+
+		saashq.local.cache = {}
+		with patch.object(worker, "get") as get:
+			self.assertEqual(worker.get_value("roles"), ["System Manager"])
+			get.assert_not_called()
+
+	@patch.dict(saashq.conf, {"enable_l1_cache": True})
+	def test_invalidation_across_workers(self):
+		other_worker = RedisWrapper.from_url(saashq.conf.redis_cache)
+		doctype = "ToDo"
+		saashq.cache.hset("doctype_meta", doctype, "old")
+
+		saashq.local.cache = {}
+		self.assertEqual(other_worker.hget("doctype_meta", doctype), "old")
+		self.assertEqual(
+			other_worker._get_l1().get(other_worker.make_key("doctype_meta"), doctype), (True, "old")
+		)
+
+		saashq.cache.hdel("doctype_meta", doctype)
+		for _ in range(20):
+			if not other_worker._get_l1().get(other_worker.make_key("doctype_meta"), doctype)[0]:
+				break
+			time.sleep(0.1)
+		else:
+			self.fail("L1 cache entry was not invalidated")
+
+		saashq.local.cache = {}
+		self.assertIsNone(other_worker.hget("doctype_meta", doctype))
@@ -6,10 +6,12 @@ from math import ceil
 from random import choice
 from unittest.mock import patch
 
+import redis
+
 import saashq
 from saashq.core.utils import find
 from saashq.custom.doctype.custom_field.custom_field import create_custom_field
-from saashq.database import savepoint
+from saashq.database import query_cache, savepoint
 from saashq.database.database import get_query_execution_timeout
 from saashq.database.utils import FallBackDateTimeStr
 from saashq.query_builder import Field
@@ -221,6 +223,89 @@ class TestDB(IntegrationTestCase):
 		saashq.flags.in_migrate = False
 		saashq.flags.touched_tables.clear()
 
+	@patch.dict(saashq.conf, {"enable_query_cache": 1})
+	def test_query_cache(self):
+		todo = saashq.get_doc(doctype="ToDo", description="query cache").insert()
+		saashq.db.commit()
+		# list filters aren't stored in the request level `value_cache`
+		filters = [["ToDo", "name", "=", todo.name]]
+
+		def get_description():
+			return saashq.db.get_value("ToDo", filters, "description", cache=True)
+
+		# a cache hit only calls `sql` once, a miss runs the query with a second call
+		self.assertEqual(get_description(), "query cache")
+		with self.assertQueryCount(1):
+			self.assertEqual(get_description(), "query cache")
+
+		# tables written in the current transaction are read from the database
+		saashq.db.set_value("ToDo", todo.name, "description", "changed")
+		self.assertEqual(get_description(), "changed")
+		saashq.db.commit()
+		self.assertEqual(get_description(), "changed")
+		with self.assertQueryCount(1):
+			self.assertEqual(get_description(), "changed")
+
+		saashq.get_all("ToDo", filters={"name": todo.name}, pluck="description", cache=True)
+		with self.assertQueryCount(1):
+			self.assertEqual(
+				saashq.get_all("ToDo", filters={"name": todo.name}, pluck="description", cache=True),
+				["changed"],
+			)
+
+		todo.delete()
+		saashq.db.commit()
+		self.assertIsNone(get_description())
+
+	@patch.dict(saashq.conf, {"enable_query_cache": 1})
+	def test_query_cache_skips_results_older_than_versions(self):
+		todo = saashq.get_doc(doctype="ToDo", description="query cache").insert()
+		saashq.db.commit()
+		filters = [["ToDo", "name", "=", todo.name]]
+
+		def get_description():
+			return saashq.db.get_value("ToDo", filters, "description", cache=True)
+
+		# the transaction reads, then another transaction commits a write to ToDo
+		saashq.db.sql("select 1")
+		query_cache.bump_table_versions({"tabToDo"})
+
+		# rows of the older snapshot aren't stored under the newer versions
+		get_description()
+		with self.assertQueryCount(2):
+			get_description()
+
+		saashq.db.commit()
+		get_description()
+		with self.assertQueryCount(1):
+			get_description()
+
+		todo.delete()
+		saashq.db.commit()
+
+	@patch.dict(saashq.conf, {"enable_query_cache": 1})
+	def test_query_cache_without_redis(self):
+		todo = saashq.get_doc(doctype="ToDo", description="query cache").insert()
+		saashq.db.commit()
+		filters = [["ToDo", "name", "=", todo.name]]
+
+		unreachable = redis.exceptions.ConnectionError("redis is down")
+		with (
+			patch.object(saashq.cache, "get", side_effect=unreachable),
+			patch.object(saashq.cache, "mget", side_effect=unreachable),
+			patch.object(saashq.cache, "eval", side_effect=unreachable),
+		):
+			self.assertEqual(saashq.db.get_value("ToDo", filters, "description", cache=True), "query cache")
+			self.assertIsNone(saashq.db.query_cache_snapshot)
+
+			# the commit goes through, only invalidating cached results is skipped
+			saashq.db.set_value("ToDo", todo.name, "description", "changed")
+			saashq.db.commit()
+
+		self.assertEqual(saashq.db.get_value("ToDo", todo.name, "description"), "changed")
+		todo.delete()
+		saashq.db.commit()
+
 	def test_db_keywords_as_fields(self):
 		"""Tests if DB keywords work as docfield names. If they're wrapped with grave accents."""
 		# Using random.choices, picked out a list of 40 keywords for testing
@@ -1019,6 +1104,79 @@ class TestReplicaConnections(IntegrationTestCase):
 			outer()
 			self.assertEqual(write_connection, db_id())
 
+	def test_replica_fallback(self):
+		from saashq.database import replica
+
+		def runs_on_replica() -> bool:
+			primary_db = saashq.local.db
+			return saashq.read_only()(lambda: saashq.local.db is not primary_db)()
+
+		self.addCleanup(replica._replica_health.clear)
+		db_class = type(saashq.local.db)
+
+		# unreachable replica
+		with patch.dict(
+			saashq.local.conf,
+			{"read_from_replica": 1, "replica_hosts": [{"host": "127.0.0.1", "port": 1}]},
+		):
+			self.assertFalse(runs_on_replica())
+
+		replica._replica_health.clear()
+		with patch.dict(
+			saashq.local.conf,
+			{"read_from_replica": 1, "replica_hosts": ["127.0.0.1"], "replica_max_lag": 30},
+		):
+			with patch.object(db_class, "get_replication_lag", return_value=100):
+				self.assertFalse(runs_on_replica())
+
+			replica._replica_health.clear()
+			with patch.object(db_class, "get_replication_lag", return_value=1):
+				self.assertTrue(runs_on_replica())
+
+	@run_only_if(db_type_is.MARIADB)
+	def test_replication_lag_without_privilege(self):
+		import pymysql
+		from pymysql.constants import ER
+
+		from saashq.database import replica
+
+		denied = pymysql.OperationalError(ER.SPECIFIC_ACCESS_DENIED_ERROR, "Access denied")
+		with (
+			patch.object(type(saashq.db), "sql", side_effect=denied),
+			patch.dict(saashq.local.conf, {"replica_max_lag": 30}),
+			patch("saashq.logger") as logger,
+		):
+			self.assertIsNone(saashq.db.get_replication_lag())
+			self.assertFalse(replica.is_replica_healthy(saashq.db, "127.0.0.1"))
+
+		warnings = [c.args[0] for c in logger.return_value.warning.call_args_list]
+		self.assertIn("REPLICATION CLIENT", warnings[0])
+		self.assertIn("replication lag is unknown", warnings[-1])
+		self.assertFalse(any("connection failed" in warning for warning in warnings))
+
+	def test_lost_replica_falls_back_to_primary(self):
+		from saashq.database import replica
+
+		self.addCleanup(replica._replica_health.clear)
+		primary_db = saashq.local.db
+		ran_on_primary = []
+
+		@saashq.read_only()
+		def read():
+			ran_on_primary.append(saashq.local.db is primary_db)
+			if saashq.local.db is not primary_db:
+				raise saashq.local.db.OperationalError("connection lost")
+
+		with (
+			patch.dict(saashq.local.conf, {"read_from_replica": 1, "replica_hosts": ["127.0.0.1"]}),
+			patch.object(type(primary_db), "is_connection_error", return_value=True),
+		):
+			read()
+
+		self.assertEqual(ran_on_primary, [False, True])
+		self.assertIs(saashq.local.db, primary_db)
+		self.assertFalse(replica._replica_health[(primary_db.cur_db_name, "127.0.0.1", None)][1])
+
 
 class TestConcurrency(IntegrationTestCase):
 	@timeout(5, "There shouldn't be any lock wait")
@@ -1096,6 +1254,29 @@ class TestSqlIterator(IntegrationTestCase):
 				msg=f"{query=} results not same as iterator",
 			)
 
+			self.assertEqual(
+				saashq.db.sql(query, as_rows=True),
+				list(saashq.db.sql(query, as_rows=True, as_iterator=True)),
+				msg=f"{query=} results not same as iterator",
+			)
+
+	def test_as_rows(self):
+		query = "select name, code, 1 as `count` from `tabCountry` order by name limit 5"
+		dicts = saashq.db.sql(query, as_dict=True, update={"extra": 1})
+		rows = saashq.db.sql(query, as_rows=True, update={"extra": 1})
+
+		self.assertEqual([row.as_dict() for row in rows], dicts)
+		row, d = rows[0], dicts[0]
+		self.assertEqual((row.name, row["code"], row.count, row.extra), (d.name, d.code, d.count, d.extra))
+		self.assertEqual(row.get("missing", "default"), "default")
+		self.assertIn("code", row)
+		self.assertIs(type(row), type(rows[1]))
+
+		self.assertEqual(
+			saashq.get_all("Country", fields=["name", "code"], limit=5, as_rows=True),
+			[(d.name, d.code) for d in saashq.get_all("Country", fields=["name", "code"], limit=5)],
+		)
+
 	@run_only_if(db_type_is.MARIADB)
 	def test_unbuffered_cursor(self):
 		with saashq.db.unbuffered_cursor():
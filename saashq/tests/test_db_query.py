@@ -225,6 +225,50 @@ class TestDBQuery(IntegrationTestCase):
 
 		saashq.set_user("Administrator")
 
+	def test_match_conditions_cache(self):
+		clear_user_permissions_for_doctype("Blog Post", "test2@example.com")
+		add_user_permission("Blog Post", "-test-blog-post", "test2@example.com", True)
+
+		test2user = saashq.get_doc("User", "test2@example.com")
+		test2user.add_roles("Blogger")
+		saashq.set_user("test2@example.com")
+		self.addCleanup(saashq.set_user, "Administrator")
+
+		def get_match_filters():
+			return DatabaseQuery("Blog Post").build_match_conditions(as_condition=False)
+
+		self.assertEqual(get_match_filters(), [{"Blog Post": ["-test-blog-post"]}])
+		saashq.local.cache.clear()
+		with self.assertQueryCount(0):
+			self.assertEqual(get_match_filters(), [{"Blog Post": ["-test-blog-post"]}])
+
+		# changes to user permissions invalidate the cached conditions
+		add_user_permission("Blog Post", "-test-blog-post-1", "test2@example.com", True)
+		self.assertEqual(get_match_filters(), [{"Blog Post": ["-test-blog-post-1", "-test-blog-post"]}])
+
+		# and so do shares
+		saashq.set_user("Administrator")
+		saashq.share.add("Blog Post", "-test-blog-post-2", "test2@example.com")
+		saashq.set_user("test2@example.com")
+		self.assertIn("-test-blog-post-2", DatabaseQuery("Blog Post").build_match_conditions())
+
+		# and so do changes to the doctype, without scanning the cached conditions of every user
+		get_match_filters()
+		with patch.object(saashq.cache, "delete_keys") as delete_keys:
+			saashq.clear_cache(doctype="Blog Post")
+		self.assertNotIn(("user:*:match_conditions",), [c.args for c in delete_keys.call_args_list])
+		saashq.local.cache.clear()
+		compile_match_conditions = DatabaseQuery.compile_match_conditions
+		with patch.object(
+			DatabaseQuery, "compile_match_conditions", autospec=True, side_effect=compile_match_conditions
+		) as compile_mock:
+			self.assertEqual(get_match_filters(), [{"Blog Post": ["-test-blog-post-1", "-test-blog-post"]}])
+		compile_mock.assert_called_once()
+
+		saashq.set_user("Administrator")
+		clear_user_permissions_for_doctype("Blog Post", "test2@example.com")
+		saashq.share.remove("Blog Post", "-test-blog-post-2", "test2@example.com")
+
 	def test_fields(self):
 		self.assertTrue(
 			{"name": "DocType", "issingle": 0}
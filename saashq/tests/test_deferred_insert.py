@@ -1,5 +1,14 @@
+from unittest.mock import patch
+
 import saashq
-from saashq.deferred_insert import deferred_insert, save_to_db
+from saashq.deferred_insert import (
+	consumer_group,
+	create_consumer_group,
+	deferred_insert,
+	get_backlog,
+	save_to_db,
+	stream_prefix,
+)
 from saashq.tests import IntegrationTestCase
 
 
@@ -16,3 +25,60 @@ class TestDeferredInsert(IntegrationTestCase):
 		saashq.clear_cache()  # deferred_insert cache keys are supposed to be persistent
 		save_to_db()
 		self.assertTrue(saashq.db.exists("Route History", route_history))
+
+	def test_deferred_insert_claims_unacknowledged_entries(self):
+		route_history = {"route": saashq.generate_hash(), "user": "Administrator"}
+		deferred_insert("Route History", [route_history])
+
+		# read by a worker that died before writing the records
+		key = saashq.cache.make_key(f"{stream_prefix}Route History")
+		create_consumer_group(key)
+		saashq.cache.xreadgroup(consumer_group, "dead-worker", {key: ">"})
+
+		with patch("saashq.deferred_insert.CLAIM_IDLE_TIME", 0):
+			save_to_db()
+
+		self.assertTrue(saashq.db.exists("Route History", route_history))
+		self.assertEqual(get_backlog()["Route History"], {"queued": 0, "pending": 0})
+
+	def test_deferred_insert_skips_deleted_entries(self):
+		route_history = {"route": saashq.generate_hash(), "user": "Administrator"}
+		deferred_insert("Route History", [route_history])
+		key = saashq.cache.make_key(f"{stream_prefix}Route History")
+		create_consumer_group(key)
+		saashq.cache.xreadgroup(consumer_group, "dead-worker", {key: ">"})
+		xautoclaim = saashq.cache.xautoclaim
+
+		def xautoclaim_with_deleted_entry(*args, **kwargs):
+			next_id, entries, *deleted = xautoclaim(*args, **kwargs)
+			# Redis < 7 returns claimed entries that were deleted from the stream without fields
+			return [next_id, [(b"0-1", None), *entries], *deleted]
+
+		with (
+			patch("saashq.deferred_insert.CLAIM_IDLE_TIME", 0),
+			patch.object(saashq.cache, "xautoclaim", side_effect=xautoclaim_with_deleted_entry),
+		):
+			save_to_db()
+
+		self.assertTrue(saashq.db.exists("Route History", route_history))
+
+	def test_deferred_versions(self):
+		docname = saashq.generate_hash()
+		versions = [
+			{"ref_doctype": "ToDo", "docname": docname, "data": "{}", "creation": creation, "owner": "Guest"}
+			for creation in ("2024-01-01 10:00:00.000002", "2024-01-01 10:00:00.000001")
+		]
+		deferred_insert("Version", versions[:1])
+		deferred_insert("Version", versions[1:])
+
+		save_to_db()
+
+		written = saashq.get_all(
+			"Version",
+			filters={"docname": docname},
+			fields=["creation", "owner"],
+			order_by="creation",
+		)
+		# written as they were queued, not as the user running the job
+		self.assertEqual([str(v.creation) for v in written], sorted(v["creation"] for v in versions))
+		self.assertEqual({v.owner for v in written}, {"Guest"})
@@ -1,5 +1,7 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
+import copy
+import pickle
 from contextlib import contextmanager
 from datetime import timedelta
 from unittest.mock import Mock, patch
@@ -39,6 +41,82 @@ class TestDocument(IntegrationTestCase):
 		self.assertTrue(isinstance(d.permissions, list))
 		self.assertTrue(filter(lambda d: d.fieldname == "email", d.fields))
 
+	def test_get_docs(self):
+		names = ["User", "ToDo", "User"]
+		saashq.get_docs("DocType", names)  # warm up meta and controller caches
+
+		# one query for parents and one per child doctype
+		child_doctypes = {df.options for df in saashq.get_meta("DocType").get_table_fields()}
+		with self.assertQueryCount(1 + len(child_doctypes)):
+			docs = saashq.get_docs("DocType", names)
+
+		self.assertEqual([d.name for d in docs], ["User", "ToDo"])
+		for doc in docs:
+			self.assertEqual(doc.as_dict(), saashq.get_doc("DocType", doc.name).as_dict())
+			self.assertFalse(doc.flags.prefetched)
+
+		self.assertRaises(saashq.DoesNotExistError, saashq.get_docs, "DocType", ["User", "~not-a-doctype~"])
+
+	def test_lazy_children(self):
+		doc = saashq.get_doc("DocType", "User")
+		lazy_doc = saashq.get_doc("DocType", "User", lazy_children=True)
+		self.assertFalse(lazy_doc.fields.is_loaded)
+
+		with self.assertQueryCount(1):
+			self.assertEqual([df.fieldname for df in lazy_doc.fields], [df.fieldname for df in doc.fields])
+		self.assertEqual(lazy_doc.as_dict(), doc.as_dict())
+
+	def test_pickle_lazy_children(self):
+		doc = saashq.get_doc("DocType", "User")
+		for loaded in (False, True):
+			lazy_doc = saashq.get_doc("DocType", "User", lazy_children=True)
+			if loaded:
+				self.assertTrue(lazy_doc.fields)
+
+			unpickled = pickle.loads(pickle.dumps(lazy_doc))
+			self.assertEqual(unpickled.as_dict(), doc.as_dict())
+			self.assertEqual(copy.deepcopy(lazy_doc).as_dict(), doc.as_dict())
+
+	def test_load_selected_fields(self):
+		doc = saashq.get_doc("DocType", "User", fields=["allow_rename", "permissions"])
+		self.assertEqual(doc.allow_rename, 1)
+		self.assertIsNone(doc.get("module"))
+		self.assertTrue(doc.permissions)
+		self.assertFalse(doc.fields.is_loaded)
+		self.assertTrue(doc.fields)
+		self.assertRaises(saashq.ValidationError, doc.save)
+
+	def test_bulk_update_docs(self):
+		todos = [saashq.get_doc(doctype="ToDo", description=f"bulk update {i}").insert() for i in range(5)]
+		for todo in todos:
+			todo.description += " - done"
+			todo.status = "Closed"
+
+		with patch("saashq.desk.doctype.todo.todo.ToDo.on_update", autospec=True) as on_update:
+			saashq.bulk_update_docs(todos)
+
+		self.assertEqual(on_update.call_count, len(todos))
+		for todo in todos:
+			self.assertEqual(
+				saashq.db.get_value("ToDo", todo.name, ["description", "status"], as_dict=True),
+				{"description": todo.description, "status": "Closed"},
+			)
+
+		# child rows are inserted, updated and removed
+		event = saashq.get_doc(doctype="Event", subject="bulk update", starts_on=now_datetime()).insert()
+		event.append("event_participants", {"reference_doctype": "ToDo", "reference_docname": todos[0].name})
+		event.append("event_participants", {"reference_doctype": "ToDo", "reference_docname": todos[1].name})
+		saashq.bulk_update_docs([event])
+		event.event_participants.pop(0)
+		event.event_participants[0].reference_docname = todos[2].name
+		event.append("event_participants", {"reference_doctype": "ToDo", "reference_docname": todos[3].name})
+		saashq.bulk_update_docs([event])
+
+		self.assertEqual(
+			[d.reference_docname for d in saashq.get_doc("Event", event.name).event_participants],
+			[todos[2].name, todos[3].name],
+		)
+
 	def test_load_single(self):
 		d = saashq.get_doc("Website Settings", "Website Settings")
 		self.assertEqual(d.name, "Website Settings")
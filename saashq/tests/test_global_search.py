@@ -1,5 +1,6 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
+from unittest.mock import patch
 
 import saashq
 from saashq.custom.doctype.property_setter.property_setter import make_property_setter
@@ -86,6 +87,35 @@ class TestGlobalSearch(IntegrationTestCase):
 		results = global_search.search("Monthly")
 		self.assertEqual(len(results), 3)
 
+	def test_rebuild_in_chunks(self):
+		self.insert_test_events()
+		global_search.reset()
+
+		with patch.object(global_search, "REBUILD_CHUNK_SIZE", 2):
+			global_search.rebuild_for_doctype("Event")
+
+		self.assertEqual(
+			saashq.db.sql("select count(*) from `__global_search` where doctype = 'Event'")[0][0], 3
+		)
+		self.assertIn("awakens", global_search.search("awakens")[0].content)
+
+	def test_sync_coalesces_queued_updates(self):
+		self.insert_test_events()
+		event = saashq.get_doc("Event", saashq.get_all("Event")[0].name)
+		for subject in ("first queued update", "second queued update"):
+			event.subject = subject
+			event.save()
+
+		self.assertEqual(saashq.cache.llen("global_search_queue"), 2)
+		global_search.sync_global_search()
+		self.assertEqual(saashq.cache.llen("global_search_queue"), 0)
+
+		content = saashq.db.sql(
+			"select content from `__global_search` where doctype = 'Event' and name = %s", event.name
+		)[0][0]
+		self.assertIn("second queued update", content)
+		self.assertNotIn("first queued update", content)
+
 	def test_delete_doc(self):
 		self.insert_test_events()
 		event_name = saashq.get_all("Event")[0].name
@@ -0,0 +1,62 @@
+import pickle
+
+import saashq
+from saashq.desk.form.meta import FormMeta
+from saashq.model.meta import Meta
+from saashq.model.meta_codec import decode_meta, encode_meta
+from saashq.tests import IntegrationTestCase
+
+
+class TestMetaCodec(IntegrationTestCase):
+	def test_roundtrip(self):
+		meta = saashq.get_meta("User", cached=False)
+		decoded = pickle.loads(pickle.dumps(meta))
+
+		self.assertIsInstance(decoded, Meta)
+		self.assertEqual(decoded.as_dict(), meta.as_dict())
+		self.assertEqual(decoded.get_valid_columns(), meta.get_valid_columns())
+		self.assertEqual(
+			[df.fieldname for df in decoded.get_table_fields()],
+			[df.fieldname for df in meta.get_table_fields()],
+		)
+		self.assertEqual(type(decoded.fields[0]), type(meta.fields[0]))
+
+	def test_child_tables_are_lazy(self):
+		decoded = pickle.loads(pickle.dumps(saashq.get_meta("User", cached=False)))
+		self.assertNotIn("fields", decoded.__dict__)
+		self.assertEqual(decoded.name, "User")
+		self.assertNotIn("fields", decoded.__dict__)
+
+		field = decoded.get_field("email")
+		self.assertEqual(field.fieldname, "email")
+		self.assertIs(decoded.fields[decoded.fields.index(field)], field)
+		self.assertIs(field.parent_doc, decoded)
+
+		self.assertTrue(decoded.get("permissions"))
+		self.assertTrue(decoded.get({"fieldtype": "Table"}))
+
+	def test_lazy_tables_loaded_once(self):
+		from concurrent.futures import ThreadPoolExecutor
+
+		decoded = pickle.loads(pickle.dumps(saashq.get_meta("User", cached=False)))
+		with ThreadPoolExecutor(max_workers=4) as executor:
+			tables = list(executor.map(lambda _: decoded.fields, range(16)))
+
+		# concurrent loads publish one list, no thread sees a partly decoded or replaced table
+		self.assertTrue(all(table is decoded.fields for table in tables))
+		self.assertEqual(len(decoded.fields), len(saashq.get_meta("User").fields))
+		decoded._load_lazy_table("fields")
+		self.assertIs(decoded.fields, tables[0])
+
+	def test_form_meta(self):
+		form_meta = FormMeta("User", cached=False)
+		decoded = pickle.loads(pickle.dumps(form_meta))
+
+		self.assertIsInstance(decoded, FormMeta)
+		self.assertEqual(decoded.as_dict(), form_meta.as_dict())
+
+	def test_stale_format_is_rebuilt(self):
+		meta = saashq.get_meta("ToDo", cached=False)
+		self.assertEqual(decode_meta(Meta, "ToDo", encode_meta(meta)).as_dict(), meta.as_dict())
+		# data written by another python version / codec version is discarded
+		self.assertEqual(decode_meta(Meta, "ToDo", b"garbage").as_dict(), meta.as_dict())
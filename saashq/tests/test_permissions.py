@@ -19,6 +19,7 @@ from saashq.permissions import (
 	clear_user_permissions_for_doctype,
 	get_doc_permissions,
 	get_doctypes_with_read,
+	has_permission_bulk,
 	remove_user_permission,
 	update_permission_property,
 )
@@ -112,6 +113,24 @@ class TestPermissions(IntegrationTestCase):
 		self.assertTrue(post1.has_permission("read"))
 		self.assertTrue(get_doc_permissions(post1).get("read"))
 
+	def test_has_permission_bulk(self):
+		add_user_permission("Blog Category", "-test-blog-category-1", "test2@example.com")
+
+		saashq.set_user("Administrator")
+		saashq.share.add("Blog Post", "-test-blog-post-2", "test2@example.com")
+		self.addCleanup(saashq.share.remove, "Blog Post", "-test-blog-post-2", "test2@example.com")
+		saashq.set_user("test2@example.com")
+
+		names = ["-test-blog-post", "-test-blog-post-1", "-test-blog-post-2"]
+		expected = [saashq.has_permission("Blog Post", "read", name) for name in names]
+		self.assertEqual(has_permission_bulk("Blog Post", names), expected)
+		self.assertEqual(expected[:2], [False, True])
+
+		docs = [saashq.get_doc("Blog Post", name) for name in names]
+		for ptype in ("read", "write", "share", "delete"):
+			expected = [saashq.has_permission("Blog Post", ptype, doc) for doc in docs]
+			self.assertEqual(has_permission_bulk("Blog Post", docs, ptype), expected)
+
 	def test_user_permissions_in_report(self):
 		add_user_permission("Blog Category", "-test-blog-category-1", "test2@example.com")
 
@@ -1,9 +1,11 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
 
+from unittest.mock import patch
+
 import saashq
 import saashq.utils
-from saashq.desk.query_report import build_xlsx_data, export_query, run
+from saashq.desk.query_report import build_xlsx_data, export_query, generate_report_result, run
 from saashq.tests import IntegrationTestCase
 from saashq.utils.xlsxutils import make_xlsx
 
@@ -129,6 +131,67 @@ class TestQueryReport(IntegrationTestCase):
 
 		saashq.delete_doc("Report", REPORT_NAME, delete_permanently=True)
 
+	def test_report_result_cache(self):
+		report = saashq.get_doc(
+			doctype="Report",
+			report_name=saashq.generate_hash(),
+			ref_doctype="ToDo",
+			report_type="Query Report",
+			is_standard="No",
+			query="select count(*) as `count` from `tabToDo`",
+			result_cache_ttl=60,
+		).insert(ignore_permissions=True)
+
+		with patch(
+			"saashq.desk.query_report.generate_report_result", wraps=generate_report_result
+		) as generate_result:
+			first = run(report.name, filters={"status": ""})
+			# unset filters are the same as empty ones
+			self.assertEqual(run(report.name)["result"], first["result"])
+			self.assertEqual(generate_result.call_count, 1)
+
+			saashq.get_doc(doctype="ToDo", description="Report result cache").insert()
+			result = run(report.name)["result"]
+			self.assertEqual(generate_result.call_count, 2)
+			self.assertEqual(result[0]["count"], first["result"][0]["count"] + 1)
+
+	def test_report_result_cache_per_user(self):
+		users = [
+			saashq.get_doc(
+				doctype="User", email=f"{saashq.generate_hash(length=8)}@example.com", first_name="Test"
+			)
+			.insert(ignore_permissions=True)
+			.name
+			for _ in range(2)
+		]
+
+		def make_report(ref_doctype, share_cached_results):
+			return saashq.get_doc(
+				doctype="Report",
+				report_name=saashq.generate_hash(),
+				ref_doctype=ref_doctype,
+				report_type="Query Report",
+				is_standard="No",
+				query=f"select count(*) as `count` from `tab{ref_doctype}`",
+				result_cache_ttl=60,
+				share_cached_results=share_cached_results,
+			).insert(ignore_permissions=True)
+
+		def get_generated_count(report):
+			with patch(
+				"saashq.desk.query_report.generate_report_result", wraps=generate_report_result
+			) as generate_result:
+				for user in users:
+					run(report.name, user=user)
+
+			return generate_result.call_count
+
+		# users with the same roles don't share results unless the report opts in
+		self.assertEqual(get_generated_count(make_report("Language", 0)), 2)
+		self.assertEqual(get_generated_count(make_report("Language", 1)), 1)
+		# ToDos are filtered by a permission query hook
+		self.assertEqual(get_generated_count(make_report("ToDo", 1)), 2)
+
 	def test_report_for_duplicate_column_names(self):
 		"""Test report with duplicate column names"""
 
@@ -0,0 +1,81 @@
+# Copyright (c) 2023-Present, SaasHQ
+# License: MIT. See LICENSE
+
+import json
+from unittest.mock import MagicMock, patch
+
+import saashq
+from saashq.realtime import claim_list_update_rooms
+from saashq.tests import IntegrationTestCase
+from saashq.utils import CallbackManager
+
+
+class TestRealtime(IntegrationTestCase):
+	def setUp(self):
+		self.redis = MagicMock()
+		patcher = patch(
+			"saashq.utils.background_jobs.get_redis_connection_without_auth", return_value=self.redis
+		)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		saashq.cache.delete_keys("realtime_list_update:")
+
+	def get_published(self) -> list[dict]:
+		return [json.loads(c.args[1]) for c in self.redis.pipeline.return_value.publish.call_args_list]
+
+	def publish_list_update(self, name):
+		saashq.publish_realtime(
+			"list_update", {"doctype": "ToDo", "name": name, "user": "Administrator"}, after_commit=True
+		)
+
+	def test_after_commit_events_are_coalesced(self):
+		for _ in range(3):
+			saashq.publish_realtime("doc_update", {"doctype": "ToDo", "name": "a"}, after_commit=True)
+		for name in ("a", "b", "a"):
+			self.publish_list_update(name)
+
+		saashq.db.commit()
+
+		self.redis.pipeline.return_value.execute.assert_called_once()
+		published = self.get_published()
+		self.assertEqual([p["event"] for p in published], ["doc_update", "list_update"])
+
+		list_update = published[1]
+		self.assertEqual(list_update["room"], "doctype:ToDo")
+		self.assertEqual(list_update["message"]["names"], ["a", "b"])
+
+	def test_list_updates_aggregated_during_import(self):
+		job = saashq._dict(after_job=CallbackManager())
+		with (
+			patch.dict(saashq.flags, {"in_import": True}),
+			patch.object(saashq.local, "job", job, create=True),
+		):
+			for name in ("a", "b", "c"):
+				self.publish_list_update(name)
+				saashq.db.commit()
+
+			# only the first list update is published right away
+			self.assertEqual([p["message"]["name"] for p in self.get_published()], ["a"])
+
+			job.after_job.run()
+
+		published = self.get_published()
+		self.assertEqual(len(published), 2)
+		self.assertEqual(published[1]["message"]["names"], ["b", "c"])
+
+	def test_list_update_rate_limit_is_shared(self):
+		# another process published a list update of the room just now
+		claim_list_update_rooms(["doctype:ToDo"], 5)
+
+		job = saashq._dict(after_job=CallbackManager())
+		with (
+			patch.dict(saashq.flags, {"in_import": True}),
+			patch.object(saashq.local, "job", job, create=True),
+		):
+			self.publish_list_update("a")
+			saashq.db.commit()
+			self.assertEqual(self.get_published(), [])
+
+			job.after_job.run()
+
+		self.assertEqual([p["message"]["name"] for p in self.get_published()], ["a"])
@@ -27,12 +27,64 @@ class TestReportview(IntegrationTestCase):
 
 				self.assertTrue(saashq.response["filename"].endswith(".csv"))
 				self.assertEqual(saashq.response["type"], "binary")
-				with StringIO(saashq.response["filecontent"].decode("utf-8")) as result:
+				with saashq.response["filecontent"] as file:
+					content = file.read()
+
+				with StringIO(content.decode("utf-8")) as result:
 					reader = DictReader(result, delimiter=delimiter, quoting=quoting)
 					for row in reader:
 						self.assertEqual(int(row["Is Single"]), 1)
 						self.assertEqual(row["Module"], "Core")
 
+	def test_excel(self):
+		from io import BytesIO
+
+		from openpyxl import load_workbook
+
+		saashq.local.form_dict = saashq._dict(
+			doctype="DocType",
+			file_format_type="Excel",
+			fields=("name", "module", "issingle"),
+			filters={"issingle": 1, "module": "Core"},
+			add_totals_row="1",
+		)
+		export_query()
+
+		self.assertTrue(saashq.response["filename"].endswith(".xlsx"))
+		with saashq.response["filecontent"] as file:
+			rows = list(load_workbook(BytesIO(file.read())).active.values)
+		names = saashq.get_all("DocType", filters={"issingle": 1, "module": "Core"}, pluck="name")
+		# header, data and totals row
+		self.assertEqual(len(rows), len(names) + 2)
+		self.assertEqual(rows[-1][-1], len(names))
+
+	def test_export_to_file(self):
+		from csv import QUOTE_NONNUMERIC, reader
+		from io import StringIO
+
+		from saashq.desk.reportview import export_query_to_file
+
+		form_params = saashq._dict(
+			fields=["name", "module"],
+			filters={"issingle": 1, "module": "Core"},
+			as_list=True,
+			limit_page_length=None,
+		)
+		export_query_to_file(
+			"DocType",
+			form_params,
+			"CSV",
+			"Single DocTypes",
+			{"delimiter": ",", "quoting": QUOTE_NONNUMERIC, "decimal_sep": "."},
+		)
+
+		file = saashq.get_last_doc("File", filters={"file_name": ("like", "single_doctypes-%.csv")})
+		self.addCleanup(file.delete)
+		rows = list(reader(StringIO(file.get_content())))
+		names = saashq.get_all("DocType", filters={"issingle": 1, "module": "Core"}, pluck="name")
+		self.assertEqual(sorted(row[1] for row in rows[1:]), sorted(names))
+		self.assertEqual(file.file_size, len(file.get_content().encode()))
+
 	def test_extract_fieldname(self):
 		self.assertEqual(
 			extract_fieldnames("count(distinct `tabPhoto`.name) as total_count")[0], "tabPhoto.name"
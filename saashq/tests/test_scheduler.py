@@ -13,7 +13,9 @@ from saashq.utils.doctor import purge_pending_jobs
 from saashq.utils.scheduler import (
 	DEFAULT_SCHEDULER_TICK,
 	_get_last_creation_timestamp,
+	clear_job_schedule,
 	enqueue_events,
+	get_job_schedule,
 	is_dormant,
 	schedule_jobs_based_on_activity,
 	sleep_duration,
@@ -44,6 +46,7 @@ class TestScheduler(IntegrationTestCase):
 
 	def test_enqueue_jobs(self):
 		saashq.db.sql("update `tabScheduled Job Type` set last_execution = '2010-01-01 00:00:00'")
+		clear_job_schedule()
 
 		enqueued_jobs = enqueue_events()
 
@@ -54,6 +57,24 @@ class TestScheduler(IntegrationTestCase):
 			enqueued_jobs,
 		)
 
+	@patch("saashq.utils.scheduler.schedule_jobs_based_on_activity", return_value=True)
+	def test_only_due_jobs_are_loaded(self, _):
+		job = get_test_job(method="saashq.tests.test_scheduler.test_method", frequency="Daily")
+		job.db_set("last_execution", now_datetime())
+
+		heap = get_job_schedule()["heap"]
+		self.assertIn((job.get_next_execution(), job.name), heap)
+		self.assertEqual(heap[0], min(heap))
+
+		with patch.object(ScheduledJobType, "enqueue", autospec=True, return_value=False) as enqueue:
+			enqueue_events()
+			self.assertNotIn(job.name, [c.args[0].name for c in enqueue.call_args_list])
+
+			# modifying the job type builds the schedule again
+			job.db_set("last_execution", "2010-01-01 00:00:00")
+			enqueue_events()
+			self.assertIn(job.name, [c.args[0].name for c in enqueue.call_args_list])
+
 	def test_queue_peeking(self):
 		job = get_test_job()
 
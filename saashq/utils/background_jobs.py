@@ -147,6 +147,45 @@ def enqueue(
 
 		raise
 
+	job_data = get_job_data(
+		method,
+		queue,
+		timeout=timeout,
+		event=event,
+		is_async=is_async,
+		job_name=job_name,
+		on_success=on_success,
+		on_failure=on_failure,
+		at_front=at_front,
+		job_id=job_id,
+		kwargs=kwargs,
+	)
+
+	def enqueue_call():
+		return q.enqueue_call(**job_data)
+
+	if enqueue_after_commit:
+		saashq.db.after_commit.add(enqueue_call)
+		return
+
+	return enqueue_call()
+
+
+def get_job_data(
+	method: str | Callable,
+	queue: str,
+	*,
+	timeout: int | None,
+	event: str | None,
+	is_async: bool,
+	job_name: str | None,
+	on_success: Callable | None,
+	on_failure: Callable | None,
+	at_front: bool,
+	job_id: str,
+	kwargs: dict,
+) -> dict:
+	"""Return arguments of `Queue.enqueue_call` to run `method` in the current site via `execute_job`."""
 	if not timeout:
 		timeout = get_queues_timeout().get(queue) or 300
 
@@ -166,26 +205,68 @@ def enqueue(
 		"kwargs": kwargs,
 	}
 
-	on_failure = on_failure or truncate_failed_registry
+	return {
+		"func": "saashq.utils.background_jobs.execute_job",
+		"on_success": Callback(func=on_success) if on_success else None,
+		"on_failure": Callback(func=on_failure or truncate_failed_registry),
+		"timeout": timeout,
+		"kwargs": queue_args,
+		"at_front": at_front,
+		"failure_ttl": saashq.conf.get("rq_job_failure_ttl") or RQ_JOB_FAILURE_TTL,
+		"result_ttl": saashq.conf.get("rq_results_ttl") or RQ_RESULTS_TTL,
+		"job_id": job_id,
+	}
 
-	def enqueue_call():
-		return q.enqueue_call(
-			"saashq.utils.background_jobs.execute_job",
-			on_success=Callback(func=on_success) if on_success else None,
-			on_failure=Callback(func=on_failure),
+
+class EnqueueBatch:
+	"""Jobs enqueued together in one redis pipeline, possibly of many sites.
+
+	Jobs are added in the context of their site, like with `enqueue`."""
+
+	def __init__(self):
+		self.jobs: dict[str, list] = defaultdict(list)
+
+	def add(
+		self,
+		method: str | Callable,
+		queue: str = "default",
+		timeout: int | None = None,
+		*,
+		at_front: bool = False,
+		job_id: str | None = None,
+		**kwargs,
+	):
+		validate_queue(queue)
+		job_data = get_job_data(
+			method,
+			queue,
 			timeout=timeout,
-			kwargs=queue_args,
+			event=None,
+			is_async=True,
+			job_name=None,
+			on_success=None,
+			on_failure=None,
 			at_front=at_front,
-			failure_ttl=saashq.conf.get("rq_job_failure_ttl") or RQ_JOB_FAILURE_TTL,
-			result_ttl=saashq.conf.get("rq_results_ttl") or RQ_RESULTS_TTL,
-			job_id=job_id,
+			job_id=create_job_id(job_id),
+			kwargs=kwargs,
 		)
-
-	if enqueue_after_commit:
-		saashq.db.after_commit.add(enqueue_call)
-		return
-
-	return enqueue_call()
+		self.jobs[queue].append(Queue.prepare_data(**job_data))
+
+	def enqueue(self) -> list[Job]:
+		"""Enqueue all jobs added since the last call."""
+		if not self.jobs:
+			return []
+
+		connection = get_redis_conn()
+		jobs = []
+		with connection.pipeline() as pipeline:
+			for queue, job_datas in self.jobs.items():
+				q = Queue(generate_qname(queue), connection=connection)
+				jobs.extend(q.enqueue_many(job_datas, pipeline=pipeline))
+			pipeline.execute()
+
+		self.jobs.clear()
+		return jobs
 
 
 def enqueue_doc(doctype, name=None, method=None, queue="default", timeout=300, now=False, **kwargs):
@@ -1,9 +1,11 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
+import codecs
 import csv
 import json
 from csv import Sniffer
 from io import StringIO
+from itertools import islice
 
 import requests
 
@@ -12,6 +14,9 @@ from saashq import _, msgprint
 from saashq.core.doctype.file.file import FILE_ENCODING_OPTIONS
 from saashq.utils import cint, comma_or, cstr, flt
 
+# bytes read from the start of a CSV file to detect its encoding
+CSV_SAMPLE_SIZE = 64 * 1024
+
 
 def read_csv_content_from_attached_file(doc):
 	fileid = saashq.get_all(
@@ -58,15 +63,59 @@ def read_csv_content(fcontent):
 	fcontent = fcontent.encode("utf-8")
 	content = [saashq.safe_decode(line) for line in fcontent.splitlines(True)]
 
-	sniffer = Sniffer()
 	# Don't need to use whole csv, if more than 20 rows, use just first 20
-	sample_content = content[:20] if len(content) > 20 else content
+	dialect = sniff_csv_dialect(content[:20])
+
+	try:
+		return [clean_csv_row(row) for row in csv.reader(content, dialect=dialect)]
+	except Exception:
+		saashq.msgprint(_("Not a valid Comma Separated Value (CSV File)"))
+		raise
+
+
+def iter_csv_file(file_path):
+	"""Yield rows of the CSV file at `file_path` one at a time, parsed like `read_csv_content`.
+
+	Only a sample from the start of the file is used to detect its encoding and delimiter, so the
+	file is never held in memory as a whole."""
+	with open(file_path, "rb") as f:
+		sample = f.read(CSV_SAMPLE_SIZE)
+
+	encoding = None
+	for encoding_option in FILE_ENCODING_OPTIONS:
+		try:
+			# the sample may end in the middle of a multi-byte character
+			codecs.getincrementaldecoder(encoding_option)().decode(sample, final=False)
+			encoding = encoding_option
+			break
+		except UnicodeDecodeError:
+			continue
+
+	if not encoding:
+		saashq.msgprint(
+			_("Unknown file encoding. Tried to use: {0}").format(", ".join(FILE_ENCODING_OPTIONS)),
+			raise_exception=True,
+		)
+
+	with open(file_path, encoding=encoding, newline="") as f:
+		dialect = sniff_csv_dialect(list(islice(f, 20)))
+		f.seek(0)
+
+		try:
+			for row in csv.reader(f, dialect=dialect):
+				yield clean_csv_row(row)
+		except csv.Error:
+			saashq.msgprint(_("Not a valid Comma Separated Value (CSV File)"))
+			raise
+
+
+def sniff_csv_dialect(sample_content):
 	# only testing for most common delimiter types, this later can be extended
 	# init default dialect, to avoid lint errors
 	dialect = csv.get_dialect("excel")
 	try:
 		# csv by default uses excel dialect, which is not always correct
-		dialect = sniffer.sniff(sample="\n".join(sample_content), delimiters=saashq.flags.delimiter_options)
+		dialect = Sniffer().sniff(sample="\n".join(sample_content), delimiters=saashq.flags.delimiter_options)
 	except csv.Error:
 		# if sniff fails, show alert on user interface. Fall back to use default dialect (excel)
 		saashq.msgprint(
@@ -77,27 +126,22 @@ def read_csv_content(fcontent):
 			alert=True,
 		)
 
-	try:
-		rows = []
-		for row in csv.reader(content, dialect=dialect):
-			r = []
-			for val in row:
-				# decode everything
-				val = val.strip()
+	return dialect
 
-				if val == "":
-					# reason: in maraidb strict config, one cannot have blank strings for non string datatypes
-					r.append(None)
-				else:
-					r.append(val)
 
-			rows.append(r)
+def clean_csv_row(row):
+	r = []
+	for val in row:
+		# decode everything
+		val = val.strip()
 
-		return rows
+		if val == "":
+			# reason: in maraidb strict config, one cannot have blank strings for non string datatypes
+			r.append(None)
+		else:
+			r.append(val)
 
-	except Exception:
-		saashq.msgprint(_("Not a valid Comma Separated Value (CSV File)"))
-		raise
+	return r
 
 
 @saashq.whitelist()
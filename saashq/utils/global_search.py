@@ -9,12 +9,19 @@ import redis
 
 import saashq
 from saashq.model.base_document import get_controller
-from saashq.utils import cint, strip_html_tags
+from saashq.utils import cint, create_batch, strip_html_tags
 from saashq.utils.data import cstr
 from saashq.utils.html_utils import unescape_html
 
 HTML_TAGS_PATTERN = re.compile(r"(?s)<[\s]*(script|style).*?</\1>")
 
+# documents read per query while rebuilding the index of a doctype
+REBUILD_CHUNK_SIZE = 10_000
+# queued entries synced at once, an entry is only written once per batch
+SYNC_BATCH_SIZE = 10_000
+# rows written per insert query
+UPSERT_BATCH_SIZE = 1_000
+
 
 def setup_global_search_table():
 	"""
@@ -103,53 +110,83 @@ def rebuild_for_doctype(doctype):
 	parent_search_fields = meta.get_global_search_fields()
 	fieldnames = get_selected_fields(meta, parent_search_fields)
 
-	# Get all records from parent doctype table
-	all_records = saashq.get_all(doctype, fields=fieldnames, filters=_get_filters())
-
-	# Children data
-	all_children, child_search_fields = get_children_data(doctype, meta)
-	all_contents = []
-
-	for doc in all_records:
-		content = []
-		for field in parent_search_fields:
-			value = doc.get(field.fieldname)
-			if value:
-				content.append(get_formatted_value(value, field))
-
-		# get children data
-		for child_doctype, records in all_children.get(doc.name, {}).items():
-			for field in child_search_fields.get(child_doctype):
-				for r in records:
-					if r.get(field.fieldname):
-						content.append(get_formatted_value(r.get(field.fieldname), field))
-
-		if content:
-			# if doctype published in website, push title, route etc.
+	# if doctype published in website, push title, route etc.
+	try:
+		check_published = (
+			hasattr(get_controller(doctype), "is_website_published") and meta.allow_guest_to_view
+		)
+	except ImportError:
+		# some doctypes has been deleted via future patch, hence controller does not exists
+		check_published = False
+
+	for records in get_records_in_chunks(doctype, fieldnames, _get_filters(), REBUILD_CHUNK_SIZE):
+		# Children data
+		all_children, child_search_fields = get_children_data(
+			doctype, meta, parents=[doc.name for doc in records]
+		)
+		values = []
+
+		for doc in records:
+			content = []
+			for field in parent_search_fields:
+				value = doc.get(field.fieldname)
+				if value:
+					content.append(get_formatted_value(value, field))
+
+			# get children data
+			for child_doctype, child_records in all_children.get(doc.name, {}).items():
+				for field in child_search_fields.get(child_doctype):
+					for r in child_records:
+						if r.get(field.fieldname):
+							content.append(get_formatted_value(r.get(field.fieldname), field))
+
+			if not content:
+				continue
+
 			published = 0
 			title, route = "", ""
-			try:
-				if hasattr(get_controller(doctype), "is_website_published") and meta.allow_guest_to_view:
-					d = saashq.get_doc(doctype, doc.name)
-					published = 1 if d.is_website_published() else 0
-					title = d.get_title()
-					route = d.get("route")
-			except ImportError:
-				# some doctypes has been deleted via future patch, hence controller does not exists
-				pass
-
-			all_contents.append(
-				{
-					"doctype": saashq.db.escape(doctype),
-					"name": saashq.db.escape(doc.name),
-					"content": saashq.db.escape(" ||| ".join(content or "")),
-					"published": published,
-					"title": saashq.db.escape((title or "")[: int(saashq.db.VARCHAR_LEN)]),
-					"route": saashq.db.escape((route or "")[: int(saashq.db.VARCHAR_LEN)]),
-				}
+			if check_published:
+				d = saashq.get_doc(doctype, doc.name)
+				published = 1 if d.is_website_published() else 0
+				title = d.get_title()
+				route = d.get("route")
+
+			values.append(
+				(
+					doctype,
+					doc.name,
+					" ||| ".join(content),
+					published,
+					(title or "")[: int(saashq.db.VARCHAR_LEN)],
+					(route or "")[: int(saashq.db.VARCHAR_LEN)],
+				)
 			)
-	if all_contents:
-		insert_values_for_multiple_docs(all_contents)
+
+		sync_values(values)
+
+
+def get_records_in_chunks(doctype, fieldnames, filters, chunk_size):
+	"""Yield records in chunks of `chunk_size`, ordered by name.
+
+	Every chunk is read with one query continuing after the last name of the previous chunk, so
+	reading a chunk doesn't get slower the further the rebuild is and other queries can run between
+	chunks."""
+	last_name = None
+	while True:
+		chunk_filters = saashq._dict(filters)
+		if last_name is not None:
+			chunk_filters.name = [">", last_name]
+
+		records = saashq.get_all(
+			doctype, fields=fieldnames, filters=chunk_filters, order_by="name asc", limit=chunk_size
+		)
+		if records:
+			yield records
+
+		if len(records) < chunk_size:
+			return
+
+		last_name = records[-1].name
 
 
 def delete_global_search_records_for_doctype(doctype):
@@ -169,9 +206,9 @@ def get_selected_fields(meta, global_search_fields):
 	return fieldnames
 
 
-def get_children_data(doctype, meta):
+def get_children_data(doctype, meta, parents=None):
 	"""
-	Get all records from all the child tables of a doctype
+	Get all records from all the child tables of a doctype, only of `parents` if passed
 
 	all_children = {
 	        "parent1": {
@@ -194,11 +231,11 @@ def get_children_data(doctype, meta):
 		if search_fields:
 			child_search_fields.setdefault(child.options, search_fields)
 			child_fieldnames = get_selected_fields(child_meta, search_fields)
-			child_records = saashq.get_all(
-				child.options,
-				fields=child_fieldnames,
-				filters={"docstatus": ["!=", 1], "parenttype": doctype},
-			)
+			filters = {"docstatus": ["!=", 1], "parenttype": doctype}
+			if parents is not None:
+				filters["parent"] = ["in", parents]
+
+			child_records = saashq.get_all(child.options, fields=child_fieldnames, filters=filters)
 
 			for record in child_records:
 				all_children.setdefault(record.parent, saashq._dict()).setdefault(child.options, []).append(
@@ -208,28 +245,6 @@ def get_children_data(doctype, meta):
 	return all_children, child_search_fields
 
 
-def insert_values_for_multiple_docs(all_contents):
-	values = [
-		"({doctype}, {name}, {content}, {published}, {title}, {route})".format(**content)
-		for content in all_contents
-	]
-	batch_size = 50000
-	for i in range(0, len(values), batch_size):
-		batch_values = values[i : i + batch_size]
-		# ignoring duplicate keys for doctype_name
-		saashq.db.multisql(
-			{
-				"mariadb": """INSERT IGNORE INTO `__global_search`
-				(doctype, name, content, published, title, route)
-				VALUES {} """.format(", ".join(batch_values)),
-				"postgres": """INSERT INTO `__global_search`
-				(doctype, name, content, published, title, route)
-				VALUES {}
-				ON CONFLICT("name", "doctype") DO NOTHING""".format(", ".join(batch_values)),
-			}
-		)
-
-
 def update_global_search(doc):
 	"""
 	Add values marked with `in_global_search` to
@@ -366,16 +381,21 @@ def sync_global_search():
 	:param flags:
 	:return:
 	"""
-	from itertools import islice
+	while search_items := pop_search_queue_items(SYNC_BATCH_SIZE):
+		values = _get_deduped_search_item_values(search_items)
+		sync_values(list(values))
 
-	def get_search_queue_item_generator():
-		while value := saashq.cache.rpop("global_search_queue"):
-			yield value
 
-	item_generator = get_search_queue_item_generator()
-	while search_items := tuple(islice(item_generator, 10_000)):
-		values = _get_deduped_search_item_values(search_items)
-		sync_values(values)
+def pop_search_queue_items(count: int) -> list[bytes]:
+	"""Remove and return up to `count` of the oldest items of `global_search_queue`, oldest first."""
+	key = saashq.cache.make_key("global_search_queue")
+	pipeline = saashq.cache.pipeline()
+	pipeline.lrange(key, -count, -1)
+	pipeline.ltrim(key, 0, -count - 1)
+	items, _trimmed = pipeline.execute()
+
+	# items are pushed to the head of the list
+	return items[::-1]
 
 
 def _get_deduped_search_item_values(items):
@@ -392,6 +412,12 @@ def _get_deduped_search_item_values(items):
 
 
 def sync_values(values: list):
+	"""Insert or update rows of (doctype, name, content, published, title, route) in batches."""
+	for batch in create_batch(values, UPSERT_BATCH_SIZE):
+		_sync_values(batch)
+
+
+def _sync_values(values: list):
 	from pypika.terms import Values
 
 	GlobalSearch = saashq.qb.Table("__global_search")
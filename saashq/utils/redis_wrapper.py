@@ -1,7 +1,12 @@
 # Copyright (c) 2023-Present, SaasHQ
 # License: MIT. See LICENSE
+import os
 import pickle
 import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from contextlib import suppress
 
 import redis
@@ -25,9 +30,104 @@ class RedisearchWrapper(Search):
 		return super().sugget(self.client.make_key(key), *args, **kwargs)
 
 
+L1_INVALIDATION_CHANNEL = "saashq:l1_cache:invalidate"
+
+# Keys (matched by prefix, without the site prefix) that are read far more often than they
+# change. Only these are served from the in-process L1 cache unless `l1_cache_keys` is set.
+DEFAULT_L1_CACHE_KEYS = (
+	"doctype_meta",
+	"doctype_form_meta",
+	"table_columns",
+	"is_table",
+	"roles",
+	"defaults",
+	"app_hooks",
+	"document_cache::System Settings::",
+)
+
+
+class L1Cache:
+	"""Bounded, per-process LRU cache with TTL that sits in front of Redis.
+
+	Entries are stored under `(key, field)` where `field` is `None` for plain keys and the
+	hash field for hashes. Values are stored as-is (not pickled), so callers must treat them
+	as read-only, same as with `site_cache`.
+	"""
+
+	def __init__(self, maxsize: int = 1024, ttl: int = 60):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.generation = 0
+		self._data: OrderedDict = OrderedDict()
+		self._fields: dict[bytes, set] = {}
+		self._lock = threading.Lock()
+
+	def get(self, key: bytes, field=None) -> tuple[bool, object]:
+		with self._lock:
+			try:
+				expires_at, value = self._data[(key, field)]
+			except KeyError:
+				return False, None
+
+			if expires_at < time.monotonic():
+				self._pop((key, field))
+				return False, None
+
+			self._data.move_to_end((key, field))
+			return True, value
+
+	def set(self, key: bytes, value, field=None, generation: int | None = None):
+		"""Store value, unless an invalidation happened since `generation` was read."""
+		with self._lock:
+			if generation is not None and generation != self.generation:
+				return
+
+			self._data[(key, field)] = (time.monotonic() + self.ttl, value)
+			self._data.move_to_end((key, field))
+			self._fields.setdefault(key, set()).add(field)
+
+			while len(self._data) > self.maxsize:
+				self._pop(next(iter(self._data)))
+
+	def evict(self, key: bytes, field=None):
+		"""Evict a single entry. If `field` is None, evict the key and all its hash fields."""
+		with self._lock:
+			self.generation += 1
+			if field is not None:
+				self._pop((key, field))
+				return
+
+			for f in self._fields.pop(key, ()):
+				self._data.pop((key, f), None)
+
+	def clear(self):
+		with self._lock:
+			self.generation += 1
+			self._data.clear()
+			self._fields.clear()
+
+	def _pop(self, entry):
+		self._data.pop(entry, None)
+		key, field = entry
+		if fields := self._fields.get(key):
+			fields.discard(field)
+			if not fields:
+				del self._fields[key]
+
+	def __len__(self):
+		return len(self._data)
+
+
 class RedisWrapper(redis.Redis):
 	"""Redis client that will automatically prefix conf.db_name"""
 
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._l1: L1Cache | None = None
+		self._l1_pid: int | None = None
+		self._l1_thread = None
+		self._l1_instance_id = uuid.uuid4().hex
+
 	def connected(self):
 		try:
 			self.ping()
@@ -39,6 +139,80 @@ class RedisWrapper(redis.Redis):
 		"""WARNING: Added for backward compatibility to support saashq.cache().method(...)"""
 		return self
 
+	def _get_l1(self) -> L1Cache | None:
+		"""Return the L1 cache if enabled for this site and its invalidation listener is alive."""
+		if not saashq.conf.get("enable_l1_cache"):
+			return None
+
+		if self._l1_pid != os.getpid():
+			# forked (or first use), listener thread from parent doesn't exist here
+			self._l1 = L1Cache(
+				maxsize=saashq.conf.get("l1_cache_size") or 1024,
+				ttl=saashq.conf.get("l1_cache_ttl") or 60,
+			)
+			self._l1_pid = os.getpid()
+			self._l1_thread = None
+
+		if self._l1_thread is None or not self._l1_thread.is_alive():
+			self._l1.clear()
+			if not self._start_l1_listener():
+				return None
+
+		return self._l1
+
+	def _start_l1_listener(self) -> bool:
+		def on_error(e, pubsub, thread):
+			# invalidations may have been missed, drop everything and retry on next access
+			thread.stop()
+			pubsub.close()
+			self._l1.clear()
+
+		try:
+			pubsub = self.pubsub(ignore_subscribe_messages=True)
+			pubsub.subscribe(**{L1_INVALIDATION_CHANNEL: self._on_l1_invalidation})
+			self._l1_thread = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=on_error)
+		except redis.exceptions.ConnectionError:
+			self._l1_thread = None
+			return False
+
+		return True
+
+	def _on_l1_invalidation(self, message):
+		instance_id, entries = pickle.loads(message["data"])
+		if instance_id == self._l1_instance_id or self._l1 is None:
+			return
+
+		for key, field in entries:
+			self._l1.evict(key, field)
+
+	def _is_l1_key(self, key: bytes | str) -> bool:
+		key = key.decode() if isinstance(key, bytes) else key
+		if "|" not in key:
+			# shared keys are not site specific and aren't L1 cached
+			return False
+
+		key = key.split("|", 1)[1]
+		return key.startswith(tuple(saashq.conf.get("l1_cache_keys") or DEFAULT_L1_CACHE_KEYS))
+
+	def _invalidate_l1(self, entries: list[tuple[bytes, str | None]], pipeline=None):
+		"""Evict entries from this worker's L1 cache and broadcast eviction to all other workers."""
+		entries = [(saashq.safe_encode(key), field) for key, field in entries if self._is_l1_key(key)]
+		if not entries or not saashq.conf.get("enable_l1_cache"):
+			return
+
+		if self._l1 is not None:
+			for key, field in entries:
+				self._l1.evict(key, field)
+
+		message = pickle.dumps((self._l1_instance_id, entries))
+		if pipeline is not None:
+			# publish after queued commands are executed, not before
+			pipeline.publish(L1_INVALIDATION_CHANNEL, message)
+			return
+
+		with suppress(redis.exceptions.ConnectionError):
+			self.publish(L1_INVALIDATION_CHANNEL, message)
+
 	def make_key(self, key, user=None, shared=False):
 		if shared:
 			return key
@@ -66,6 +240,8 @@ class RedisWrapper(redis.Redis):
 		with suppress(redis.exceptions.ConnectionError):
 			self.set(name=key, value=pickle.dumps(val), ex=expires_in_sec)
 
+		self._invalidate_l1([(key, None)])
+
 	def get_value(self, key, generator=None, user=None, expires=False, shared=False):
 		"""Return cache value. If not found and generator function is
 		        given, call the generator.
@@ -82,6 +258,14 @@ class RedisWrapper(redis.Redis):
 
 		else:
 			val = None
+			l1 = None if expires or not self._is_l1_key(key) else self._get_l1()
+			if l1 is not None:
+				hit, val = l1.get(key)
+				if hit:
+					saashq.local.cache[key] = val
+					return val
+				generation = l1.generation
+
 			try:
 				val = self.get(key)
 			except redis.exceptions.ConnectionError:
@@ -89,6 +273,8 @@ class RedisWrapper(redis.Redis):
 
 			if val is not None:
 				val = pickle.loads(val)
+				if l1 is not None:
+					l1.set(key, val, generation=generation)
 
 			if not expires:
 				if val is None and generator:
@@ -143,6 +329,8 @@ class RedisWrapper(redis.Redis):
 		except redis.exceptions.ConnectionError:
 			pass
 
+		self._invalidate_l1([(key, None) for key in keys])
+
 	def lpush(self, key, value):
 		return super().lpush(self.make_key(key), value)
 
@@ -187,6 +375,8 @@ class RedisWrapper(redis.Redis):
 		except redis.exceptions.ConnectionError:
 			pass
 
+		self._invalidate_l1([(_name, key)])
+
 	def hexists(self, name: str, key: str, shared: bool = False) -> bool:
 		if key is None:
 			return False
@@ -219,6 +409,14 @@ class RedisWrapper(redis.Redis):
 		if key in saashq.local.cache[_name]:
 			return saashq.local.cache[_name][key]
 
+		l1 = self._get_l1() if self._is_l1_key(_name) else None
+		if l1 is not None:
+			hit, value = l1.get(_name, key)
+			if hit:
+				saashq.local.cache[_name][key] = value
+				return value
+			generation = l1.generation
+
 		value = None
 		try:
 			value = super().hget(_name, key)
@@ -228,6 +426,8 @@ class RedisWrapper(redis.Redis):
 		if value is not None:
 			value = pickle.loads(value)
 			saashq.local.cache[_name][key] = value
+			if l1 is not None:
+				l1.set(_name, value, field=key, generation=generation)
 		elif generator:
 			value = generator()
 			self.hset(name, key, value, shared=shared)
@@ -262,6 +462,7 @@ class RedisWrapper(redis.Redis):
 					super().hdel(_name, keys)
 				except redis.exceptions.ConnectionError:
 					pass
+			self._invalidate_l1([(_name, keys)], pipeline=pipeline)
 			return
 
 		local_pipeline = False
@@ -276,6 +477,8 @@ class RedisWrapper(redis.Redis):
 					del saashq.local.cache[_name][key]
 			pipeline.hdel(_name, key)
 
+		self._invalidate_l1([(_name, key) for key in keys], pipeline=pipeline)
+
 		if local_pipeline:
 			try:
 				pipeline.execute()
@@ -155,7 +155,13 @@ def as_binary():
 	filename = saashq.response["filename"]
 	filename = filename.encode("utf-8").decode("unicode-escape", "ignore")
 	response.headers.add("Content-Disposition", None, filename=filename)
-	response.data = saashq.response["filecontent"]
+	filecontent = saashq.response["filecontent"]
+	if hasattr(filecontent, "read"):
+		# exports written to a temporary file, closing it after sending also deletes it
+		response.response = wrap_file(saashq.local.request.environ, filecontent)
+		response.direct_passthrough = True
+	else:
+		response.data = filecontent
 	return response
 
 
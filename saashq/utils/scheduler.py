@@ -9,6 +9,7 @@ Events:
 """
 
 import datetime
+import heapq
 import os
 import random
 import time
@@ -20,12 +21,15 @@ from croniter import CroniterBadCronError
 from filelock import FileLock, Timeout
 
 import saashq
+from saashq.query_builder.functions import Count, Max
 from saashq.utils import cint, get_wrench_path, get_datetime, get_sites, now_datetime
-from saashq.utils.background_jobs import set_niceness
+from saashq.utils.background_jobs import EnqueueBatch, set_niceness
 from saashq.utils.caching import redis_cache
 
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 DEFAULT_SCHEDULER_TICK = 4 * 60
+JOB_SCHEDULE_CACHE_KEY = "scheduled_job_schedule"
+JOB_SCHEDULE_CACHE_TTL = 24 * 60 * 60
 
 
 def cprint(*args, **kwargs):
@@ -88,14 +92,22 @@ def enqueue_events_for_all_sites() -> None:
 	# Sites are sorted in alphabetical order, shuffle to randomize priorities
 	random.shuffle(sites)
 
+	# jobs due in all sites are enqueued together
+	batch = EnqueueBatch()
 	for site in sites:
 		try:
-			enqueue_events_for_site(site=site)
+			enqueue_events_for_site(site=site, batch=batch)
 		except Exception:
 			saashq.logger("scheduler").debug(f"Failed to enqueue events for site: {site}", exc_info=True)
 
+	try:
+		with saashq.init_site():
+			batch.enqueue()
+	except Exception:
+		saashq.logger("scheduler").error("Failed to enqueue scheduled jobs", exc_info=True)
+
 
-def enqueue_events_for_site(site: str) -> None:
+def enqueue_events_for_site(site: str, batch: EnqueueBatch | None = None) -> None:
 	def log_exc():
 		saashq.logger("scheduler").error(f"Exception in Enqueue Events for Site {site}", exc_info=True)
 
@@ -106,7 +118,7 @@ def enqueue_events_for_site(site: str) -> None:
 		if is_scheduler_inactive():
 			return
 
-		enqueue_events()
+		enqueue_events(batch=batch)
 
 		saashq.logger("scheduler").debug(f"Queued events for site {site}")
 	except Exception as e:
@@ -118,24 +130,88 @@ def enqueue_events_for_site(site: str) -> None:
 		saashq.destroy()
 
 
-def enqueue_events() -> list[str] | None:
+def enqueue_events(batch: EnqueueBatch | None = None) -> list[str] | None:
+	"""Enqueue scheduled jobs of the current site that are due, return their methods.
+
+	Jobs are added to `batch` if passed, else enqueued right away. Only job types due as per the
+	cached schedule are loaded, see `get_job_schedule`."""
 	if schedule_jobs_based_on_activity():
+		site_batch = EnqueueBatch() if batch is None else batch
+		schedule = get_job_schedule()
+		heap = schedule["heap"]
+
+		now = now_datetime()
+		due = []
+		while heap and heap[0][0] <= now:
+			due.append(heapq.heappop(heap)[1])
+
 		enqueued_jobs = []
-		all_jobs = saashq.get_all("Scheduled Job Type", filters={"stopped": 0}, fields="*")
-		random.shuffle(all_jobs)
-		for job_type in all_jobs:
-			job_type = saashq.get_doc(doctype="Scheduled Job Type", **job_type)
-			try:
-				if job_type.enqueue():
-					enqueued_jobs.append(job_type.method)
-			except CroniterBadCronError:
-				saashq.logger("scheduler").error(
-					f"Invalid Job on {saashq.local.site} - {job_type.name}", exc_info=True
-				)
+		if due:
+			due_jobs = saashq.get_all(
+				"Scheduled Job Type", filters={"name": ("in", due), "stopped": 0}, fields="*"
+			)
+			random.shuffle(due_jobs)
+			for job_type in due_jobs:
+				job_type = saashq.get_doc(doctype="Scheduled Job Type", **job_type)
+				try:
+					if job_type.enqueue(batch=site_batch):
+						enqueued_jobs.append(job_type.method)
+
+					# a job stays due until it has started and updated its last execution
+					heapq.heappush(heap, (job_type.get_next_execution(), job_type.name))
+				except CroniterBadCronError:
+					saashq.logger("scheduler").error(
+						f"Invalid Job on {saashq.local.site} - {job_type.name}", exc_info=True
+					)
+
+			save_job_schedule(schedule)
+
+		if batch is None:
+			site_batch.enqueue()
 
 		return enqueued_jobs
 
 
+def get_job_schedule() -> dict:
+	"""Return min-heap of `(next execution, name)` of enabled scheduled job types of the current site.
+
+	The schedule is cached, and built again once job types are added, removed or modified."""
+	version = get_job_types_version()
+	schedule = saashq.cache.get_value(JOB_SCHEDULE_CACHE_KEY)
+	if schedule and schedule["version"] == version:
+		return schedule
+
+	heap = []
+	for job_type in saashq.get_all("Scheduled Job Type", filters={"stopped": 0}, fields="*"):
+		job_type = saashq.get_doc(doctype="Scheduled Job Type", **job_type)
+		try:
+			heap.append((job_type.get_next_execution(), job_type.name))
+		except CroniterBadCronError:
+			saashq.logger("scheduler").error(
+				f"Invalid Job on {saashq.local.site} - {job_type.name}", exc_info=True
+			)
+
+	heapq.heapify(heap)
+	schedule = {"version": version, "heap": heap}
+	save_job_schedule(schedule)
+	return schedule
+
+
+def get_job_types_version() -> tuple:
+	"""Return what the schedule depends on, other than last executions of job types."""
+	table = saashq.qb.DocType("Scheduled Job Type")
+	count, modified = saashq.qb.from_(table).select(Count("*"), Max(table.modified)).run()[0]
+	return (count, str(modified), saashq.get_conf().scheduler_interval)
+
+
+def save_job_schedule(schedule: dict):
+	saashq.cache.set_value(JOB_SCHEDULE_CACHE_KEY, schedule, expires_in_sec=JOB_SCHEDULE_CACHE_TTL)
+
+
+def clear_job_schedule():
+	saashq.cache.delete_value(JOB_SCHEDULE_CACHE_KEY)
+
+
 def is_scheduler_inactive(verbose=True) -> bool:
 	if saashq.local.conf.maintenance_mode:
 		if verbose:
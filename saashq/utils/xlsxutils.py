@@ -17,7 +17,11 @@ ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
 
 
 # return xlsx file object
-def make_xlsx(data, sheet_name, wb=None, column_widths=None):
+def make_xlsx(data, sheet_name, wb=None, column_widths=None, file=None):
+	"""Write rows of `data` to an xlsx workbook.
+
+	`data` can be any iterable, with the default write-only workbook rows aren't kept in memory.
+	Pass a path or file object as `file` to save the workbook there instead of a `BytesIO`."""
 	column_widths = column_widths or []
 	if wb is None:
 		wb = openpyxl.Workbook(write_only=True)
@@ -48,7 +52,7 @@ def make_xlsx(data, sheet_name, wb=None, column_widths=None):
 
 		ws.append(clean_row)
 
-	xlsx_file = BytesIO()
+	xlsx_file = BytesIO() if file is None else file
 	wb.save(xlsx_file)
 	return xlsx_file
 
@@ -94,6 +98,18 @@ def read_xlsx_file_from_attached_file(file_url=None, fcontent=None, filepath=Non
 	return rows
 
 
+def iter_xlsx_file(filepath):
+	"""Yield rows of the active sheet of the xlsx file at `filepath` one at a time.
+
+	The workbook is opened in read-only mode, which doesn't load all cells in memory."""
+	wb = load_workbook(filename=filepath, read_only=True, data_only=True)
+	try:
+		for row in wb.active.iter_rows(values_only=True):
+			yield list(row)
+	finally:
+		wb.close()
+
+
 def read_xls_file_from_attached_file(content):
 	book = xlrd.open_workbook(file_contents=content)
 	sheets = book.sheets()